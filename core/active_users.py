@@ -0,0 +1,97 @@
+"""
+Approximate distinct active-user counts.
+
+A user is active on a day if they created an order or a booking. Each day has
+a HyperLogLog sketch of its active users (DailyActiveUserSketch), updated as
+orders and bookings are created (see core.signals). The number of distinct
+users active over any range of days is estimated by merging that range's
+sketches, with a relative standard error of HyperLogLog.error_bound().
+"""
+from datetime import datetime, time
+from django.db import transaction
+from django.utils import timezone
+from .hyperloglog import HyperLogLog
+from .models import Order, Booking, DailyActiveUserSketch
+
+PRECISION = HyperLogLog.DEFAULT_PRECISION
+ERROR_BOUND = HyperLogLog.error_bound(PRECISION)
+
+
+def record_activity(user_id, when):
+    """
+    Add a user to the sketch for the day of ``when``.
+
+    Most activity comes from users already reflected in the day's registers,
+    so the register is checked without a lock first and the row is only
+    locked and rewritten when the sketch actually changes.
+    """
+    day = timezone.localdate(when)
+    index, rank = HyperLogLog(PRECISION).position(user_id)
+    stored = DailyActiveUserSketch.objects.filter(day=day).values_list('registers', flat=True).first()
+    if stored is not None and stored[index] >= rank:
+        return
+
+    with transaction.atomic():
+        sketch, _ = DailyActiveUserSketch.objects.select_for_update().get_or_create(
+            day=day, defaults={'registers': bytes(1 << PRECISION)}
+        )
+        registers = HyperLogLog.from_bytes(bytes(sketch.registers))
+        if registers.add(user_id):
+            sketch.registers = registers.to_bytes()
+            sketch.save(update_fields=['registers', 'updated_at'])
+
+
+def merged_sketch(start_date, end_date):
+    """Return the union of the daily sketches from ``start_date`` to ``end_date`` inclusive"""
+    merged = HyperLogLog(PRECISION)
+    sketches = DailyActiveUserSketch.objects.filter(
+        day__gte=start_date, day__lte=end_date
+    ).values_list('registers', flat=True)
+    for registers in sketches.iterator():
+        merged.merge(HyperLogLog.from_bytes(bytes(registers)))
+    return merged
+
+
+def count_active_users(start_date, end_date):
+    """
+    Estimate the number of distinct users active from ``start_date`` to ``end_date``.
+
+    Returns:
+        tuple: (estimate, relative standard error)
+    """
+    return merged_sketch(start_date, end_date).count(), ERROR_BOUND
+
+
+def rebuild(start_date=None, end_date=None):
+    """
+    Recompute the daily sketches from orders and bookings, optionally for a day range.
+
+    Returns:
+        int: The number of days written
+    """
+    tz = timezone.get_current_timezone()
+    sketches = {}
+    for model in (Order, Booking):
+        rows = model.objects.all()
+        if start_date:
+            rows = rows.filter(created_at__gte=timezone.make_aware(datetime.combine(start_date, time.min), tz))
+        if end_date:
+            rows = rows.filter(created_at__lte=timezone.make_aware(datetime.combine(end_date, time.max), tz))
+        for user_id, created_at in rows.values_list('user_id', 'created_at').iterator(chunk_size=5000):
+            day = timezone.localdate(created_at)
+            if day not in sketches:
+                sketches[day] = HyperLogLog(PRECISION)
+            sketches[day].add(user_id)
+
+    existing = DailyActiveUserSketch.objects.all()
+    if start_date:
+        existing = existing.filter(day__gte=start_date)
+    if end_date:
+        existing = existing.filter(day__lte=end_date)
+    with transaction.atomic():
+        existing.delete()
+        DailyActiveUserSketch.objects.bulk_create([
+            DailyActiveUserSketch(day=day, registers=sketch.to_bytes())
+            for day, sketch in sketches.items()
+        ], batch_size=500)
+    return len(sketches)
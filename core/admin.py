@@ -3,8 +3,9 @@ from django.contrib.auth.admin import UserAdmin
 from .models import (
     User, ServiceProvider, ServiceType, Booking, Product, ProductCategory,
     Order, OrderItem, Payment, Membership, UserMembership, Review,
-    Notification, LoyaltyProgram
+    Notification, NotificationBroadcast, LoyaltyProgram, OutboxEmail, EmailCampaign, RevokedToken
 )
+from .email_outbox import requeue
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -80,8 +81,42 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ('user__username',)
     list_filter = ('notification_type', 'status')
 
+@admin.register(NotificationBroadcast)
+class NotificationBroadcastAdmin(admin.ModelAdmin):
+    list_display = ('broadcast_id', 'notification_type', 'created_count', 'created_by', 'created_at', 'completed_at')
+    search_fields = ('broadcast_id', 'message')
+    readonly_fields = ('last_user_id', 'created_count', 'completed_at')
+
 @admin.register(LoyaltyProgram)
 class LoyaltyProgramAdmin(admin.ModelAdmin):
     list_display = ('user', 'points', 'tier', 'updated_at')
     search_fields = ('user__username',)
     list_filter = ('tier',)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    search_fields = ('to_email', 'subject')
+    list_filter = ('status',)
+    actions = ['requeue_emails']
+
+    @admin.action(description='Requeue selected dead-lettered emails')
+    def requeue_emails(self, request, queryset):
+        count = requeue(queryset)
+        self.message_user(request, f'{count} email(s) requeued.')
+
+
+@admin.register(EmailCampaign)
+class EmailCampaignAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'sent_count', 'created_at', 'started_at', 'completed_at')
+    search_fields = ('name',)
+    list_filter = ('status',)
+    readonly_fields = ('status', 'progress', 'sent_count', 'last_error', 'started_at', 'completed_at')
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'user', 'revoked_at', 'expires_at')
+    search_fields = ('jti', 'user__username')
+    readonly_fields = ('jti', 'user', 'revoked_at', 'expires_at')
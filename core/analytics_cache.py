@@ -0,0 +1,161 @@
+import hashlib
+import time
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone, translation
+
+# Sections that read data outside the requested range, so their responses are
+# always treated as open and expire with the time bucket
+LIVE_SECTIONS = {'users', 'retention'}
+
+# Undated data each analytics section depends on, invalidated as a whole
+SECTION_SCOPES = {
+    'users': ('users',),
+    'products': ('products',),
+    'services': ('services',),
+}
+
+
+class AnalyticsCache:
+    """
+    Cache for AnalyticsView responses.
+
+    Entries are keyed by (sections, period, start, end, time zone, active
+    language) plus a generation counter for every month in the range and for
+    the undated data the sections read (see SECTION_SCOPES). Writes bump only the generations of the months
+    and scopes they touch, which retires the affected entries without scanning
+    the cache.
+
+    Ranges that are still open (ending today or later, or including one of
+    LIVE_SECTIONS, which read data outside the range) are also keyed by the
+    current time bucket and expire when it closes. Closed ranges are kept
+    until invalidated or ANALYTICS_CACHE_TIMEOUT passes.
+
+    Misses are single-flight: one caller recomputes under a lock while the
+    others get the previous response for the same parameters, or wait for the
+    new one if there is none. With a per-process cache backend this only
+    de-duplicates within a process; configure a shared backend for more.
+    """
+
+    PREFIX = 'analytics'
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, cache=None, bucket_seconds=None, timeout=None, lock_timeout=None):
+        self.cache = cache or caches[getattr(settings, 'ANALYTICS_CACHE_ALIAS', 'default')]
+        self.bucket_seconds = bucket_seconds or getattr(settings, 'ANALYTICS_CACHE_BUCKET_SECONDS', 300)
+        self.timeout = timeout or getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 86400)
+        self.lock_timeout = lock_timeout or getattr(settings, 'ANALYTICS_CACHE_LOCK_TIMEOUT', 30)
+
+    @staticmethod
+    def _months(start_date, end_date):
+        month = date(start_date.year, start_date.month, 1)
+        while month <= end_date:
+            yield month.strftime('%Y-%m')
+            month = (month + timedelta(days=32)).replace(day=1)
+
+    def _generation_key(self, name):
+        return f'{self.PREFIX}:gen:{name}'
+
+    def _generations(self, sections, start_date, end_date):
+        names = list(self._months(start_date, end_date))
+        for section in sections:
+            names.extend(SECTION_SCOPES.get(section, ()))
+        keys = [self._generation_key(name) for name in names]
+        stored = self.cache.get_many(keys)
+        return [str(stored.get(key, 0)) for key in keys]
+
+    def _bucket(self, sections, end_date):
+        """
+        Return (bucket id, timeout) for an entry.
+        Open ranges are bucketed by time and expire when the bucket closes.
+        """
+        if end_date < timezone.localdate() and not LIVE_SECTIONS & set(sections):
+            return 'closed', self.timeout
+        now = time.time()
+        bucket = int(now // self.bucket_seconds)
+        remaining = (bucket + 1) * self.bucket_seconds - now
+        return str(bucket), max(1, int(remaining))
+
+    def make_keys(self, sections, period, start_date, end_date, tz=''):
+        """
+        Build the cache keys for a request.
+
+        Args:
+            sections: The requested section names
+            period: The period the time series are truncated to
+            start_date: The first day of the range (date)
+            end_date: The last day of the range (date)
+            tz: The time zone name the time series are bucketed in
+
+        Returns:
+            tuple: (entry key, key of the last response for these parameters, timeout)
+        """
+        sections = sorted(set(sections))
+        # Sections include translated names, so each language has its own entries
+        language = translation.get_language() or ''
+        params = '|'.join([','.join(sections), period, start_date.isoformat(), end_date.isoformat(), tz, language])
+        bucket, timeout = self._bucket(sections, end_date)
+        versions = self._generations(sections, start_date, end_date)
+        params_hash = hashlib.sha1(params.encode()).hexdigest()
+        entry_hash = hashlib.sha1('|'.join([params, bucket] + versions).encode()).hexdigest()
+        return f'{self.PREFIX}:entry:{entry_hash}', f'{self.PREFIX}:last:{params_hash}', timeout
+
+    def get_or_compute(self, sections, period, start_date, end_date, compute, tz=''):
+        """
+        Return the analytics response for a request, computing it on a miss.
+
+        Args:
+            compute: Callable returning the response data
+
+        Returns:
+            tuple: (data, state) where state is 'hit', 'miss' or 'stale'
+        """
+        key, last_key, timeout = self.make_keys(sections, period, start_date, end_date, tz)
+        data = self.cache.get(key)
+        if data is not None:
+            return data, 'hit'
+
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + self.lock_timeout
+        stale = None
+        while True:
+            if self.cache.add(lock_key, 1, self.lock_timeout):
+                try:
+                    data = compute()
+                    self.cache.set(key, data, timeout)
+                    self.cache.set(last_key, data, self.timeout)
+                finally:
+                    self.cache.delete(lock_key)
+                return data, 'miss'
+
+            # Someone else is recomputing this entry
+            if stale is None:
+                stale = self.cache.get(last_key)
+                if stale is not None:
+                    return stale, 'stale'
+            if time.monotonic() >= deadline:
+                # The other worker is stuck; compute without caching rather than wait any longer
+                return compute(), 'miss'
+            time.sleep(self.POLL_INTERVAL)
+            data = self.cache.get(key)
+            if data is not None:
+                return data, 'hit'
+
+    def _bump(self, name):
+        key = self._generation_key(name)
+        self.cache.add(key, 0, None)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr(); any value differing from before will do
+            self.cache.set(key, time.time_ns(), None)
+
+    def invalidate_days(self, days):
+        """Retire cached responses whose range includes any of ``days``"""
+        for month in sorted({day.strftime('%Y-%m') for day in days}):
+            self._bump(month)
+
+    def invalidate_scope(self, scope):
+        """Retire cached responses for sections that depend on ``scope`` (see SECTION_SCOPES)"""
+        self._bump(scope)
@@ -0,0 +1,134 @@
+import csv
+import io
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Order, Booking, Payment, ReturnRequest
+
+
+class AnalyticsExporter:
+    """
+    Streams the raw rows behind the analytics dashboard as CSV or NDJSON.
+
+    Rows are read with ``values_list().iterator(chunk_size)``, with joined
+    columns resolved in the same query, so no model instances are built and
+    memory stays flat however many rows are exported. Output is yielded in
+    blocks of ``BATCH_SIZE`` rows.
+    """
+
+    CHUNK_SIZE = 2000
+    BATCH_SIZE = 500
+    FORMATS = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson',
+    }
+
+    # Dataset -> (model, [(column, lookup)])
+    DATASETS = {
+        'orders': (Order, [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('status', 'status'),
+            ('user_id', 'user_id'),
+            ('user_email', 'user__email'),
+            ('shop_id', 'shop_id'),
+            ('shop_name', 'shop__name'),
+            ('total_price', 'total_price'),
+            ('rejection_reason', 'rejection_reason'),
+            ('updated_at', 'updated_at'),
+        ]),
+        'bookings': (Booking, [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('scheduled_time', 'scheduled_time'),
+            ('status', 'status'),
+            ('user_id', 'user_id'),
+            ('user_email', 'user__email'),
+            ('service_provider_id', 'service_provider_id'),
+            ('service_provider_name', 'service_provider__name'),
+            ('service_type_id', 'service_type_id'),
+            ('service_type_name', 'service_type__name'),
+            ('price', 'price'),
+            ('recurrence_rule', 'recurrence_rule'),
+            ('updated_at', 'updated_at'),
+        ]),
+        'payments': (Payment, [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('transaction_id', 'transaction_id'),
+            ('status', 'status'),
+            ('payment_method', 'payment_method'),
+            ('user_id', 'user_id'),
+            ('user_email', 'user__email'),
+            ('order_id', 'order_id'),
+            ('booking_id', 'booking_id'),
+            ('amount', 'amount'),
+            ('gst_amount', 'gst_amount'),
+            ('discount_amount', 'discount_amount'),
+            ('refund_id', 'refund_id'),
+        ]),
+        'returns': (ReturnRequest, [
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('status', 'status'),
+            ('reason', 'reason'),
+            ('order_id', 'order_id'),
+            ('user_id', 'user_id'),
+            ('user_email', 'user__email'),
+            ('refund_amount', 'refund_amount'),
+            ('refund_id', 'refund_id'),
+            ('updated_at', 'updated_at'),
+        ]),
+    }
+
+    def __init__(self, dataset, start, end, chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            dataset: One of DATASETS
+            start: Start of the period (aware datetime)
+            end: End of the period (aware datetime)
+        """
+        self.model, columns = self.DATASETS[dataset]
+        self.columns = [column for column, _ in columns]
+        self.lookups = [lookup for _, lookup in columns]
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+
+    def rows(self):
+        """Yield the dataset's rows as tuples in creation order"""
+        queryset = self.model.objects.filter(
+            created_at__gte=self.start, created_at__lte=self.end
+        ).order_by('created_at', 'id').values_list(*self.lookups)
+        return queryset.iterator(chunk_size=self.chunk_size)
+
+    def _batches(self):
+        batch = []
+        for row in self.rows():
+            batch.append(row)
+            if len(batch) >= self.BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        for batch in self._batches():
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    def iter_ndjson(self):
+        encoder = DjangoJSONEncoder()
+        columns = self.columns
+        for batch in self._batches():
+            yield ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in batch)
+
+    def stream(self, output_format):
+        """Return an iterator over the export's text in ``output_format`` ('csv' or 'ndjson')"""
+        if output_format == 'csv':
+            return self.iter_csv()
+        return self.iter_ndjson()
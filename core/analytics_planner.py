@@ -0,0 +1,133 @@
+"""
+Query planning for AnalyticsView.
+
+Each analytics section registers its scalar metrics and fixed-choice
+breakdowns (by status, reason, membership, ...) on a ScalarPlan, which runs
+them as a single conditional-aggregation query over the section's base
+queryset. Grouped and list queries a section still needs are run by the
+section itself. Independent sections are run concurrently by run_sections(),
+each worker using its own database connection.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils import timezone, translation
+
+
+class ScalarPlan:
+    """
+    Collects aggregates over one queryset and evaluates them in a single query.
+
+    Usage:
+        plan = ScalarPlan(orders)
+        plan.add('order_count', Sum('count'))
+        plan.add_breakdown('by_status', 'status', Order.STATUS_CHOICES, count=(Sum, 'count'))
+        result = plan.run()
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self.scalars = {}
+        self.breakdowns = {}
+
+    def add(self, name, aggregate):
+        """Add a scalar aggregate, returned under ``name``"""
+        self.scalars[name] = aggregate
+        return self
+
+    def add_breakdown(self, name, field, choices, **measures):
+        """
+        Add a breakdown of ``field`` over a fixed list of choices.
+
+        Each measure is an (aggregate class, expression) pair that is evaluated
+        once per choice with a ``field=value`` filter. The first measure decides
+        whether a choice is included: values with no rows are left out, as they
+        would be from a GROUP BY.
+
+        Args:
+            name: Key of the breakdown list in the result
+            field: The field being broken down
+            choices: The model field's choices
+            measures: Measure name -> (aggregate class, expression)
+        """
+        self.breakdowns[name] = (field, [value for value, _label in choices], measures)
+        return self
+
+    def _aggregates(self):
+        aggregates = dict(self.scalars)
+        for name, (field, values, measures) in self.breakdowns.items():
+            for index, value in enumerate(values):
+                condition = Q(**{field: value})
+                for measure, (aggregate, expression) in measures.items():
+                    aggregates[f'{name}_{index}_{measure}'] = aggregate(expression, filter=condition)
+        return aggregates
+
+    def run(self):
+        """
+        Returns:
+            dict: Scalars by name, and each breakdown as a list of dicts keyed by field and measure names
+        """
+        aggregates = self._aggregates()
+        row = self.queryset.aggregate(**aggregates) if aggregates else {}
+        result = {name: row[name] for name in self.scalars}
+        for name, (field, values, measures) in self.breakdowns.items():
+            entries = []
+            for index, value in enumerate(values):
+                entry = {field: value}
+                entry.update({measure: row[f'{name}_{index}_{measure}'] for measure in measures})
+                if entry[next(iter(measures))]:
+                    entries.append(entry)
+            result[name] = entries
+        return result
+
+
+def _can_run_concurrently():
+    # Other connections cannot see rows from an open transaction, and an
+    # in-memory SQLite database is private to the connection that created it
+    if connection.in_atomic_block:
+        return False
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        return False
+    return True
+
+
+def _run_section(section, tz, language):
+    # Worker threads do not inherit the request's timezone or language, which
+    # date truncation and translated fields depend on
+    timezone.activate(tz)
+    translation.activate(language)
+    try:
+        return section()
+    finally:
+        translation.deactivate()
+        timezone.deactivate()
+        connections.close_all()
+
+
+def run_sections(sections, workers=None):
+    """
+    Run independent analytics sections, concurrently where the database allows it.
+    Each worker closes the connections it opened once its section finishes, even if it fails.
+
+    Args:
+        sections: Dict of section name -> callable taking no arguments
+        workers: Maximum number of concurrent sections
+                 (defaults to the ANALYTICS_SECTION_WORKERS setting)
+
+    Returns:
+        dict: Section name -> result, in the order of ``sections``
+    """
+    if workers is None:
+        workers = getattr(settings, 'ANALYTICS_SECTION_WORKERS', 4)
+    if workers <= 1 or len(sections) <= 1 or not _can_run_concurrently():
+        return {name: section() for name, section in sections.items()}
+
+    tz = timezone.get_current_timezone()
+    language = translation.get_language()
+    with ThreadPoolExecutor(max_workers=min(workers, len(sections))) as pool:
+        futures = {
+            name: pool.submit(_run_section, section, tz, language)
+            for name, section in sections.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
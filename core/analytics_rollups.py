@@ -0,0 +1,290 @@
+"""
+Daily rollup tables behind AnalyticsView.
+
+Each RollupSpec describes how rows of a source model map onto a rollup bucket
+(day plus a few dimensions) and which measures are summed into it. Buckets are
+updated incrementally from model signals (see core.signals) by subtracting a
+row's old contribution and adding its new one, and can be rebuilt from scratch
+with the ``backfill_rollups`` management command.
+
+Rollup rows are always read back with SUM(), so a bucket may be split across
+several rows without affecting results; this lets updates avoid locking or
+unique constraints on nullable dimensions.
+
+Only writes that send signals are tracked. ``QuerySet.update()``,
+``bulk_create()``, ``bulk_update()`` and raw SQL on a source table leave its
+rollups out of date, as do cascades that change a tracked field with such an
+UPDATE (deleting an order nulls its payments' order, which core.signals
+handles in a pre_delete handler). After such writes, repair the affected days with
+``python manage.py backfill_rollups --start-date ... --end-date ...``.
+"""
+from datetime import datetime, time
+from django.db import transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import (
+    Order, OrderItem, Booking, Payment, ReturnRequest, User,
+    DailySalesRollup, DailyBookingRollup, DailyPaymentRollup, DailyReturnRollup, DailyUserRollup,
+    DailyProductRollup, DailyProviderRollup
+)
+
+COUNT_MEASURE = (lambda values: 1, Count('pk'))
+
+
+class RollupSpec:
+    def __init__(self, source, rollup, date_field, fields, dimensions, total_field=None, annotations=None,
+                 measures=None, condition=None, condition_filter=None, parent=None):
+        """
+        Args:
+            source: The model being rolled up
+            rollup: The rollup model
+            date_field: Source field that determines the bucket's day
+            fields: Source attnames needed to compute the bucket and measures;
+                    fields of a parent row are given as lookups, e.g. 'order__status'
+            dimensions: Callable mapping a dict of source values to rollup dimension values
+            total_field: Source field summed into ``total`` (shorthand for a 'total' measure)
+            annotations: Database expressions producing each dimension, used by backfill
+            measures: Rollup column -> (callable mapping source values to an amount,
+                      aggregate used by backfill); defaults to ``count`` plus ``total``
+            condition: Callable deciding whether a row of source values is rolled up at all
+            condition_filter: Q object equivalent to ``condition``, used by backfill
+            parent: (model, foreign key name) of a parent whose fields the rollup depends on
+        """
+        self.source = source
+        self.rollup = rollup
+        self.date_field = date_field
+        self.fields = (date_field,) + tuple(fields)
+        self.dimensions = dimensions
+        self.annotations = annotations or {}
+        if measures is None:
+            measures = {'count': COUNT_MEASURE}
+            if total_field:
+                measures['total'] = (lambda values: values[total_field] or 0, Sum(total_field))
+        self.measures = measures
+        self.condition = condition
+        self.condition_filter = condition_filter
+        self.parent = parent
+
+    def contribution(self, values):
+        """Return (bucket, amounts) for a dict of source values, or None if the row is not bucketed"""
+        if values is None or values[self.date_field] is None:
+            return None
+        if self.condition and not self.condition(values):
+            return None
+        bucket = {'day': timezone.localdate(values[self.date_field])}
+        bucket.update(self.dimensions(values))
+        amounts = {name: value(values) for name, (value, _aggregate) in self.measures.items()}
+        return bucket, amounts
+
+    def instance_values(self, instance):
+        values = {}
+        for field in self.fields:
+            value = instance
+            for attribute in field.split('__'):
+                value = getattr(value, attribute)
+            values[field] = value
+        return values
+
+    def stored_values(self, pk):
+        return self.source.objects.filter(pk=pk).values(*self.fields).first()
+
+    def parent_fields(self):
+        """Map the spec's parent lookups (e.g. 'order__status') to the parent's field names"""
+        if self.parent is None:
+            return {}
+        prefix = f'{self.parent[1]}__'
+        return {field: field[len(prefix):] for field in self.fields if field.startswith(prefix)}
+
+
+ROLLUP_SPECS = [
+    RollupSpec(
+        Order, DailySalesRollup, 'created_at',
+        fields=('status', 'shop_id', 'total_price'),
+        dimensions=lambda v: {'status': v['status'], 'shop_id': v['shop_id']},
+        total_field='total_price',
+        annotations={'status': F('status'), 'shop_id': F('shop_id')}
+    ),
+    RollupSpec(
+        Booking, DailyBookingRollup, 'created_at',
+        fields=('status', 'service_type_id', 'recurrence_rule', 'price'),
+        dimensions=lambda v: {
+            'status': v['status'],
+            'service_type_id': v['service_type_id'],
+            'is_recurring': v['recurrence_rule'] != 'N'
+        },
+        total_field='price',
+        annotations={
+            'status': F('status'),
+            'service_type_id': F('service_type_id'),
+            'is_recurring': ExpressionWrapper(~Q(recurrence_rule='N'), output_field=BooleanField())
+        }
+    ),
+    RollupSpec(
+        Payment, DailyPaymentRollup, 'created_at',
+        fields=('payment_method', 'status', 'order_id', 'amount'),
+        dimensions=lambda v: {
+            'payment_method': v['payment_method'],
+            'status': v['status'],
+            'is_order': v['order_id'] is not None
+        },
+        total_field='amount',
+        annotations={
+            'payment_method': F('payment_method'),
+            'status': F('status'),
+            'is_order': ExpressionWrapper(Q(order__isnull=False), output_field=BooleanField())
+        }
+    ),
+    RollupSpec(
+        ReturnRequest, DailyReturnRollup, 'created_at',
+        fields=('status', 'reason', 'refund_amount'),
+        dimensions=lambda v: {'status': v['status'], 'reason': v['reason']},
+        total_field='refund_amount',
+        annotations={'status': F('status'), 'reason': F('reason')}
+    ),
+    RollupSpec(
+        User, DailyUserRollup, 'date_joined',
+        fields=(),
+        dimensions=lambda v: {}
+    ),
+    # Leaderboards: units and revenue per product, bookings and revenue per provider.
+    # Cancelled and rejected orders and cancelled bookings are left out.
+    RollupSpec(
+        OrderItem, DailyProductRollup, 'order__created_at',
+        fields=('order__status', 'product_id', 'quantity', 'price'),
+        dimensions=lambda v: {'product_id': v['product_id']},
+        annotations={'product_id': F('product_id')},
+        measures={
+            'count': COUNT_MEASURE,
+            'units': (lambda v: v['quantity'], Sum('quantity')),
+            'revenue': (lambda v: v['price'] * v['quantity'], Sum(F('price') * F('quantity'))),
+        },
+        condition=lambda v: v['order__status'] not in ('C', 'R'),
+        condition_filter=~Q(order__status__in=['C', 'R']),
+        parent=(Order, 'order')
+    ),
+    RollupSpec(
+        Booking, DailyProviderRollup, 'created_at',
+        fields=('status', 'service_provider_id', 'price'),
+        dimensions=lambda v: {'service_provider_id': v['service_provider_id']},
+        total_field='price',
+        annotations={'service_provider_id': F('service_provider_id')},
+        condition=lambda v: v['status'] != 'X',
+        condition_filter=~Q(status='X')
+    ),
+]
+
+SPECS_BY_SOURCE = {}
+for _spec in ROLLUP_SPECS:
+    SPECS_BY_SOURCE.setdefault(_spec.source, []).append(_spec)
+
+# Specs whose buckets depend on fields of a parent model, keyed by the parent
+SPECS_BY_PARENT = {}
+for _spec in ROLLUP_SPECS:
+    if _spec.parent:
+        SPECS_BY_PARENT.setdefault(_spec.parent[0], []).append(_spec)
+
+
+def _bump(spec, bucket, sign, amounts):
+    changes = {name: F(name) + sign * amount for name, amount in amounts.items()}
+    # Update a single row of the bucket; any row will do since reads use SUM()
+    first_row = spec.rollup.objects.filter(**bucket).values('id')[:1]
+    if not spec.rollup.objects.filter(id=Subquery(first_row)).update(**changes):
+        if sign < 0:
+            # Nothing to subtract from, e.g. the bucket was rebuilt without this row
+            return
+        spec.rollup.objects.create(**bucket, **{name: sign * amount for name, amount in amounts.items()})
+    elif sign < 0:
+        # Drop emptied buckets so they do not show up in breakdowns
+        spec.rollup.objects.filter(**bucket, count=0).delete()
+
+
+def apply_change(spec, old_values, new_values):
+    """
+    Move a row's contribution from its old bucket to its new one.
+    Either side may be None for inserts and deletes.
+
+    Returns:
+        list: The days whose buckets changed
+    """
+    old = spec.contribution(old_values)
+    new = spec.contribution(new_values)
+    if old == new:
+        return []
+    with transaction.atomic():
+        if old is not None:
+            _bump(spec, old[0], -1, old[1])
+        if new is not None:
+            _bump(spec, new[0], 1, new[1])
+    return [contribution[0]['day'] for contribution in (old, new) if contribution is not None]
+
+
+def apply_parent_change(spec, parent_pk, old_parent_values):
+    """
+    Re-bucket a parent's child rows after the parent's fields changed,
+    e.g. an order's items when the order is cancelled.
+
+    Args:
+        spec: A spec with ``parent`` set
+        parent_pk: The primary key of the changed parent row
+        old_parent_values: The parent's previously stored field values
+
+    Returns:
+        list: The days whose buckets changed
+    """
+    parent_fields = spec.parent_fields()
+    days = []
+    for new_values in spec.source.objects.filter(**{spec.parent[1]: parent_pk}).values(*spec.fields):
+        old_values = dict(new_values)
+        old_values.update({lookup: old_parent_values[name] for lookup, name in parent_fields.items()})
+        days.extend(apply_change(spec, old_values, new_values))
+    return days
+
+
+def rebuild(spec, start_date=None, end_date=None):
+    """
+    Recompute a rollup from its source table, optionally limited to a day range.
+
+    Returns:
+        int: The number of rollup rows written
+    """
+    day = TruncDate(spec.date_field)
+    source = spec.source.objects.all()
+    if spec.condition_filter is not None:
+        source = source.filter(spec.condition_filter)
+    rollups = spec.rollup.objects.all()
+    tz = timezone.get_current_timezone()
+    if start_date:
+        source = source.filter(**{f'{spec.date_field}__gte': timezone.make_aware(datetime.combine(start_date, time.min), tz)})
+        rollups = rollups.filter(day__gte=start_date)
+    if end_date:
+        source = source.filter(**{f'{spec.date_field}__lte': timezone.make_aware(datetime.combine(end_date, time.max), tz)})
+        rollups = rollups.filter(day__lte=end_date)
+
+    measures = {f'rollup_{name}': aggregate for name, (_value, aggregate) in spec.measures.items()}
+    aggregated = source.annotate(rollup_day=day, **{
+        f'rollup_dim_{name}': expression for name, expression in spec.annotations.items()
+    }).values('rollup_day', *[f'rollup_dim_{name}' for name in spec.annotations]).annotate(**measures).order_by()
+
+    rows = []
+    for entry in aggregated.iterator(chunk_size=2000):
+        row = spec.rollup(day=entry['rollup_day'], **{
+            name: entry[f'rollup_dim_{name}'] for name in spec.annotations
+        })
+        for name in spec.measures:
+            setattr(row, name, entry[f'rollup_{name}'] or 0)
+        rows.append(row)
+
+    with transaction.atomic():
+        rollups.delete()
+        spec.rollup.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
+
+
+def day_range(queryset, start_date, end_date):
+    """Filter a rollup queryset to the days covered by two datetimes or dates"""
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    if isinstance(end_date, datetime):
+        end_date = end_date.date()
+    return queryset.filter(day__gte=start_date, day__lte=end_date)
@@ -2,18 +2,23 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from django.conf import settings
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
 from .security import get_permission_classes
 from .models import User
 from .serializers import UserSerializer
+from .email_outbox import enqueue
+from .login_throttle import LoginRateThrottle, stats
+from .token_revocation import revoke
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginRateThrottle]
     
     def post(self, request):
         email = request.data.get('email')
@@ -36,6 +41,18 @@ class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
+        # Revoke the JWTs presented, so they stop working before they expire
+        if isinstance(request.auth, Token):
+            revoke(request.auth, request.user.pk)
+        refresh = request.data.get('refresh')
+        if refresh:
+            try:
+                refresh_token = RefreshToken(refresh)
+            except TokenError:
+                return Response({'error': 'Invalid refresh token'}, status=status.HTTP_400_BAD_REQUEST)
+            if str(refresh_token.get(api_settings.USER_ID_CLAIM)) != str(request.user.pk):
+                return Response({'error': 'Invalid refresh token'}, status=status.HTTP_400_BAD_REQUEST)
+            revoke(refresh_token, request.user.pk)
         logout(request)
         return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
 
@@ -57,10 +74,7 @@ class PasswordResetRequestView(APIView):
             # Send email
             subject = 'Password Reset Request'
             message = f'Please click the following link to reset your password: {reset_link}'
-            from_email = settings.DEFAULT_FROM_EMAIL
-            recipient_list = [email]
-            
-            send_mail(subject, message, from_email, recipient_list)
+            enqueue(user.email, subject, text_body=message)
             
             return Response({'message': 'Password reset email sent'}, status=status.HTTP_200_OK)
         except User.DoesNotExist:
@@ -108,4 +122,11 @@ class ChangeLanguageView(APIView):
         return Response({
             'message': 'Language preference updated successfully',
             'language_code': language_code
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+class LoginThrottleStatsView(APIView):
+    """Login throttle counters for dashboards"""
+    permission_classes = get_permission_classes(staff_only=True)
+
+    def get(self, request):
+        return Response(stats(), status=status.HTTP_200_OK)
@@ -0,0 +1,137 @@
+"""
+JWT authentication for API requests.
+
+Access tokens carry the user's hot attributes as signed claims (see
+CLAIM_FIELDS), written when the token pair is issued and again on every
+refresh, together with the user's claims_version. While the token's
+version matches the user's current one, which is cached, the request user
+is a ClaimsUser: it answers those attributes from the token and loads the
+user, from the user snapshot cache, only when something else is read.
+Saving a change to a claim field, or to is_active, bumps claims_version, so
+older tokens fall back to the cached user row until the client refreshes.
+
+Revoked tokens are rejected; see core.token_revocation.
+
+StreamToken is a short-lived token that only opens the notification stream,
+for EventSource clients that cannot send the Authorization header and would
+otherwise put an access token in the URL.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from .token_revocation import is_revoked
+from .user_cache import UserSnapshotCache
+
+CLAIM_FIELDS = ('membership_status', 'language_preference', 'is_staff')
+VERSION_CLAIM = 'claims_version'
+# Changes to these fields make tokens issued before them stale
+VERSIONED_FIELDS = CLAIM_FIELDS + ('is_active',)
+
+
+def set_user_claims(token, user):
+    """Embed the user's claim fields and claims_version in a token"""
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[VERSION_CLAIM] = user.claims_version
+
+
+class StreamToken(Token):
+    """Token accepted only by the notification stream, as its stream_token parameter"""
+
+    token_type = 'stream'
+    lifetime = getattr(settings, 'REALTIME_STREAM_TOKEN_LIFETIME', timedelta(seconds=60))
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    Request user backed by a token's claims.
+
+    The claim fields, id and the authentication flags are answered without
+    loading anything; any other use loads the user through the snapshot cache
+    and behaves as that User instance.
+    """
+
+    def __init__(self, user_id, claims):
+        self.__dict__['_claims'] = {
+            **claims, 'id': user_id, 'pk': user_id, 'is_active': True,
+            'is_authenticated': True, 'is_anonymous': False,
+        }
+        super().__init__(lambda: _load_user(user_id))
+
+    def __getattr__(self, name):
+        claims = self.__dict__['_claims']
+        if self._wrapped is empty and name in claims:
+            return claims[name]
+        return super().__getattr__(name)
+
+    def __bool__(self):
+        return True
+
+
+def _load_user(user_id):
+    user = UserSnapshotCache().get(user_id)
+    if user is None:
+        raise AuthenticationFailed(_('User not found'), code='user_not_found')
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves the user from the token's claims, or from the
+    user snapshot cache when they are stale, instead of loading the row on every
+    request. Each request is authenticated once: UserLanguageMiddleware
+    authenticates API requests before the view does.
+    """
+
+    def authenticate(self, request):
+        if hasattr(request, '_jwt_authentication'):
+            return request._jwt_authentication
+        result = super().authenticate(request)
+        # The DRF request passes attribute reads through to the Django request
+        getattr(request, '_request', request)._jwt_authentication = result
+        return result
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_revoked(validated_token):
+            raise InvalidToken(_('Token has been revoked'))
+        return validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Needs the password hash, which snapshots leave out
+            return super().get_user(validated_token)
+        try:
+            user_id = get_user_model()._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        cache = UserSnapshotCache()
+        version = validated_token.get(VERSION_CLAIM)
+        # Checking the version takes a query of its own without the cache, as loading the user does
+        if (version is not None and getattr(settings, 'USER_SNAPSHOT_CACHE_ENABLED', True)
+                and version == cache.claims_version(user_id)):
+            return ClaimsUser(user_id, {field: validated_token.get(field) for field in CLAIM_FIELDS})
+
+        user = cache.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+
+def jwt_user(request):
+    """Return the user a request's JWT authenticates, or None if it has no valid one"""
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
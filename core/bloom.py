@@ -0,0 +1,43 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Bloom filter over a bit array sized for ``capacity`` values.
+
+    Membership tests never miss a value that was added, and wrongly report one
+    that was not with probability ``error_rate`` while the filter holds up to
+    ``capacity`` values (rising beyond it). At the defaults, 100,000 values at
+    a 0.1% error rate, a filter takes about 176 KiB.
+    """
+
+    DEFAULT_CAPACITY = 100000
+    DEFAULT_ERROR_RATE = 0.001
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError('capacity must be positive and error_rate between 0 and 1')
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit hashes
+        digest = hashlib.blake2b(str(value).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def __len__(self):
+        """Number of values added, counting repeats"""
+        return self.count
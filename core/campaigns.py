@@ -0,0 +1,138 @@
+"""
+Bulk email campaigns.
+
+A campaign is rendered once per language: its translated subject and body are
+rendered with a SendGrid substitution tag in place of each recipient field, so
+the HTML is built once and SendGrid fills in every recipient's values. Users
+are sent in batches of up to 1000 per API call, one personalization each,
+grouped by language and walked in id order. After every successful call the
+last user id sent for that language is saved on the campaign, so running it
+again after a crash or a failed batch resumes from the next user. A batch
+that was sent but not yet recorded when the process died is sent again.
+"""
+import logging
+import time
+from django.conf import settings
+from django.db.models import Q
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.utils import timezone, translation
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from .email_outbox import PermanentDeliveryError, get_backend
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# Recipient fields available to campaign bodies, as {{ field }}
+RECIPIENT_FIELDS = ('first_name', 'last_name', 'username')
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 5
+
+
+def substitution_tag(field):
+    return f'-{field}-'
+
+
+def render(campaign):
+    """
+    Render a campaign in the active language.
+
+    Returns:
+        tuple: (subject, html) with a substitution tag in place of every recipient field
+    """
+    tags = {field: substitution_tag(field) for field in RECIPIENT_FIELDS}
+    body = Template(campaign.body).render(Context(tags))
+    html = render_to_string('emails/campaign.html', {'subject': campaign.subject, 'body': mark_safe(body)})
+    return campaign.subject, html
+
+
+def recipients(campaign, language):
+    """Return the campaign's remaining recipients in ``language`` as a queryset ordered by id"""
+    queryset = User.objects.filter(is_active=True, language_preference=language).exclude(email='')
+    if campaign.membership_statuses:
+        queryset = queryset.filter(membership_status__in=campaign.membership_statuses)
+    # Users who turned off promotional email in their notification preferences; has_key
+    # keeps users without the preference, for whom the comparison alone is NULL
+    queryset = queryset.exclude(
+        Q(notification_preferences__has_key='promotions') & Q(notification_preferences__promotions=False)
+    )
+    return queryset.filter(id__gt=campaign.progress.get(language, 0)).order_by('id')
+
+
+def _send_with_retry(backend, subject, html, batch):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            backend.send_bulk(subject, html, batch)
+            return
+        except PermanentDeliveryError:
+            raise
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            delay = RETRY_DELAY * 2 ** (attempt - 1)
+            logger.warning('Campaign batch failed (attempt %s), retrying in %ss: %s', attempt, delay, e)
+            time.sleep(delay)
+
+
+def send_campaign(campaign, backend=None, batch_size=None):
+    """
+    Send a campaign, or resume it from its recorded progress.
+
+    Args:
+        campaign: The EmailCampaign to send
+        backend: Outbox backend to send with (defaults to email_outbox.get_backend())
+        batch_size: Recipients per API call (defaults to EMAIL_CAMPAIGN_BATCH_SIZE)
+
+    Returns:
+        int: Number of recipients sent in this run
+
+    Raises:
+        Exception: The error of a batch that still failed after retrying; the campaign
+                   is marked failed and keeps its progress
+    """
+    if campaign.status == 'C':
+        return 0
+    backend = backend or get_backend()
+    batch_size = min(
+        batch_size or getattr(settings, 'EMAIL_CAMPAIGN_BATCH_SIZE', 1000),
+        getattr(backend, 'MAX_RECIPIENTS', 1000)
+    )
+    campaign.status = 'R'
+    campaign.started_at = campaign.started_at or timezone.now()
+    campaign.last_error = ''
+    campaign.save(update_fields=['status', 'started_at', 'last_error'])
+
+    languages = campaign.languages or [code for code, _ in User.LANGUAGE_CHOICES]
+    sent = 0
+    backend.open()
+    try:
+        for language in languages:
+            with translation.override(language):
+                subject, html = render(campaign)
+                while True:
+                    users = list(recipients(campaign, language).values_list('id', 'email', *RECIPIENT_FIELDS)[:batch_size])
+                    if not users:
+                        break
+                    batch = [
+                        (email, {substitution_tag(field): escape(value) for field, value in zip(RECIPIENT_FIELDS, values)})
+                        for _, email, *values in users
+                    ]
+                    _send_with_retry(backend, subject, html, batch)
+                    campaign.progress[language] = users[-1][0]
+                    campaign.sent_count += len(users)
+                    campaign.save(update_fields=['progress', 'sent_count'])
+                    sent += len(users)
+    except Exception as e:
+        campaign.status = 'F'
+        campaign.last_error = f'{type(e).__name__}: {e}'
+        campaign.save(update_fields=['status', 'last_error'])
+        logger.error('Campaign %s failed after %s recipients: %s', campaign.pk, campaign.sent_count, campaign.last_error)
+        raise
+    finally:
+        backend.close()
+
+    campaign.status = 'C'
+    campaign.completed_at = timezone.now()
+    campaign.save(update_fields=['status', 'completed_at'])
+    return sent
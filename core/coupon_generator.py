@@ -0,0 +1,168 @@
+import hashlib
+import secrets
+from django.db import transaction
+from .models import Coupon
+
+
+class CouponCodeGenerator:
+    """
+    Utility class for generating large batches of single-use coupon codes.
+
+    Codes are produced by running a counter through a keyed Feistel permutation,
+    so every code within a run is unique without any lookups. Each chunk is still
+    checked against existing coupons before insert, because a new run uses a new key.
+    """
+
+    # Crockford-style alphabet without easily confused characters (0/O, 1/I/L, U)
+    ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+    ROUNDS = 4
+    DEFAULT_LENGTH = 10
+    DEFAULT_BATCH_SIZE = 5000
+
+    def __init__(self, prefix='', length=DEFAULT_LENGTH, key=None):
+        """
+        Args:
+            prefix: Fixed prefix prepended to every code
+            length: Number of random characters after the prefix
+            key: Permutation key (bytes); a fresh random key is used if omitted
+        """
+        if not isinstance(prefix, str):
+            raise ValueError('prefix must be a string')
+        if length < 1:
+            raise ValueError('length must be at least 1')
+        max_length = Coupon._meta.get_field('code').max_length
+        if len(prefix) + length > max_length:
+            raise ValueError(f'Coupon codes cannot be longer than {max_length} characters')
+
+        self.prefix = prefix.upper()
+        self.length = length
+        self.key = key or secrets.token_bytes(16)
+
+        # Size of the code space and the (even-width) Feistel domain covering it
+        self.domain = len(self.ALPHABET) ** length
+        bits = (self.domain - 1).bit_length()
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+
+        # Keyed round functions are set up once and copied per call
+        self._round_hashes = [
+            hashlib.blake2b(key=self.key, salt=round_number.to_bytes(16, 'big'), digest_size=8)
+            for round_number in range(self.ROUNDS)
+        ]
+
+    def _feistel(self, value):
+        left = value >> self.half_bits
+        right = value & self.half_mask
+        for round_hash in self._round_hashes:
+            h = round_hash.copy()
+            h.update(right.to_bytes(8, 'big'))
+            left, right = right, left ^ (int.from_bytes(h.digest(), 'big') & self.half_mask)
+        return (left << self.half_bits) | right
+
+    def permute(self, counter):
+        """
+        Map a counter to a unique position in the code space.
+
+        Cycle-walking keeps the permutation inside the domain when the
+        Feistel network is slightly wider than the alphabet allows.
+        """
+        if not 0 <= counter < self.domain:
+            raise ValueError('Counter is outside the code space')
+        value = self._feistel(counter)
+        while value >= self.domain:
+            value = self._feistel(value)
+        return value
+
+    def encode(self, value):
+        base = len(self.ALPHABET)
+        chars = []
+        for _ in range(self.length):
+            value, remainder = divmod(value, base)
+            chars.append(self.ALPHABET[remainder])
+        return self.prefix + ''.join(reversed(chars))
+
+    def iter_codes(self, start=0):
+        """Yield codes for consecutive counters starting at ``start``"""
+        for counter in range(start, self.domain):
+            yield self.encode(self.permute(counter))
+
+    def generate(self, template, count, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Create ``count`` single-use coupons copied from a template coupon.
+
+        Chunks are inserted with bulk_create(ignore_conflicts=True), so a code
+        taken by another run between the existence check and the insert is
+        skipped rather than failing the chunk, and fresh codes are drawn until
+        ``count`` coupons were created. Runs from the same template lock it per
+        chunk, so they cannot take each other's codes in that window. The template's
+        product, category and shop applicability is copied in bulk through
+        the M2M through tables.
+
+        Args:
+            template: The Coupon whose terms are copied
+            count: Number of coupons to create
+            batch_size: Number of coupons inserted per chunk
+
+        Returns:
+            int: The number of coupons created
+        """
+        if count > self.domain:
+            raise ValueError('Requested more codes than the code space can hold')
+
+        terms = {
+            'description': template.description,
+            'discount_type': template.discount_type,
+            'discount_value': template.discount_value,
+            'min_purchase_amount': template.min_purchase_amount,
+            'valid_from': template.valid_from,
+            'valid_until': template.valid_until,
+            'max_uses': 1,
+            'is_active': template.is_active,
+        }
+
+        # Related ids are loaded once and reused for every chunk
+        relations = []
+        for field_name in ('applies_to_products', 'applies_to_categories', 'applies_to_shops'):
+            m2m = Coupon._meta.get_field(field_name)
+            related_ids = list(getattr(template, field_name).values_list('id', flat=True))
+            if related_ids:
+                relations.append((
+                    m2m.remote_field.through,
+                    f'{m2m.m2m_field_name()}_id',
+                    f'{m2m.m2m_reverse_field_name()}_id',
+                    related_ids
+                ))
+
+        codes = self.iter_codes()
+        created = 0
+        while created < count:
+            chunk = []
+            for code in codes:
+                chunk.append(code)
+                if len(chunk) >= min(batch_size, count - created):
+                    break
+            if not chunk:
+                raise ValueError('Code space exhausted before all coupons were created')
+
+            with transaction.atomic():
+                Coupon.objects.select_for_update().filter(pk=template.pk).exists()
+                # Drop codes that collide with coupons from earlier runs
+                existing = set(Coupon.objects.filter(code__in=chunk).values_list('code', flat=True))
+                chunk = [code for code in chunk if code not in existing]
+                Coupon.objects.bulk_create(
+                    [Coupon(code=code, **terms) for code in chunk],
+                    batch_size=batch_size, ignore_conflicts=True
+                )
+                # A code another template's run inserted first was skipped and does not carry
+                # these terms; it is left out here and the loop draws a replacement
+                coupon_ids = list(Coupon.objects.filter(code__in=chunk, **terms).values_list('id', flat=True))
+                for through, coupon_column, related_column, related_ids in relations:
+                    through.objects.bulk_create([
+                        through(**{coupon_column: coupon_id, related_column: related_id})
+                        for coupon_id in coupon_ids
+                        for related_id in related_ids
+                    ], batch_size=batch_size, ignore_conflicts=True)
+
+            created += len(coupon_ids)
+
+        return created
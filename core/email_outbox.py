@@ -0,0 +1,267 @@
+"""
+Durable email outbox.
+
+Request handlers call ``enqueue`` instead of talking to the mail provider, so
+the email is a row written in the same transaction as the change that caused
+it and the request never waits on the network. The ``send_outbox_emails``
+management command drains the table in batches through one backend instance
+(one SendGrid client or one SMTP connection per batch), retrying failures with
+exponential backoff and dead-lettering messages that keep failing.
+
+A batch is claimed by bumping each row's attempt count and pushing its next
+attempt into the future in a short ``SELECT ... FOR UPDATE SKIP LOCKED``
+transaction, so several workers can run at once, and a worker that dies
+mid-batch only delays its messages until the backoff expires.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from python_http_client.exceptions import HTTPError
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail, Personalization, Substitution, To
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentDeliveryError(Exception):
+    """A delivery failure that retrying will not fix; the message is dead-lettered at once"""
+
+
+class SendGridBackend:
+    """Delivers through the SendGrid API with one client reused for the life of the process"""
+
+    # SendGrid accepts at most this many personalizations per request
+    MAX_RECIPIENTS = 1000
+    _client = None
+
+    @classmethod
+    def client(cls):
+        if cls._client is None:
+            cls._client = SendGridAPIClient(settings.SENDGRID_API_KEY)
+        return cls._client
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, email):
+        message = Mail(
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to_emails=email.to_email,
+            subject=email.subject,
+            html_content=email.html_body or None,
+            plain_text_content=email.text_body or None
+        )
+        self._post(message)
+
+    def send_bulk(self, subject, html_body, recipients):
+        """
+        Send one message to many recipients in a single API call.
+
+        Args:
+            recipients: (email, substitutions) pairs, at most MAX_RECIPIENTS; each
+                        recipient gets their own personalization with the
+                        substitution tags in ``html_body`` replaced by their values
+        """
+        message = Mail(from_email=settings.DEFAULT_FROM_EMAIL, subject=subject, html_content=html_body)
+        for to_email, substitutions in recipients:
+            personalization = Personalization()
+            personalization.add_to(To(to_email))
+            for tag, value in substitutions.items():
+                personalization.add_substitution(Substitution(tag, value))
+            message.add_personalization(personalization)
+        self._post(message)
+
+    def _post(self, message):
+        try:
+            self.client().send(message)
+        except HTTPError as e:
+            # Rejected requests (bad address, bad payload) fail the same way every time
+            if 400 <= e.status_code < 500 and e.status_code != 429:
+                raise PermanentDeliveryError(f'{e.status_code}: {e.body}') from e
+            raise
+
+
+class DjangoMailBackend:
+    """
+    Delivers through Django's EMAIL_BACKEND over a single connection per batch.
+    Use it with the console, file-based or locmem email backends in development and tests.
+    """
+
+    MAX_RECIPIENTS = 1000
+
+    def __init__(self):
+        self.connection = get_connection(fail_silently=False)
+
+    def open(self):
+        self.connection.open()
+
+    def close(self):
+        self.connection.close()
+
+    def send(self, email):
+        message = EmailMultiAlternatives(
+            subject=email.subject,
+            body=email.text_body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email.to_email],
+            connection=self.connection
+        )
+        if email.html_body:
+            message.attach_alternative(email.html_body, 'text/html')
+        message.send()
+
+    def send_bulk(self, subject, html_body, recipients):
+        """Send one message per recipient, applying the substitutions locally (see SendGridBackend.send_bulk)"""
+        messages = []
+        for to_email, substitutions in recipients:
+            body = html_body
+            for tag, value in substitutions.items():
+                body = body.replace(tag, value)
+            message = EmailMessage(
+                subject=subject,
+                body=body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[to_email],
+                connection=self.connection
+            )
+            message.content_subtype = 'html'
+            messages.append(message)
+        self.connection.send_messages(messages)
+
+
+def get_backend():
+    """Return an instance of the EMAIL_OUTBOX_BACKEND class"""
+    path = getattr(settings, 'EMAIL_OUTBOX_BACKEND', 'core.email_outbox.SendGridBackend')
+    return import_string(path)()
+
+
+def enqueue(to_email, subject, html_body='', text_body=''):
+    """
+    Queue an email for delivery by the outbox worker.
+
+    The row is written on the caller's connection, so it is committed or
+    rolled back together with the surrounding transaction.
+
+    Returns:
+        OutboxEmail: The queued message
+    """
+    return OutboxEmail.objects.create(
+        to_email=to_email, subject=subject, html_body=html_body, text_body=text_body
+    )
+
+
+def enqueue_many(emails):
+    """
+    Queue many emails with one insert.
+
+    Args:
+        emails: (to_email, subject, html_body) tuples, e.g. from core.email_templates.render_many
+
+    Returns:
+        list: The queued OutboxEmail rows
+    """
+    return OutboxEmail.objects.bulk_create(
+        OutboxEmail(to_email=to_email, subject=subject, html_body=html_body)
+        for to_email, subject, html_body in emails
+    )
+
+
+def retry_delay(attempts):
+    """Return the wait before the next attempt after ``attempts`` attempts"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    cap = getattr(settings, 'EMAIL_OUTBOX_MAX_RETRY_DELAY', 60 * 60 * 6)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def claim_batch(batch_size, now=None):
+    """
+    Claim up to ``batch_size`` due messages for this worker.
+
+    Each claimed row counts as one attempt and is not due again until its
+    backoff has passed, so other workers skip it while it is being sent.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='P', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for email in batch:
+            email.attempts += 1
+            email.next_attempt_at = now + retry_delay(email.attempts)
+        OutboxEmail.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def _record_failure(email, error, max_attempts, result):
+    email.last_error = f'{type(error).__name__}: {error}'
+    if isinstance(error, PermanentDeliveryError) or email.attempts >= max_attempts:
+        email.status = 'D'
+        result['dead'] += 1
+        logger.error('Dead-lettered email %s to %s: %s', email.pk, email.to_email, email.last_error)
+    else:
+        result['retry'] += 1
+        logger.warning('Email %s to %s failed (attempt %s): %s',
+                       email.pk, email.to_email, email.attempts, email.last_error)
+    email.save(update_fields=['status', 'last_error'])
+
+
+def deliver_batch(batch_size=None, backend=None):
+    """
+    Claim and send one batch of due messages.
+
+    Args:
+        batch_size: Maximum number of messages (defaults to EMAIL_OUTBOX_BATCH_SIZE)
+        backend: Backend instance to send with (defaults to get_backend())
+
+    Returns:
+        dict: Number of messages 'sent', scheduled for 'retry' and moved to 'dead'
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+    result = {'sent': 0, 'retry': 0, 'dead': 0}
+
+    batch = claim_batch(batch_size)
+    if not batch:
+        return result
+
+    backend = backend or get_backend()
+    sent = []
+    try:
+        backend.open()
+    except Exception as e:
+        # Nothing in the batch can be sent; count it as a failed attempt for every message
+        for email in batch:
+            _record_failure(email, e, max_attempts, result)
+        return result
+    try:
+        for email in batch:
+            try:
+                backend.send(email)
+            except Exception as e:
+                _record_failure(email, e, max_attempts, result)
+            else:
+                sent.append(email.pk)
+    finally:
+        backend.close()
+
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(status='S', sent_at=timezone.now(), last_error='')
+        result['sent'] = len(sent)
+    return result
+
+
+def requeue(queryset):
+    """Move dead-lettered messages back to pending with a fresh attempt count"""
+    return queryset.filter(status='D').update(
+        status='P', attempts=0, next_attempt_at=timezone.now(), last_error=''
+    )
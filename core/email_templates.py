@@ -0,0 +1,97 @@
+"""
+Localized transactional emails.
+
+Every message type has a subject and an HTML template per language, e.g.
+emails/ta/order_confirmation_subject.txt and emails/ta/order_confirmation.html,
+and falls back to English for languages without one. A template pair is
+loaded and compiled once per process and kept, and each email is rendered
+with its recipient's language_preference active, so translated model fields
+and date formats follow the language too.
+
+``render_many`` renders a batch of messages of one type. The objects and
+everything their templates use are loaded together, with the same number of
+queries however many messages there are.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from django.db.models import Prefetch
+from django.template.loader import select_template
+from django.utils import translation
+from .models import Booking, Order, OrderItem, Payment, UserMembership
+
+DEFAULT_LANGUAGE = 'en'
+
+Email = namedtuple('Email', 'to_email subject html')
+MessageType = namedtuple('MessageType', 'model related context')
+
+MESSAGE_TYPES = {
+    'booking_confirmation': MessageType(
+        Booking,
+        lambda queryset: queryset.select_related('user', 'service_type', 'service_provider'),
+        lambda booking: {'booking': booking},
+    ),
+    'order_confirmation': MessageType(
+        Order,
+        lambda queryset: queryset.select_related('user').prefetch_related(
+            Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product').order_by('id'))
+        ),
+        lambda order: {'order': order, 'items': order.orderitem_set.all()},
+    ),
+    'payment_confirmation': MessageType(
+        Payment,
+        lambda queryset: queryset.select_related('user'),
+        # Amounts are stored in paise
+        lambda payment: {'payment': payment, 'amount': payment.amount / 100},
+    ),
+    'membership_confirmation': MessageType(
+        UserMembership,
+        lambda queryset: queryset.select_related('user', 'membership'),
+        lambda user_membership: {'user_membership': user_membership, 'membership': user_membership.membership},
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def templates(message_type, language):
+    """Return the compiled (subject, html) templates of a message type in a language"""
+    languages = [language, DEFAULT_LANGUAGE] if language != DEFAULT_LANGUAGE else [language]
+    return (
+        select_template([f'emails/{code}/{message_type}_subject.txt' for code in languages]),
+        select_template([f'emails/{code}/{message_type}.html' for code in languages]),
+    )
+
+
+def _render(message_type, instance):
+    user = instance.user
+    language = user.language_preference or DEFAULT_LANGUAGE
+    subject_template, html_template = templates(message_type, language)
+    context = {'user': user, 'language': language, **MESSAGE_TYPES[message_type].context(instance)}
+    with translation.override(language):
+        # Subjects are one line, whatever the template's line breaks
+        subject = ' '.join(subject_template.render(context).split())
+        html = html_template.render({**context, 'subject': subject})
+    return Email(user.email, subject, html)
+
+
+def render_many(message_type, objects):
+    """
+    Render one message type for many objects.
+
+    Args:
+        message_type: A key of MESSAGE_TYPES, e.g. 'order_confirmation'
+        objects: Instances or primary keys of the message type's model
+
+    Returns:
+        list: Email tuples (to_email, subject, html) in the order of ``objects``,
+        skipping objects that no longer exist
+    """
+    spec = MESSAGE_TYPES[message_type]
+    pks = [getattr(obj, 'pk', obj) for obj in objects]
+    loaded = spec.related(spec.model.objects.filter(pk__in=pks)).in_bulk()
+    return [_render(message_type, loaded[pk]) for pk in pks if pk in loaded]
+
+
+def render(message_type, obj):
+    """Render one message; returns an Email tuple, or None if the object no longer exists"""
+    emails = render_many(message_type, [obj])
+    return emails[0] if emails else None
@@ -0,0 +1,83 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality sketch with 2**precision one-byte registers.
+
+    Sketches with the same precision can be merged by taking the register-wise
+    maximum, so per-day sketches combine into a distinct count for any range of
+    days. The relative standard error of an estimate is 1.04 / sqrt(2**precision),
+    about 1.6% at the default precision of 12 (4 KiB per sketch).
+    """
+
+    DEFAULT_PRECISION = 12
+    _INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be between 4 and 16')
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is None:
+            self.registers = bytearray(self.size)
+        else:
+            if len(registers) != self.size:
+                raise ValueError(f'expected {self.size} registers, got {len(registers)}')
+            self.registers = bytearray(registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load a sketch serialized with ``to_bytes``; the precision is implied by its length"""
+        return cls(precision=len(data).bit_length() - 1, registers=data)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def error_bound(cls, precision=DEFAULT_PRECISION):
+        """Relative standard error of an estimate at the given precision"""
+        return 1.04 / math.sqrt(1 << precision)
+
+    def position(self, value):
+        """
+        Return the (register index, rank) that ``value`` maps to.
+
+        Exposed so callers can check whether adding a value would change a
+        stored sketch before taking a lock on it.
+        """
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        remaining_bits = 64 - self.precision
+        index = hashed >> remaining_bits
+        rest = hashed & ((1 << remaining_bits) - 1)
+        return index, remaining_bits - rest.bit_length() + 1
+
+    def add(self, value):
+        """Add a value; returns True if the sketch changed"""
+        index, rank = self.position(value)
+        if self.registers[index] >= rank:
+            return False
+        self.registers[index] = rank
+        return True
+
+    def merge(self, other):
+        """Merge another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError('cannot merge sketches with different precisions')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Estimate the number of distinct values added"""
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        inverse_powers = self._INVERSE_POWERS
+        estimate = alpha * m * m / sum(inverse_powers[rank] for rank in self.registers)
+        if estimate <= 2.5 * m:
+            # Small-range correction (linear counting)
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -0,0 +1,222 @@
+"""
+Throttling of password logins.
+
+LoginView, CreateTokenView and the JWT token view check passwords with
+PBKDF2, which is slow by design, so a burst of credential stuffing can keep
+every worker busy hashing. ``LoginRateThrottle`` runs before those views'
+handlers: each attempt takes a token from two buckets, one for the client IP
+and one for the account named in the request (username or email). When
+either bucket is empty the attempt is answered with 429 and Retry-After
+before the user is looked up or any hash is computed.
+
+Buckets are kept by the configured backend:
+
+- LocalBackend keeps exact token buckets in this process's memory. Each
+  worker process throttles on its own, so the effective limit grows with the
+  number of workers.
+- CacheBackend keeps them in a Django cache that all processes share. Shared
+  caches offer atomic increments but no compare-and-set, so each bucket is
+  approximated by a sliding-window counter: ``capacity`` attempts per
+  ``capacity / rate`` seconds, counted in two fixed windows weighted by their
+  overlap with the sliding one. With the default LocMem cache it is a local
+  stand-in for a shared Redis or Memcached.
+
+The client IP is REMOTE_ADDR. X-Forwarded-For is set by the client unless a
+proxy overwrites it, so it is only read when LOGIN_THROTTLE_NUM_PROXIES says
+how many trusted proxies append to it; the address the outermost of them saw
+is then used.
+
+Set LOGIN_THROTTLE_BACKEND to the backend's dotted path and
+LOGIN_THROTTLE_RATES to each scope's bucket capacity and refill rate. The
+backend also counts allowed and throttled attempts; ``stats`` returns them
+for dashboards (see LoginThrottleStatsView).
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+SCOPES = ('ip', 'account')
+COUNTERS = ('allowed',) + tuple(f'throttled_{scope}' for scope in SCOPES)
+DEFAULT_RATES = {'ip': (60, 30), 'account': (10, 5)}
+
+
+class LocalBackend:
+    """Token buckets in this process's memory"""
+
+    # Full buckets are dropped once there are more than this many
+    MAX_BUCKETS = 100000
+
+    def __init__(self):
+        self._buckets = {}
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, per_second):
+        """Take a token from a bucket; returns 0 if one was taken, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * per_second)
+            wait = 0 if tokens >= 1 else (1 - tokens) / per_second
+            if not wait:
+                tokens -= 1
+            # Stored with the time it will be full again
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / per_second)
+            if len(self._buckets) > self.MAX_BUCKETS:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now):
+        # Buckets that have refilled are indistinguishable from missing ones
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+
+    def increment(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def counters(self):
+        with self._lock:
+            return {name: self._counters[name] for name in COUNTERS}
+
+
+class CacheBackend:
+    """Sliding-window counters in a shared Django cache (LOGIN_THROTTLE_CACHE_ALIAS)"""
+
+    PREFIX = 'login-throttle'
+
+    def __init__(self, cache=None):
+        self.cache = cache or caches[getattr(settings, 'LOGIN_THROTTLE_CACHE_ALIAS', 'default')]
+
+    def take(self, key, capacity, per_second):
+        """Count an attempt; returns 0 if it fits the window, else seconds until one would"""
+        window = capacity / per_second
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+        current_key = f'{self.PREFIX}:{key}:{index}'
+        # Kept for two windows, while it is the current or the previous one
+        timeout = int(window * 2) + 1
+        self.cache.add(current_key, 0, timeout)
+        try:
+            count = self.cache.incr(current_key)
+        except ValueError:
+            # Evicted between add and incr
+            self.cache.add(current_key, 1, timeout)
+            count = 1
+        previous = self.cache.get(f'{self.PREFIX}:{key}:{index - 1}', 0)
+        weight = 1 - elapsed / window
+        if previous * weight + count <= capacity:
+            return 0
+        # Rejected attempts do not count, as they take no token from a bucket
+        try:
+            self.cache.decr(current_key)
+        except ValueError:
+            pass
+        count -= 1
+        if previous and count < capacity:
+            # The previous window's share shrinks until one more attempt fits
+            return max(window * (1 - (capacity - count - 1) / previous) - elapsed, 0.001)
+        return window - elapsed
+
+    def increment(self, name):
+        key = f'{self.PREFIX}:counter:{name}'
+        self.cache.add(key, 0, None)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr
+            self.cache.add(key, 1, None)
+
+    def counters(self):
+        values = self.cache.get_many([f'{self.PREFIX}:counter:{name}' for name in COUNTERS])
+        return {name: values.get(f'{self.PREFIX}:counter:{name}', 0) for name in COUNTERS}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide LOGIN_THROTTLE_BACKEND instance"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(getattr(settings, 'LOGIN_THROTTLE_BACKEND', 'core.login_throttle.LocalBackend'))()
+        return _backend
+
+
+def _rates():
+    rates = {**DEFAULT_RATES, **getattr(settings, 'LOGIN_THROTTLE_RATES', {})}
+    # Configured as (capacity, refills per minute)
+    return {scope: (capacity, per_minute / 60) for scope, (capacity, per_minute) in rates.items()}
+
+
+def account_key(identifier):
+    """Return the bucket key of an account identifier; usernames and emails are matched case-insensitively"""
+    return hashlib.sha256(identifier.strip().lower().encode()).hexdigest()[:32]
+
+
+def client_ip(request):
+    """Return the client address of a request, trusting X-Forwarded-For only as far as LOGIN_THROTTLE_NUM_PROXIES"""
+    num_proxies = getattr(settings, 'LOGIN_THROTTLE_NUM_PROXIES', 0)
+    if num_proxies:
+        # Each proxy appends the address it received the request from
+        addresses = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        addresses = [address for address in addresses if address]
+        if addresses:
+            return addresses[-min(num_proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR')
+
+
+def check(ip, account=None):
+    """
+    Take a token for a login attempt from the IP's and the account's buckets.
+
+    Args:
+        ip: Client address
+        account: Username or email the attempt is for, if any
+
+    Returns:
+        float: None if the attempt may proceed, else seconds to wait before retrying
+    """
+    backend = get_backend()
+    rates = _rates()
+    keys = {'ip': f'ip:{ip}'}
+    if account:
+        keys['account'] = f'account:{account_key(account)}'
+    for scope, key in keys.items():
+        wait = backend.take(key, *rates[scope])
+        if wait:
+            backend.increment(f'throttled_{scope}')
+            return wait
+    backend.increment('allowed')
+    return None
+
+
+def stats():
+    """Return the backend's attempt counters"""
+    backend = get_backend()
+    return {'backend': f'{type(backend).__module__}.{type(backend).__name__}', 'counters': backend.counters()}
+
+
+class LoginRateThrottle(BaseThrottle):
+    """DRF throttle applying ``check`` to views that take a password"""
+
+    ACCOUNT_FIELDS = ('username', 'email')
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if not getattr(settings, 'LOGIN_THROTTLE_ENABLED', True) or request.method != 'POST':
+            return True
+        data = request.data if hasattr(request.data, 'get') else {}
+        account = next((str(data[field]) for field in self.ACCOUNT_FIELDS if data.get(field)), None)
+        self.retry_after = check(client_ip(request), account)
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
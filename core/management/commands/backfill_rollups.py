@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from core.analytics_rollups import ROLLUP_SPECS, rebuild
+from core import active_users
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily analytics rollup tables and active-user sketches from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='First day to rebuild (YYYY-MM-DD); defaults to all history')
+        parser.add_argument('--end-date', help='Last day to rebuild (YYYY-MM-DD); defaults to all history')
+
+    def handle(self, *args, **options):
+        start_date = parse_date(options['start_date']) if options['start_date'] else None
+        end_date = parse_date(options['end_date']) if options['end_date'] else None
+        if (options['start_date'] and not start_date) or (options['end_date'] and not end_date):
+            raise CommandError('Dates must be in YYYY-MM-DD format')
+
+        for spec in ROLLUP_SPECS:
+            rows = rebuild(spec, start_date=start_date, end_date=end_date)
+            self.stdout.write(f'{spec.rollup.__name__}: {rows} rows')
+        days = active_users.rebuild(start_date=start_date, end_date=end_date)
+        self.stdout.write(f'DailyActiveUserSketch: {days} rows')
+        self.stdout.write(self.style.SUCCESS('Rollups rebuilt'))
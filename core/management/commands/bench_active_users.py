@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from core.models import User
+from core.active_users import count_active_users
+
+
+class Command(BaseCommand):
+    help = 'Compare sketch-based active-user counts with the exact distinct query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Size of the window ending today')
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start_date = today - timedelta(days=options['days'])
+        since = timezone.now() - timedelta(days=options['days'])
+        iterations = options['iterations']
+
+        exact, exact_time = self._measure(iterations, lambda: User.objects.filter(
+            Q(booking__created_at__gte=since) | Q(order__created_at__gte=since)
+        ).distinct().count())
+        (estimate, error_bound), sketch_time = self._measure(
+            iterations, lambda: count_active_users(start_date, today)
+        )
+
+        error = abs(estimate - exact) / exact if exact else 0
+        self.stdout.write(f'     exact query: {exact} users in {exact_time * 1000:.1f} ms')
+        self.stdout.write(f'   merged sketch: {estimate} users in {sketch_time * 1000:.1f} ms')
+        self.stdout.write(f'  relative error: {error:.2%} (standard error {error_bound:.2%})')
+        if sketch_time:
+            self.stdout.write(self.style.SUCCESS(f'Speedup: {exact_time / sketch_time:.1f}x'))
+
+    def _measure(self, iterations, query):
+        result = query()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            query()
+        return result, (time.perf_counter() - started) / iterations
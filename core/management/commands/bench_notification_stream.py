@@ -0,0 +1,140 @@
+import asyncio
+import resource
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from core.models import User
+from core import notification_counters
+from core.realtime import BROADCAST, broker
+
+
+def _rss_kib():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class StreamClient:
+    """Drives one SSE request through the ASGI application in this process"""
+
+    def __init__(self, application, host, token):
+        self.application = application
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/notifications/stream/',
+            'raw_path': b'/api/notifications/stream/', 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', host.encode()), (b'authorization', f'Bearer {token}'.encode())],
+            'client': ('127.0.0.1', 0), 'server': (host, 80),
+        }
+        self.status = None
+        self.connected = asyncio.Event()
+        self.received = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self.sent_request = False
+        self.ended = False
+        self.task = None
+
+    async def receive(self):
+        if not self.sent_request:
+            self.sent_request = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            if self.status != 200:
+                self.connected.set()
+        elif message['type'] == 'http.response.body':
+            body = message.get('body', b'')
+            if b'event: unread' in body:
+                self.connected.set()
+            elif b'event: bench' in body:
+                self.received.set()
+            if not message.get('more_body', False):
+                # The stream ended early; count it as a failed connection
+                self.ended = True
+                self.connected.set()
+                self.received.set()
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.application(self.scope, self.receive, self.send))
+
+
+class Command(BaseCommand):
+    help = 'Hold idle notification stream connections against the in-process ASGI application'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=1000, help='Connections are spread over this many users')
+        parser.add_argument('--wave', type=int, default=500, help='Connections opened concurrently')
+
+    def handle(self, *args, **options):
+        connections = options['connections']
+        user_count = min(options['users'], connections)
+        prefix = 'bench-stream-'
+        User.objects.filter(username__startswith=prefix).delete()
+        User.objects.bulk_create(
+            User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com') for i in range(user_count)
+        )
+        users = list(User.objects.filter(username__startswith=prefix))
+        # Create the unread counters up front; this measures idle connections, not counter creation
+        for user in users:
+            notification_counters.unread_count(user)
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        try:
+            asyncio.run(self._run(connections, tokens, host, options['wave']))
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+    async def _run(self, connections, tokens, host, wave):
+        from service_app.asgi import application
+        # One connection first, so one-off start-up allocations are not counted per connection
+        warm_up = StreamClient(application, host, tokens[0])
+        warm_up.start()
+        await warm_up.connected.wait()
+        warm_up.disconnected.set()
+        await warm_up.task
+        rss_before = _rss_kib()
+        clients = []
+        started = time.perf_counter()
+        for offset in range(0, connections, wave):
+            batch = [StreamClient(application, host, tokens[i % len(tokens)]) for i in range(offset, min(offset + wave, connections))]
+            for client in batch:
+                client.start()
+            await asyncio.gather(*(client.connected.wait() for client in batch))
+            clients.extend(batch)
+        connect_time = time.perf_counter() - started
+        failed = [client for client in clients if client.status != 200 or client.ended]
+        if failed:
+            for client in clients:
+                client.disconnected.set()
+            raise CommandError(f'{len(failed)} connections failed (status {failed[0].status})')
+
+        # Let the streams settle into their idle wait
+        await asyncio.sleep(0.5)
+        rss_after = _rss_kib()
+        open_count = broker.connection_count()
+
+        started = time.perf_counter()
+        broker.deliver(BROADCAST, {'type': 'bench', 'id': None, 'data': {}})
+        await asyncio.gather(*(client.received.wait() for client in clients))
+        fan_out_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for client in clients:
+            client.disconnected.set()
+        await asyncio.gather(*(client.task for client in clients))
+        close_time = time.perf_counter() - started
+
+        self.stdout.write(f'     connections: {open_count} open ({connections / connect_time:.0f}/s to connect)')
+        self.stdout.write(f'          memory: {(rss_after - rss_before) / 1024:.1f} MiB '
+                          f'({(rss_after - rss_before) / connections:.1f} KiB per connection)')
+        self.stdout.write(f'  broadcast event: delivered to all in {fan_out_time * 1000:.0f} ms')
+        self.stdout.write(f'      disconnect: {close_time * 1000:.0f} ms, {broker.connection_count()} left open')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from core.models import Notification, User
+from core.pagination import keyset_filter
+
+ORDERING = ('-created_at', '-id')
+
+
+class Command(BaseCommand):
+    help = 'Compare keyset and OFFSET page fetch times at increasing depths of the notifications list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20, help='Fetches timed per depth')
+
+    def handle(self, *args, **options):
+        rows, page_size = options['rows'], options['page_size']
+        user, _ = User.objects.get_or_create(username='bench-pagination', defaults={'email': 'bench-pagination@example.com'})
+        self._delete(user)
+        now = timezone.now()
+        # Created directly so created_at can be spread out (auto_now_add would set it), and without signals
+        Notification.objects.bulk_create(
+            (Notification(user=user, message=f'Bench {i}', notification_type='bench') for i in range(rows)),
+            batch_size=5000,
+        )
+        ids = list(Notification.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+        for start in range(0, len(ids), 5000):
+            # Three rows per second, so pages cross ties in created_at
+            Notification.objects.filter(id__in=ids[start:start + 5000]).update(created_at=now - timedelta(seconds=start // 3))
+        try:
+            queryset = Notification.objects.filter(user=user).order_by(*ORDERING)
+            for depth in (0, rows // 100, rows // 10, rows // 2, rows - page_size):
+                anchor = queryset.values_list('created_at', 'id')[depth - 1] if depth else None
+                keyset = self._time(lambda: list(
+                    queryset.filter(keyset_filter(ORDERING, anchor))[:page_size] if anchor else queryset[:page_size]
+                ), options['repeat'])
+                offset = self._time(lambda: list(queryset[depth:depth + page_size]), options['repeat'])
+                self.stdout.write(f'  row {depth:>8}: keyset {keyset * 1000:7.2f} ms   offset {offset * 1000:7.2f} ms')
+        finally:
+            self._delete(user)
+            user.delete()
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    @staticmethod
+    def _delete(user):
+        # A plain DELETE; QuerySet.delete() would send post_delete for every row
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(Notification._meta.db_table)} WHERE user_id = %s',
+                           [user.pk])
+
+    @staticmethod
+    def _time(fetch, repeat):
+        fetch()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fetch()
+        return (time.perf_counter() - started) / repeat
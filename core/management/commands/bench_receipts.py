@@ -0,0 +1,68 @@
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Order, OrderItem, Payment
+from django.db.models import Prefetch
+from core.receipt_generator import ReceiptGenerator, ReceiptTemplate
+
+
+class Command(BaseCommand):
+    help = 'Measure per-receipt CPU time and allocations with and without the shared receipt template'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order-id', type=int, help='Order to render (defaults to the first order with a payment)')
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--logo', help='Logo image to use instead of STATIC_ROOT/images/logo.png')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.select_related('user').prefetch_related(
+            Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product'))
+        ).filter(payment__isnull=False)
+        if options['order_id']:
+            orders = orders.filter(pk=options['order_id'])
+        order = orders.first()
+        if order is None:
+            raise CommandError('No order with a payment to render')
+        payment = Payment.objects.filter(order=order).first()
+
+        # Load the order's relations once so only rendering is measured
+        list(order.orderitem_set.all())
+        iterations = options['iterations']
+        logo = options['logo']
+
+        # "Before": styles, table styles and logo rebuilt for every receipt
+        before = self._measure(iterations, lambda: ReceiptGenerator.generate_order_receipt(
+            order, payment, template=ReceiptTemplate(logo_path=logo)
+        ))
+
+        # "After": one template reused for every receipt
+        shared = ReceiptTemplate(logo_path=logo)
+        after = self._measure(iterations, lambda: ReceiptGenerator.generate_order_receipt(
+            order, payment, template=shared
+        ))
+
+        for label, (cpu, peak) in (('per-call template', before), ('shared template', after)):
+            self.stdout.write(f'{label:>18}: {cpu * 1000:.2f} ms CPU, {peak / 1024:.1f} KiB peak allocations per receipt')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {before[0] / after[0]:.2f}x CPU time'))
+
+    def _measure(self, iterations, render):
+        # Warm up imports and font caches before measuring
+        render()
+
+        started = time.process_time()
+        for _ in range(iterations):
+            render()
+        cpu = (time.process_time() - started) / iterations
+
+        # Peak traced memory is measured separately because tracing slows rendering down
+        runs = min(iterations, 20)
+        peak_total = 0
+        tracemalloc.start()
+        for _ in range(runs):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            render()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - baseline
+        tracemalloc.stop()
+        return cpu, peak_total / runs
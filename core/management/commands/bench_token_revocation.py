@@ -0,0 +1,60 @@
+import time
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from core.models import RevokedToken
+from core.token_revocation import is_revoked, revocations
+
+
+class Command(BaseCommand):
+    help = 'Compare the revocation check through the in-memory filter with an exact lookup per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--revoked', type=int, default=50000, help='Revocations stored')
+        parser.add_argument('--checks', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        prefix = 'bench-revocation-'
+        expires_at = timezone.now() + timedelta(minutes=30)
+        RevokedToken.objects.filter(jti__startswith=prefix).delete()
+        RevokedToken.objects.bulk_create(
+            (RevokedToken(jti=f'{prefix}{uuid.uuid4().hex}', expires_at=expires_at) for _ in range(options['revoked'])),
+            batch_size=5000,
+        )
+        try:
+            started = time.perf_counter()
+            revocations.sync(force=True)
+            sync_time = time.perf_counter() - started
+            tokens = []
+            for _ in range(options['checks']):
+                token = AccessToken()
+                token['exp'] = int(expires_at.timestamp())
+                tokens.append(token)
+
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for token in tokens:
+                    is_revoked(token)
+                filtered_time = time.perf_counter() - started
+            filtered_queries = len(queries)
+            false_positives = sum(revocations.might_contain(token['jti'], token['exp']) for token in tokens)
+            started = time.perf_counter()
+            for token in tokens:
+                RevokedToken.objects.filter(jti=token['jti']).exists()
+            exact_time = time.perf_counter() - started
+            stats = revocations.stats()
+        finally:
+            RevokedToken.objects.filter(jti__startswith=prefix).delete()
+
+        checks = options['checks']
+        self.stdout.write(f'   initial sync: {stats["added"]} revocations in {sync_time * 1000:.0f} ms, '
+                          f'{stats["bytes"] / 1024:.0f} KiB in {stats["filters"]} filter(s)')
+        self.stdout.write(f'    with filter: {checks / filtered_time:.0f} checks/s, '
+                          f'{filtered_queries / checks:.4f} queries per check ({false_positives} false positives)')
+        self.stdout.write(f'   exact lookup: {checks / exact_time:.0f} checks/s, 1 query per check')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {exact_time / filtered_time:.1f}x'))
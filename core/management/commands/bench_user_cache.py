@@ -0,0 +1,61 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from core.models import User
+from core.serializers import UserClaimsTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare API request throughput with and without the user snapshot cache and token claims'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100, help='Requests are spread over this many users')
+
+    def handle(self, *args, **options):
+        prefix = 'bench-user-cache-'
+        User.objects.filter(username__startswith=prefix).delete()
+        User.objects.bulk_create(
+            User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', language_preference='ta',
+                 notification_preferences={'promotions': True, 'orders': True, 'bookings': True})
+            for i in range(options['users'])
+        )
+        try:
+            tokens = [str(UserClaimsTokenObtainPairSerializer.get_token(user).access_token) for user in User.objects.filter(username__startswith=prefix)]
+            # A cheap authenticated endpoint, so authentication is a visible share of the request
+            path = reverse('notification-unread-count')
+            host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+            client = Client(HTTP_HOST=host)
+            results = {}
+            for enabled in (False, True):
+                with override_settings(USER_SNAPSHOT_CACHE_ENABLED=enabled):
+                    results[enabled] = self._measure(client, path, tokens, options['requests'])
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+        for enabled, label in ((False, 'without cache'), (True, '   with cache')):
+            rate, queries = results[enabled]
+            self.stdout.write(f'  {label}: {rate:.0f} requests/s, {queries:.2f} queries per request')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {results[True][0] / results[False][0]:.2f}x'))
+
+    def _measure(self, client, path, tokens, requests):
+        # One request per user first, so the cached run measures hits rather than first loads
+        for token in tokens:
+            self._get(client, path, token)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for i in range(requests):
+                self._get(client, path, tokens[i % len(tokens)])
+            elapsed = time.perf_counter() - started
+        return requests / elapsed, len(queries) / requests
+
+    @staticmethod
+    def _get(client, path, token):
+        response = client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+        if response.status_code != 200:
+            raise CommandError(f'{path} returned {response.status_code}')
+        return response
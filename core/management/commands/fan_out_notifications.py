@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import NotificationBroadcast
+from core.notification_fanout import fan_out
+
+
+class Command(BaseCommand):
+    help = 'Finish notification broadcasts whose fan-out was interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('broadcast_ids', nargs='*', help='Broadcasts to fan out; defaults to every unfinished one')
+
+    def handle(self, *args, **options):
+        broadcasts = NotificationBroadcast.objects.filter(completed_at__isnull=True)
+        if options['broadcast_ids']:
+            broadcasts = NotificationBroadcast.objects.filter(broadcast_id__in=options['broadcast_ids'])
+            missing = set(options['broadcast_ids']) - set(broadcasts.values_list('broadcast_id', flat=True))
+            if missing:
+                raise CommandError(f"Unknown broadcasts: {', '.join(sorted(missing))}")
+
+        for broadcast in broadcasts.order_by('created_at'):
+            created = fan_out(broadcast)
+            self.stdout.write(f'{broadcast.broadcast_id}: {created} notifications created ({broadcast.created_count} in total)')
+        self.stdout.write(self.style.SUCCESS('Fan-out complete'))
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Coupon
+from core.coupon_generator import CouponCodeGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generate single-use coupons copied from a template coupon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('template_id', type=int, help='ID of the coupon to copy terms from')
+        parser.add_argument('--count', type=int, required=True, help='Number of coupons to create')
+        parser.add_argument('--prefix', default='', help='Prefix for every generated code')
+        parser.add_argument('--length', type=int, default=CouponCodeGenerator.DEFAULT_LENGTH,
+                            help='Number of random characters after the prefix')
+        parser.add_argument('--batch-size', type=int, default=CouponCodeGenerator.DEFAULT_BATCH_SIZE,
+                            help='Number of coupons inserted per chunk')
+
+    def handle(self, *args, **options):
+        try:
+            template = Coupon.objects.get(pk=options['template_id'])
+        except Coupon.DoesNotExist:
+            raise CommandError(f"Coupon {options['template_id']} does not exist")
+
+        started = time.perf_counter()
+        try:
+            generator = CouponCodeGenerator(prefix=options['prefix'], length=options['length'])
+            created = generator.generate(template, options['count'], batch_size=options['batch_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} coupons from {template.code} in {elapsed:.1f}s'
+        ))
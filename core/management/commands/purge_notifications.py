@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from core import notification_partitions
+
+
+class Command(BaseCommand):
+    help = 'Remove notifications older than the retention period and create the coming monthly partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, help='Defaults to NOTIFICATION_RETENTION_DAYS')
+        parser.add_argument('--archive', action='store_true',
+                            help='Keep expired partitions as standalone tables instead of dropping them')
+
+    def handle(self, *args, **options):
+        for name in notification_partitions.ensure_partitions():
+            self.stdout.write(f'Created partition {name}')
+        result = notification_partitions.purge(options['retention_days'], archive=options['archive'])
+        for name in result['partitions']:
+            self.stdout.write(f"{'Archived' if options['archive'] else 'Dropped'} partition {name}")
+        if result['deleted']:
+            self.stdout.write(f"Deleted {result['deleted']} notifications")
+        self.stdout.write(self.style.SUCCESS('Purge complete'))
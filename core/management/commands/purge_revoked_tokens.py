@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core import token_revocation
+
+
+class Command(BaseCommand):
+    help = 'Delete the revocations of tokens that have expired'
+
+    def handle(self, *args, **options):
+        deleted = token_revocation.purge()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired revocations'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from core import notification_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount every user\'s unread notifications from the notifications table'
+
+    def handle(self, *args, **options):
+        counters = notification_counters.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {counters} unread counters'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.campaigns import send_campaign
+from core.models import EmailCampaign
+
+
+class Command(BaseCommand):
+    help = 'Send an email campaign, resuming from its recorded progress if it was interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_id', type=int)
+        parser.add_argument('--batch-size', type=int, help='Recipients per API call; defaults to EMAIL_CAMPAIGN_BATCH_SIZE')
+
+    def handle(self, *args, **options):
+        try:
+            campaign = EmailCampaign.objects.get(pk=options['campaign_id'])
+        except EmailCampaign.DoesNotExist:
+            raise CommandError(f"Campaign {options['campaign_id']} does not exist")
+        if campaign.status == 'C':
+            raise CommandError(f'Campaign {campaign.pk} has already been sent')
+
+        try:
+            sent = send_campaign(campaign, batch_size=options['batch_size'])
+        except Exception as e:
+            raise CommandError(f'Campaign {campaign.pk} failed after {campaign.sent_count} recipients: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails ({campaign.sent_count} in total)'))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from core.email_outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Messages per batch; defaults to EMAIL_OUTBOX_BATCH_SIZE')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new messages instead of exiting once drained')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait between polls when idle (with --loop)')
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retry': 0, 'dead': 0}
+        while True:
+            result = deliver_batch(batch_size=options['batch_size'])
+            for key, value in result.items():
+                totals[key] += value
+            if any(result.values()):
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {totals['sent']}, retrying {totals['retry']}, dead-lettered {totals['dead']}"
+        ))
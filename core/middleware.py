@@ -1,14 +1,18 @@
 from django.utils import translation
 from django.utils.deprecation import MiddlewareMixin
+from .authentication import jwt_user
 
 class UserLanguageMiddleware(MiddlewareMixin):
     """
     Middleware that sets the language for the current session based on the user's preference.
+    API requests carry a JWT instead of a session, so their user is taken from the token
+    (through the user snapshot cache); the result is reused by the view's authentication.
     """
     def process_request(self, request):
-        if request.user.is_authenticated:
+        user = request.user if request.user.is_authenticated else jwt_user(request)
+        if user is not None:
             # Get the user's language preference
-            user_language = request.user.language_preference
+            user_language = user.language_preference
             # Activate the user's preferred language
             translation.activate(user_language)
-            request.LANGUAGE_CODE = user_language
\ No newline at end of file
+            request.LANGUAGE_CODE = user_language
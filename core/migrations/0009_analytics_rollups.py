@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_alter_shop_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPaymentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('payment_method', models.CharField(choices=[('CC', 'Credit Card'), ('DC', 'Debit Card'), ('UPI', 'UPI'), ('NB', 'Net Banking'), ('WL', 'Wallet')], max_length=3)),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('S', 'Success'), ('F', 'Failed'), ('R', 'Refunded')], max_length=1)),
+                ('is_order', models.BooleanField(default=False)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'payment_method'], name='core_dailyp_day_a912d9_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyReturnRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('A', 'Approved'), ('R', 'Rejected'), ('C', 'Completed')], max_length=1)),
+                ('reason', models.CharField(choices=[('DMG', 'Damaged Product'), ('WRG', 'Wrong Product'), ('DEF', 'Defective Product'), ('OTH', 'Other')], max_length=3)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'status'], name='core_dailyr_day_87a2de_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyUserRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='core_dailyu_day_72c03f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyBookingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('C', 'Confirmed'), ('X', 'Cancelled'), ('D', 'Completed'), ('W', 'Waitlisted'), ('R', 'Rescheduled')], max_length=1)),
+                ('is_recurring', models.BooleanField(default=False)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.servicetype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'status'], name='core_dailyb_day_698334_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('S', 'Shipped'), ('D', 'Delivered'), ('C', 'Cancelled'), ('R', 'Rejected')], max_length=1)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.shop')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'status'], name='core_dailys_day_a0feef_idx')],
+            },
+        ),
+    ]
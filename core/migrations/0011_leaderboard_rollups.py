@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_active_user_sketches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'product'], name='core_dailyp_day_1f69cb_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProviderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('service_provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.serviceprovider')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'service_provider'], name='core_dailyp_day_104b65_idx')],
+            },
+        ),
+    ]
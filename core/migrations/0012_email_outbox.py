@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_leaderboard_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to_email', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('html_body', models.TextField(blank=True)),
+                ('text_body', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('S', 'Sent'), ('D', 'Dead')], default='P', max_length=1)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_status_b2f640_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('subject', models.CharField(max_length=255)),
+                ('subject_en', models.CharField(max_length=255, null=True)),
+                ('subject_ta', models.CharField(max_length=255, null=True)),
+                ('subject_hi', models.CharField(max_length=255, null=True)),
+                ('body', models.TextField(help_text='HTML; may use {{ first_name }}, {{ last_name }} and {{ username }}')),
+                ('body_en', models.TextField(help_text='HTML; may use {{ first_name }}, {{ last_name }} and {{ username }}', null=True)),
+                ('body_ta', models.TextField(help_text='HTML; may use {{ first_name }}, {{ last_name }} and {{ username }}', null=True)),
+                ('body_hi', models.TextField(help_text='HTML; may use {{ first_name }}, {{ last_name }} and {{ username }}', null=True)),
+                ('membership_statuses', models.JSONField(blank=True, default=list, help_text='Empty for all membership statuses')),
+                ('languages', models.JSONField(blank=True, default=list, help_text='Empty for all languages')),
+                ('status', models.CharField(choices=[('D', 'Draft'), ('R', 'Running'), ('C', 'Completed'), ('F', 'Failed')], default='D', max_length=1)),
+                ('progress', models.JSONField(blank=True, default=dict)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
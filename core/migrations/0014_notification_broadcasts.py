@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_email_campaigns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBroadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('broadcast_id', models.CharField(max_length=64, unique=True)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(max_length=20)),
+                ('membership_statuses', models.JSONField(blank=True, default=list, help_text='Empty for all membership statuses')),
+                ('last_user_id', models.BigIntegerField(default=0)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcasts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='broadcast',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='core.notificationbroadcast'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('broadcast', 'user'), name='unique_broadcast_notification'),
+        ),
+    ]
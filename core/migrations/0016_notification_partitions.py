@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:00
+
+from django.db import migrations, models
+
+
+def partition_notifications(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        from core.notification_partitions import convert_table
+        convert_table(schema_editor, partitioned=True)
+
+
+def unpartition_notifications(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        from core.notification_partitions import convert_table
+        convert_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_notification_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='notification',
+            name='unique_broadcast_notification',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at'], name='core_notifi_user_id_1cc5b6_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('broadcast', 'user', 'created_at'), name='unique_broadcast_notification'),
+        ),
+        migrations.RunPython(partition_notifications, unpartition_notifications),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='core_notifi_user_id_1cc5b6_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at', '-id'], name='core_bookin_created_5a5710_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(fields=['-created_at', '-id'], name='core_coupon_created_bcde85_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='couponusage',
+            index=models.Index(fields=['user', '-id'], name='core_coupon_user_id_74c3cf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loyaltyprogram',
+            index=models.Index(fields=['-points', '-id'], name='core_loyalt_points_4f3477_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='core_notifi_user_id_ea1d2f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['-created_at', '-id'], name='core_notifi_created_5c2dd0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='core_order_created_d22947_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='core_produc_created_51c339_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='returnrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='core_return_created_4f7adf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='returnrequest',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='core_return_user_id_1a1af8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='core_review_created_54a360_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['-created_at', '-id'], name='core_shop_created_cd1567_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailybookingrollup',
+            name='service_type',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='core.servicetype'),
+        ),
+        migrations.AlterField(
+            model_name='dailysalesrollup',
+            name='shop',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='core.shop'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_rollup_unconstrained_parents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyproductrollup',
+            name='product',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='core.product'),
+        ),
+        migrations.AlterField(
+            model_name='dailyproviderrollup',
+            name='service_provider',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='core.serviceprovider'),
+        ),
+    ]
@@ -42,6 +42,8 @@ class User(AbstractUser):
     notification_preferences = models.JSONField(default=dict)
     date_joined = models.DateTimeField(default=timezone.now)
     language_preference = models.CharField(max_length=2, choices=LANGUAGE_CHOICES, default='en')
+    # Bumped when an attribute embedded in access tokens changes (see core.authentication)
+    claims_version = models.PositiveIntegerField(default=0, editable=False)
     groups = models.ManyToManyField(Group, related_name='core_user_groups')
     user_permissions = models.ManyToManyField(Permission, related_name='core_user_permissions')
 
@@ -170,6 +172,9 @@ class Booking(models.Model):
     parent_booking = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='recurring_bookings')
     is_recurring_instance = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id'])]
+
     def move_to_waitlist(self):
         existing_waitlist = Booking.objects.filter(
             service_provider=self.service_provider,
@@ -292,6 +297,9 @@ class Product(models.Model):
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     total_reviews = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id'])]
+
     def save(self, *args, **kwargs):
         if not self.sku:
             # Generate SKU: Category prefix + Sequential number
@@ -336,6 +344,9 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id'])]
+
     def save(self, *args, **kwargs):
         # Update product stock on order status change
         if self.pk:
@@ -426,12 +437,69 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id'])]
+
+class NotificationBroadcast(models.Model):
+    """
+    A notification sent to every active user, or to the users in some membership tiers.
+    Fanned out by core.notification_fanout; ``last_user_id`` is the fan-out's progress.
+    """
+    broadcast_id = models.CharField(max_length=64, unique=True)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20)
+    membership_statuses = models.JSONField(default=list, blank=True, help_text='Empty for all membership statuses')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='broadcasts')
+    last_user_id = models.BigIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.broadcast_id
+
+
 class Notification(models.Model):
+    UNREAD = 'Unread'
+    READ = 'Read'
+    STATUS_CHOICES = [(UNREAD, 'Unread'), (READ, 'Read')]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     message = models.TextField()
     notification_type = models.CharField(max_length=20)
-    status = models.CharField(max_length=10, default='Unread')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UNREAD)
     created_at = models.DateTimeField(auto_now_add=True)
+    broadcast = models.ForeignKey(NotificationBroadcast, on_delete=models.CASCADE, null=True, blank=True,
+                                  related_name='notifications')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            # Keyset pagination orders (see core.pagination)
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['-created_at', '-id']),
+        ]
+        constraints = [
+            # Unique constraints of a partitioned table must include its partition key (see
+            # core.notification_partitions); every notification of a broadcast has its created_at
+            models.UniqueConstraint(fields=['broadcast', 'user', 'created_at'], name='unique_broadcast_notification')
+        ]
+
+
+class NotificationCounter(models.Model):
+    """A user's number of unread notifications. Maintained by core.notification_counters."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+
+class RevokedToken(models.Model):
+    """A revoked JWT, kept until the token expires. Checked through core.token_revocation."""
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='revoked_tokens')
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
 
 class LoyaltyProgram(models.Model):
     TIER_CHOICES = [('B', 'Bronze'), ('S', 'Silver'), ('G', 'Gold')]
@@ -444,6 +512,7 @@ class LoyaltyProgram(models.Model):
 
     class Meta:
         ordering = ['-points']
+        indexes = [models.Index(fields=['-points', '-id'])]
 
 
 class Shop(models.Model):
@@ -464,6 +533,9 @@ class Shop(models.Model):
     total_ratings = models.PositiveIntegerField(default=0)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_shops')
 
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id'])]
+
     def __str__(self):
         return self.name
 
@@ -495,6 +567,9 @@ class ReturnRequest(models.Model):
     refund_id = models.CharField(max_length=255, null=True, blank=True)
     admin_notes = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id']), models.Index(fields=['user', '-created_at', '-id'])]
+
     def __str__(self):
         return f"Return #{self.id} for Order #{self.order.id}"
 
@@ -565,6 +640,9 @@ class Coupon(models.Model):
     applies_to_categories = models.ManyToManyField(ProductCategory, blank=True, related_name='applicable_coupons')
     applies_to_shops = models.ManyToManyField(Shop, blank=True, related_name='applicable_coupons')
 
+    class Meta:
+        indexes = [models.Index(fields=['-created_at', '-id'])]
+
     def __str__(self):
         return self.code
 
@@ -617,6 +695,9 @@ class CouponUsage(models.Model):
     used_at = models.DateTimeField(auto_now_add=True)
     discount_amount = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [models.Index(fields=['user', '-id'])]
+
     def __str__(self):
         return f"{self.coupon.code} used by {self.user.username}"
 
@@ -638,3 +719,144 @@ class AuditLog(models.Model):
 
     def __str__(self):
         return f"{self.get_action_display()} on {self.content_type} #{self.object_id}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Orders aggregated per day, status and shop. Maintained by core.analytics_rollups.
+
+    Rollup foreign keys are unconstrained and not cascaded: when a shop is
+    deleted, its orders' post_delete signals take their contributions out.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=1, choices=Order.STATUS_CHOICES)
+    shop = models.ForeignKey(Shop, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'status'])]
+
+
+class DailyBookingRollup(models.Model):
+    """Bookings aggregated per day, status, service type and recurrence."""
+    day = models.DateField()
+    status = models.CharField(max_length=1, choices=Booking.STATUS_CHOICES)
+    service_type = models.ForeignKey(ServiceType, on_delete=models.DO_NOTHING, db_constraint=False)
+    is_recurring = models.BooleanField(default=False)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'status'])]
+
+
+class DailyPaymentRollup(models.Model):
+    """Payments aggregated per day, method and status, split by order vs booking payments."""
+    day = models.DateField()
+    payment_method = models.CharField(max_length=3, choices=Payment.PAYMENT_METHODS)
+    status = models.CharField(max_length=1, choices=Payment.PAYMENT_STATUS)
+    is_order = models.BooleanField(default=False)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'payment_method'])]
+
+
+class DailyReturnRollup(models.Model):
+    """Return requests aggregated per day, status and reason."""
+    day = models.DateField()
+    status = models.CharField(max_length=1, choices=ReturnRequest.STATUS_CHOICES)
+    reason = models.CharField(max_length=3, choices=ReturnRequest.REASON_CHOICES)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'status'])]
+
+
+class DailyUserRollup(models.Model):
+    """New user sign-ups per day."""
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['day'])]
+
+
+class DailyActiveUserSketch(models.Model):
+    """HyperLogLog sketch of the users who placed an order or booking on a day. Maintained by core.active_users."""
+    day = models.DateField(unique=True)
+    registers = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class DailyProductRollup(models.Model):
+    """Units and revenue per product per day, excluding cancelled and rejected orders."""
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False)
+    count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'product'])]
+
+
+class DailyProviderRollup(models.Model):
+    """Bookings and revenue per service provider per day, excluding cancelled bookings."""
+    day = models.DateField()
+    service_provider = models.ForeignKey(ServiceProvider, on_delete=models.DO_NOTHING, db_constraint=False)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['day', 'service_provider'])]
+
+
+class OutboxEmail(models.Model):
+    """An email waiting to be delivered by the outbox worker (see core.email_outbox)."""
+    STATUS_CHOICES = [('P', 'Pending'), ('S', 'Sent'), ('D', 'Dead')]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    html_body = models.TextField(blank=True)
+    text_body = models.TextField(blank=True)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='P')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to_email} ({self.get_status_display()})"
+
+
+class EmailCampaign(models.Model):
+    """
+    A promotional email sent in bulk to users selected by membership status and
+    language. Sent by core.campaigns; ``progress`` records the last user id
+    delivered per language so an interrupted run resumes where it stopped.
+    """
+    STATUS_CHOICES = [('D', 'Draft'), ('R', 'Running'), ('C', 'Completed'), ('F', 'Failed')]
+
+    name = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255)
+    body = models.TextField(help_text='HTML; may use {{ first_name }}, {{ last_name }} and {{ username }}')
+    membership_statuses = models.JSONField(default=list, blank=True, help_text='Empty for all membership statuses')
+    languages = models.JSONField(default=list, blank=True, help_text='Empty for all languages')
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='D')
+    progress = models.JSONField(default=dict, blank=True)
+    sent_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
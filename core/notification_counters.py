@@ -0,0 +1,83 @@
+"""
+Per-user unread notification counters.
+
+Every write that changes how many unread notifications a user has adjusts
+their NotificationCounter row in the same transaction: single notifications
+through the signals in core.signals, broadcasts, mark-read requests and
+purges here. A missing counter means "not known yet": adjustments skip it
+and the first read creates it, then counts the user's unread notifications
+into it, so counters need no backfill and can be rebuilt at any time by
+deleting them.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from .models import Notification, NotificationCounter
+
+
+def adjust(user_id, delta):
+    """Add ``delta`` to a user's unread count, if it is being tracked"""
+    if delta:
+        NotificationCounter.objects.filter(user_id=user_id).update(unread=F('unread') + delta)
+
+
+def unread_count(user):
+    """Return a user's number of unread notifications, creating their counter if needed"""
+    counter = NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first()
+    if counter is not None:
+        return counter
+    # The row is committed before counting, so notifications created from here
+    # on adjust it instead of being skipped as untracked
+    NotificationCounter.objects.bulk_create([NotificationCounter(user=user)], ignore_conflicts=True)
+    with transaction.atomic():
+        # The lock holds back concurrent adjustments until the count is stored;
+        # the count already includes every adjustment committed before it
+        counter = NotificationCounter.objects.select_for_update().get(user=user)
+        counter.unread = Notification.objects.filter(user=user, status=Notification.UNREAD).count()
+        counter.save(update_fields=['unread'])
+    return counter.unread
+
+
+def mark_read(user, notification_ids=None):
+    """
+    Mark a user's unread notifications as read in one statement.
+
+    Args:
+        user: The user whose notifications to mark
+        notification_ids: Limit to these notifications (default: all of them)
+
+    Returns:
+        int: Number of notifications that were unread
+    """
+    notifications = Notification.objects.filter(user=user, status=Notification.UNREAD)
+    if notification_ids is not None:
+        notifications = notifications.filter(id__in=notification_ids)
+    with transaction.atomic():
+        marked = notifications.update(status=Notification.READ)
+        adjust(user.pk, -marked)
+    return marked
+
+
+def add_broadcast_range(broadcast, start, end):
+    """Count a broadcast's notifications for users with ids in [start, end) as unread"""
+    NotificationCounter.objects.filter(
+        user_id__in=Notification.objects.filter(
+            broadcast=broadcast, user_id__gte=start, user_id__lt=end
+        ).values('user_id')
+    ).update(unread=F('unread') + 1)
+
+
+def remove(notifications):
+    """Uncount the unread notifications in ``notifications``, a queryset that is about to be deleted"""
+    unread = notifications.filter(status=Notification.UNREAD)
+    per_user = unread.filter(user=OuterRef('user')).order_by().values('user').annotate(count=Count('id')).values('count')
+    NotificationCounter.objects.filter(user__in=unread.values('user')).update(unread=F('unread') - Subquery(per_user))
+
+
+def rebuild():
+    """Recount every counter from the notifications table; returns the number of counters written"""
+    with transaction.atomic():
+        NotificationCounter.objects.all().delete()
+        counts = Notification.objects.filter(status=Notification.UNREAD).values('user').annotate(unread=Count('id')).order_by()
+        return len(NotificationCounter.objects.bulk_create(
+            NotificationCounter(user_id=row['user'], unread=row['unread']) for row in counts
+        ))
@@ -0,0 +1,102 @@
+"""
+Notification fan-out.
+
+A broadcast is written to its audience in chunks of user id ranges rather
+than one row per request. Each chunk is a single ``INSERT ... SELECT`` built
+from the audience queryset restricted to ``[start, start + chunk_size)``, so
+the rows are produced by the database without materializing users or
+Notification instances in Python. The chunk's rows and the broadcast's
+progress are committed together, so an interrupted fan-out resumes after the
+last committed range, and the unique (broadcast, user) constraint, with
+conflicts ignored on insert, makes it safe to run the same broadcast twice.
+Every notification of a broadcast is stamped with the broadcast's created_at,
+which keeps them in one monthly partition and lets that constraint include
+the partition key (see core.notification_partitions).
+Unread counters of the users reached are bumped in the same transaction.
+"""
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from . import notification_counters
+from .realtime import publish_broadcast
+from .models import Notification, NotificationBroadcast, User
+
+
+def audience(broadcast):
+    """Return the users a broadcast is for"""
+    users = User.objects.filter(is_active=True)
+    if broadcast.membership_statuses:
+        users = users.filter(membership_status__in=broadcast.membership_statuses)
+    return users
+
+
+def _insert_chunk(broadcast, users):
+    """Insert the broadcast's notification for every user in ``users``; returns the number of new rows"""
+    connection = connections[users.db]
+    ops = connection.ops
+    opts = Notification._meta
+    fields = [opts.get_field(name) for name in ('user', 'message', 'notification_type', 'status', 'created_at', 'broadcast')]
+    columns = ', '.join(ops.quote_name(field.column) for field in fields)
+    user_sql, user_params = users.values('id').query.sql_with_params()
+    suffix = ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None)
+    sql = (
+        f'{ops.insert_statement(on_conflict=OnConflict.IGNORE)} {ops.quote_name(opts.db_table)} ({columns}) '
+        f'SELECT audience.id, %s, %s, %s, %s, %s FROM ({user_sql}) audience {suffix}'
+    )
+    params = (
+        broadcast.message, broadcast.notification_type, 'Unread',
+        ops.adapt_datetimefield_value(broadcast.created_at), broadcast.pk
+    ) + tuple(user_params)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return max(cursor.rowcount, 0)
+
+
+def fan_out(broadcast, chunk_size=None):
+    """
+    Create the broadcast's notifications for every user it has not reached yet.
+
+    Args:
+        broadcast: The NotificationBroadcast to fan out
+        chunk_size: Width of each user id range (defaults to NOTIFICATION_FANOUT_CHUNK_SIZE)
+
+    Returns:
+        int: Number of notifications created in this call
+    """
+    chunk_size = chunk_size or getattr(settings, 'NOTIFICATION_FANOUT_CHUNK_SIZE', 20000)
+    users = audience(broadcast)
+    bounds = users.filter(id__gt=broadcast.last_user_id).aggregate(low=Min('id'), high=Max('id'))
+    created = 0
+    if bounds['low'] is not None:
+        start = bounds['low']
+        while start <= bounds['high']:
+            end = start + chunk_size
+            with transaction.atomic(using=users.db):
+                # Serializes concurrent runs of the same broadcast, which would otherwise
+                # count each other's rows in the unread counters
+                progress = NotificationBroadcast.objects.select_for_update().values(
+                    'last_user_id', 'created_count'
+                ).get(pk=broadcast.pk)
+                inserted = 0
+                if progress['last_user_id'] < end - 1:
+                    inserted = _insert_chunk(broadcast, users.filter(id__gte=start, id__lt=end))
+                    if inserted:
+                        notification_counters.add_broadcast_range(broadcast, start, end)
+                broadcast.last_user_id = max(progress['last_user_id'], end - 1)
+                broadcast.created_count = progress['created_count'] + inserted
+                broadcast.save(update_fields=['last_user_id', 'created_count'])
+            created += inserted
+            start = end
+
+    if broadcast.completed_at is None:
+        broadcast.completed_at = timezone.now()
+        broadcast.save(update_fields=['completed_at'])
+        publish_broadcast('notification', {
+            'broadcast_id': broadcast.broadcast_id,
+            'message': broadcast.message,
+            'notification_type': broadcast.notification_type,
+            'created_at': broadcast.created_at,
+        }, broadcast.membership_statuses)
+    return created
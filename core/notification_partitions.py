@@ -0,0 +1,271 @@
+"""
+Monthly partitions of the notifications table.
+
+On PostgreSQL, migration 0016 turns the notifications table into a table
+partitioned by range of created_at: one partition per calendar month (UTC),
+named like ``core_notification_2024_05``, plus a default partition for rows
+outside every month. ``ensure_partitions`` creates the coming months ahead of
+time, and ``purge`` removes months that are entirely older than the retention
+period by detaching their partition and dropping it, or keeping it as a
+standalone ``core_notification_archive_2024_05`` table. Nothing is deleted row
+by row, and queries filtered on created_at only read the months they need.
+
+Other databases keep a single table, and ``purge`` deletes expired rows there
+in batches of ids.
+
+Either way, the unread counters of the users whose notifications are removed
+are reduced in the same transaction.
+"""
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from . import notification_counters
+from .models import Notification, NotificationCounter
+
+PARTITION_NAME = re.compile(r'_(\d{4})_(\d{2})$')
+
+
+def month_start(value):
+    """Return the start of ``value``'s month in UTC"""
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(start):
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table, start):
+    return f'{table}_{start:%Y_%m}'
+
+
+def _literal(value):
+    # Partition bounds are DDL, which cannot take parameters; the values are generated here
+    return f"'{value.isoformat()}'"
+
+
+def _connection():
+    return connections[router.db_for_write(Notification)]
+
+
+def is_partitioned(connection=None):
+    """Return whether the notifications table is partitioned on this database"""
+    connection = connection or _connection()
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass',
+                       [Notification._meta.db_table])
+        return cursor.fetchone() is not None
+
+
+def partitions(connection=None):
+    """Return the monthly partitions attached to the notifications table as a {month start: name} dict"""
+    connection = connection or _connection()
+    table = Notification._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass', [table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = {}
+    for name in names:
+        match = PARTITION_NAME.search(name)
+        if match and name == f'{table}{match.group(0)}':
+            months[datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)] = name
+    return months
+
+
+def create_partition(start, connection=None):
+    """
+    Attach the partition for the month starting at ``start``.
+
+    Rows of that month already in the default partition are moved into it, so
+    a month can be created after its notifications have started arriving.
+    """
+    connection = connection or _connection()
+    quote = connection.ops.quote_name
+    table = Notification._meta.db_table
+    column = quote(Notification._meta.get_field('created_at').column)
+    name = partition_name(table, start)
+    end = next_month(start)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(table)})')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {quote(table + "_default")} '
+            f'WHERE {column} >= %s AND {column} < %s RETURNING *) '
+            f'INSERT INTO {quote(name)} SELECT * FROM moved', [start, end]
+        )
+        cursor.execute(
+            f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} '
+            f'FOR VALUES FROM ({_literal(start)}) TO ({_literal(end)})'
+        )
+    return name
+
+
+def ensure_partitions(months_ahead=None, connection=None):
+    """
+    Create the partitions for this month and the next ``months_ahead`` months.
+
+    Returns:
+        list: Names of the partitions created
+    """
+    connection = connection or _connection()
+    if not is_partitioned(connection):
+        return []
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'NOTIFICATION_PARTITION_MONTHS_AHEAD', 2)
+    existing = partitions(connection)
+    created = []
+    start = month_start(timezone.now())
+    for _ in range(months_ahead + 1):
+        if start not in existing:
+            created.append(create_partition(start, connection))
+        start = next_month(start)
+    return created
+
+
+def _drop_partition(connection, name, archive):
+    quote = connection.ops.quote_name
+    table = Notification._meta.db_table
+    counter_table = quote(NotificationCounter._meta.db_table)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Detached first, so nothing can mark its notifications read between counting and dropping
+        cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+        cursor.execute(
+            f'UPDATE {counter_table} AS counter SET unread = counter.unread - expired.unread '
+            f'FROM (SELECT user_id, COUNT(*) AS unread FROM {quote(name)} '
+            f'WHERE status = %s GROUP BY user_id) AS expired '
+            f'WHERE counter.user_id = expired.user_id', [Notification.UNREAD]
+        )
+        if archive:
+            archived = name.replace(table, f'{table}_archive', 1)
+            cursor.execute(f'ALTER TABLE {quote(name)} RENAME TO {quote(archived)}')
+        else:
+            cursor.execute(f'DROP TABLE {quote(name)}')
+
+
+def _delete_expired(cutoff, batch_size):
+    deleted = 0
+    connection = _connection()
+    table = connection.ops.quote_name(Notification._meta.db_table)
+    while True:
+        with transaction.atomic(using=connection.alias):
+            ids = list(Notification.objects.select_for_update().filter(created_at__lt=cutoff)
+                       .order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            notification_counters.remove(Notification.objects.filter(id__in=ids))
+            # A plain DELETE; QuerySet.delete() would load the rows to send post_delete for each
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {table} WHERE id IN ({", ".join(["%s"] * len(ids))})', ids)
+        deleted += len(ids)
+
+
+def purge(retention_days=None, archive=False, batch_size=None):
+    """
+    Remove notifications older than the retention period.
+
+    Args:
+        retention_days: Age after which notifications are removed (defaults to NOTIFICATION_RETENTION_DAYS)
+        archive: Keep expired partitions as standalone tables instead of dropping them (PostgreSQL only)
+        batch_size: Rows deleted per statement on databases without partitions
+
+    Returns:
+        dict: 'partitions' (names dropped or archived) and 'deleted' (rows deleted without partitions)
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 180)
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    connection = _connection()
+    if not is_partitioned(connection):
+        batch_size = batch_size or getattr(settings, 'NOTIFICATION_PURGE_BATCH_SIZE', 10000)
+        return {'partitions': [], 'deleted': _delete_expired(cutoff, batch_size)}
+
+    # Only whole months are removed; rows of a partly expired month wait for the rest of it
+    expired = [name for start, name in sorted(partitions(connection).items()) if next_month(start) <= cutoff]
+    for name in expired:
+        _drop_partition(connection, name, archive)
+    return {'partitions': expired, 'deleted': 0}
+
+
+def _table_definitions(cursor, table):
+    """Return the constraints (except primary and not-null ones) and the other indexes of ``table``"""
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('c', 'f', 'u', 'x')", [table]
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT index_class.relname, pg_get_indexdef(i.indexrelid) FROM pg_index AS i "
+        "JOIN pg_class AS index_class ON index_class.oid = i.indexrelid "
+        "WHERE i.indrelid = %s::regclass AND NOT EXISTS ("
+        "SELECT 1 FROM pg_constraint WHERE conindid = i.indexrelid AND contype IN ('p', 'u', 'x'))", [table]
+    )
+    return constraints, cursor.fetchall()
+
+
+def convert_table(schema_editor, partitioned):
+    """
+    Rebuild the notifications table as a partitioned table, or back as a plain one.
+
+    Used by migration 0016 on PostgreSQL. The rows, constraints and indexes are
+    copied over; the primary key becomes (id, created_at) because a partitioned
+    table's unique keys must include its partition key, and ids keep coming from
+    a sequence since identity columns cannot be partitioned before PostgreSQL 17.
+    """
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    table = Notification._meta.db_table
+    column = quote(Notification._meta.get_field('created_at').column)
+    old = f'{table}_unpartitioned' if partitioned else f'{table}_partitioned'
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+        constraints, indexes = _table_definitions(cursor, old)
+        # Index names are unique per schema, so they are released before being reused
+        for name, _ in constraints:
+            cursor.execute(f'ALTER TABLE {quote(old)} DROP CONSTRAINT {quote(name)}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+
+        if partitioned:
+            cursor.execute(f'CREATE TABLE {quote(table)} (LIKE {quote(old)}) PARTITION BY RANGE ({column})')
+            cursor.execute(f'CREATE TABLE {quote(table + "_default")} PARTITION OF {quote(table)} DEFAULT')
+            cursor.execute(f'SELECT MIN({column}) FROM {quote(old)}')
+            start = month_start(cursor.fetchone()[0] or timezone.now())
+            last = month_start(timezone.now())
+            for _ in range(getattr(settings, 'NOTIFICATION_PARTITION_MONTHS_AHEAD', 2)):
+                last = next_month(last)
+            while start <= last:
+                cursor.execute(
+                    f'CREATE TABLE {quote(partition_name(table, start))} PARTITION OF {quote(table)} '
+                    f'FOR VALUES FROM ({_literal(start)}) TO ({_literal(next_month(start))})'
+                )
+                start = next_month(start)
+        else:
+            cursor.execute(f'CREATE TABLE {quote(table)} (LIKE {quote(old)})')
+
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+        cursor.execute(f'DROP TABLE {quote(old)}')
+
+        if partitioned:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, {column})')
+            cursor.execute(f'CREATE SEQUENCE {quote(table + "_id_seq")} OWNED BY {quote(table)}.id')
+            cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+        else:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD PRIMARY KEY (id)')
+            cursor.execute(f'ALTER TABLE {quote(table)} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+        cursor.execute(
+            f'SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX(id), 0) + 1, false) FROM {quote(table)}',
+            [table, 'id']
+        )
+
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+        for _, definition in indexes:
+            # Point the saved definition at the new table; partitioned ones read "ON ONLY"
+            cursor.execute(re.sub(r' ON (ONLY )?\S+ USING ', f' ON {quote(table)} USING ', definition, count=1))
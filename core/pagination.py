@@ -0,0 +1,159 @@
+"""
+Keyset (cursor) pagination for API lists.
+
+A page is fetched by filtering on the position of the previous page's last
+row, e.g. ``created_at <= t AND (created_at < t OR id < i)`` in
+(-created_at, -id) order, rather than with OFFSET. Each page is then a range
+scan of a matching index (see the models' Meta.indexes), which costs the same
+at any depth. The ordering comes from the view's ``cursor_ordering``, or is
+(-created_at, -id) for models with a created_at field and (-id) otherwise;
+it must end with a unique field.
+
+Responses look like DRF's CursorPagination: ``next`` and ``previous`` links
+carrying an opaque ``cursor`` parameter, and ``results``. Clients may ask for
+``page_size`` rows, up to PAGINATION_MAX_PAGE_SIZE.
+"""
+import base64
+import json
+from collections import namedtuple
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+# ``position`` holds the key values, ``encoded`` them as strings for links
+Cursor = namedtuple('Cursor', 'position encoded reverse')
+
+
+def _invert(key):
+    return key[1:] if key.startswith('-') else f'-{key}'
+
+
+def keyset_filter(ordering, position):
+    """
+    Return a Q matching the rows after ``position`` in ``ordering``.
+
+    The first key is also bounded on its own, so the database can turn the
+    condition into a range of an index on the ordering.
+    """
+    keys = [(key.lstrip('-'), key.startswith('-')) for key in ordering]
+    after = Q()
+    equal = {}
+    for (name, descending), value in zip(keys, position):
+        after |= Q(**equal, **{f"{name}__{'lt' if descending else 'gt'}": value})
+        equal[name] = value
+    first, descending = keys[0]
+    return Q(**{f"{first}__{'lte' if descending else 'gte'}": position[0]}) & after
+
+
+class KeysetPagination(BasePagination):
+    """Project-wide pagination; see the module docstring"""
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 50
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+            if requested > 0:
+                page_size = requested
+        except (KeyError, ValueError):
+            pass
+        return min(page_size, getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', 200))
+
+    def get_ordering(self, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return tuple(ordering)
+        if any(field.name == 'created_at' for field in queryset.model._meta.concrete_fields):
+            return ('-created_at', '-id')
+        return ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.fields = [queryset.model._meta.get_field(key.lstrip('-')) for key in self.ordering]
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = [_invert(key) for key in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(keyset_filter(ordering, self.cursor.position))
+        # One extra row tells whether there is anything beyond this page
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            # Reached backwards from the page after this one
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, self.cursor is not None
+        # Positions the next and previous pages start after; an empty page reuses its cursor's
+        self.next_position = self.previous_position = None
+        if has_next:
+            self.next_position = self._position(results[-1]) if results else self.cursor.encoded
+        if has_previous:
+            self.previous_position = self._position(results[0]) if results else self.cursor.encoded
+        return results
+
+    def _position(self, instance):
+        return [field.value_to_string(instance) for field in self.fields]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = data['p']
+            if not isinstance(position, list) or len(position) != len(self.fields):
+                raise ValueError
+            values = [field.to_python(value) for field, value in zip(self.fields, position)]
+            return Cursor(values, position, bool(data.get('r')))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        data = {'p': position, 'r': 1} if reverse else {'p': position}
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,215 @@
+"""
+Real-time events for connected users.
+
+The SSE endpoint (core.views_stream) subscribes each connection to the
+in-process ``broker``, which keeps one bounded asyncio queue per connection
+keyed by user id. Application code calls ``publish_to_user`` or
+``publish_broadcast`` from any thread; the event is handed to the configured
+backend after the surrounding transaction commits:
+
+- LocalBackend delivers straight to this process's broker. It is enough when
+  the site is served by a single ASGI process.
+- PostgresBackend sends the event with ``pg_notify`` and every process runs a
+  listener thread that delivers what it hears to its own broker, so writes
+  made by any worker reach connections held by any other.
+
+Set REALTIME_BACKEND to the backend's dotted path.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Events published to every connection; each connection decides whether it applies
+BROADCAST = '*'
+
+
+class Subscription:
+    """One connection's queue of events"""
+
+    def __init__(self, user_id, loop, filter=None, max_queued=100):
+        self.user_id = user_id
+        self.loop = loop
+        self.filter = filter
+        self.queue = asyncio.Queue(max_queued)
+        self.overflowed = False
+
+    def offer(self, event):
+        # Runs on the subscription's event loop
+        if self.overflowed or (self.filter and not self.filter(event)):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client is not keeping up; end the stream so it reconnects and catches up
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout):
+        """Return the next event, None if the stream must end, or raise TimeoutError when idle"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broker:
+    """In-process registry of subscriptions by user id"""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, filter=None):
+        """Register a subscription for ``user_id``; must be called from the event loop that will read it"""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), filter,
+                                    getattr(settings, 'REALTIME_MAX_QUEUED_EVENTS', 100))
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def deliver(self, user_id, event):
+        """Hand an event to this process's subscriptions for ``user_id`` (or all of them for BROADCAST); thread-safe"""
+        with self._lock:
+            if user_id == BROADCAST:
+                targets = [s for subscriptions in self._subscriptions.values() for s in subscriptions]
+            else:
+                targets = list(self._subscriptions.get(user_id, ()))
+        by_loop = {}
+        for subscription in targets:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_offer_all, subscriptions, event)
+            except RuntimeError:
+                # The loop has closed; its connections are gone
+                pass
+
+
+def _offer_all(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.offer(event)
+
+
+broker = Broker()
+
+
+class LocalBackend:
+    """Delivers events to this process only"""
+
+    def start(self, broker):
+        pass
+
+    def publish(self, user_id, event):
+        broker.deliver(user_id, event)
+
+
+class PostgresBackend:
+    """
+    Delivers events to every process through PostgreSQL LISTEN/NOTIFY.
+
+    NOTIFY payloads are limited to 8000 bytes, so events larger than that are
+    sent without their 'data' and clients fetch the details over the API.
+    """
+
+    CHANNEL = 'core_realtime'
+    MAX_PAYLOAD = 7900
+    POLL_SECONDS = 5
+
+    def __init__(self):
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self, broker):
+        """Start this process's listener thread (once)"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._listen, args=(broker,), name='realtime-listener', daemon=True).start()
+
+    def publish(self, user_id, event):
+        payload = json.dumps({'user': user_id, 'event': event}, cls=DjangoJSONEncoder)
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            event = {key: value for key, value in event.items() if key != 'data'}
+            payload = json.dumps({'user': user_id, 'event': event}, cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.CHANNEL, payload])
+
+    def _listen(self, broker):
+        import psycopg2
+
+        while True:
+            try:
+                params = connection.get_connection_params()
+                listener = psycopg2.connect(**params)
+                listener.autocommit = True
+                with listener.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.CHANNEL}')
+                while True:
+                    if select.select([listener], [], [], self.POLL_SECONDS) == ([], [], []):
+                        continue
+                    listener.poll()
+                    while listener.notifies:
+                        message = json.loads(listener.notifies.pop(0).payload)
+                        broker.deliver(message['user'], message['event'])
+            except Exception:
+                logger.exception('Realtime listener failed; reconnecting')
+                threading.Event().wait(self.POLL_SECONDS)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide REALTIME_BACKEND instance, started on first use"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            path = getattr(settings, 'REALTIME_BACKEND', 'core.realtime.LocalBackend')
+            _backend = import_string(path)()
+            _backend.start(broker)
+        return _backend
+
+
+def _publish(user_id, event):
+    backend = get_backend()
+    transaction.on_commit(lambda: backend.publish(user_id, event))
+
+
+def publish_to_user(user_id, event_type, data, event_id=None):
+    """
+    Send an event to a user's connections once the current transaction commits.
+
+    Args:
+        user_id: The user to notify
+        event_type: SSE event name, e.g. 'notification'
+        data: JSON-serializable payload
+        event_id: SSE event id clients resume from (notification ids only)
+    """
+    _publish(user_id, {'type': event_type, 'id': event_id, 'data': data})
+
+
+def publish_broadcast(event_type, data, membership_statuses=None):
+    """Send an event to every connection, or to users in ``membership_statuses``, once the transaction commits"""
+    _publish(BROADCAST, {
+        'type': event_type, 'id': None, 'data': data, 'membership_statuses': membership_statuses or []
+    })
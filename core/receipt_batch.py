@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from django.conf import settings
+from django.db.models import Prefetch
+from .models import Order, OrderItem, Booking, Payment
+from .receipt_worker import init_worker, render_receipt
+
+
+def _create_pool(workers):
+    # Spawned, not forked: forking a process with other threads and open
+    # database connections can leave locks and sockets shared with the child
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool():
+    """
+    Return the process pool shared by bulk receipt requests in this process, starting it on first use.
+    It has RECEIPT_BULK_WORKERS workers however many requests run at once.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = _create_pool(getattr(settings, 'RECEIPT_BULK_WORKERS', 2))
+        return _shared_pool
+
+
+def _discard_shared_pool(pool):
+    """Forget a broken shared pool, so the next request starts a new one"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is pool:
+            _shared_pool = None
+    pool.shutdown(wait=False)
+
+
+class BulkReceiptRenderer:
+    """
+    Renders many receipts across a process pool and writes them into a ZIP archive.
+    Web requests render in the shared pool (get_shared_pool); the render_receipts
+    command starts a pool sized for the machine.
+
+    Orders and bookings are read in chunks with their user, items and payments
+    prefetched, and at most a few jobs per worker are in flight at a time, so
+    memory stays bounded no matter how many receipts are requested.
+    """
+
+    KINDS = ('order', 'booking')
+
+    def __init__(self, workers=None, chunk_size=200, executor=None):
+        """
+        Args:
+            workers: Number of worker processes (defaults to the CPU count, or RECEIPT_BULK_WORKERS with an executor)
+            chunk_size: Number of orders/bookings read per query
+            executor: A shared ProcessPoolExecutor to render in (see get_shared_pool);
+                      without one, write_zip starts and stops its own pool
+        """
+        self.executor = executor
+        if executor:
+            workers = workers or getattr(settings, 'RECEIPT_BULK_WORKERS', 2)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def get_queryset(self, kind, ids=None, start_date=None, end_date=None):
+        payments = Prefetch('payment_set', queryset=Payment.objects.order_by('id'))
+        if kind == 'order':
+            queryset = Order.objects.select_related('user').prefetch_related(
+                Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product')),
+                payments
+            )
+        else:
+            queryset = Booking.objects.select_related('user', 'service_type').prefetch_related(payments)
+
+        if ids:
+            queryset = queryset.filter(id__in=ids)
+        if start_date:
+            queryset = queryset.filter(created_at__date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(created_at__date__lte=end_date)
+        return queryset.order_by('id')
+
+    def iter_jobs(self, kinds, ids=None, start_date=None, end_date=None):
+        """
+        Yield (kind, object, payment) tuples for every receipt to render.
+        Objects without a payment have no receipt and are skipped.
+        """
+        for kind in kinds:
+            queryset = self.get_queryset(kind, ids=ids, start_date=start_date, end_date=end_date)
+            for obj in queryset.iterator(chunk_size=self.chunk_size):
+                payments = obj.payment_set.all()
+                if payments:
+                    yield kind, obj, payments[0]
+
+    def write_zip(self, jobs, fileobj):
+        """
+        Render all jobs and write the PDFs into ``fileobj`` as a ZIP archive.
+
+        Returns:
+            dict: Receipt count, elapsed seconds and throughput per second and per core
+        """
+        started = time.perf_counter()
+        count = 0
+        max_in_flight = self.workers * 2
+        jobs = iter(jobs)
+
+        pool = nullcontext(self.executor) if self.executor else _create_pool(self.workers)
+        with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive, pool as executor:
+            pending = set()
+            exhausted = False
+            while pending or not exhausted:
+                # Keep the pool busy without queueing the whole result set
+                while not exhausted and len(pending) < max_in_flight:
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                    else:
+                        pending.add(executor.submit(render_receipt, job))
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        filename, data = future.result()
+                    except BrokenProcessPool:
+                        if self.executor:
+                            _discard_shared_pool(self.executor)
+                        raise
+                    archive.writestr(filename, data)
+                    count += 1
+
+        elapsed = time.perf_counter() - started
+        per_second = count / elapsed if elapsed else 0
+        return {
+            'count': count,
+            'elapsed': elapsed,
+            'workers': self.workers,
+            'receipts_per_second': per_second,
+            'receipts_per_second_per_core': per_second / self.workers
+        }
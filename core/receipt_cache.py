@@ -0,0 +1,89 @@
+import hashlib
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from .receipt_generator import ReceiptGenerator
+
+
+class ReceiptCache:
+    """
+    Content-addressed storage for rendered receipt PDFs.
+
+    A receipt is keyed by a hash of everything it is rendered from (see
+    ReceiptGenerator.receipt_inputs: the order or booking, its items or
+    service, the customer, the payment) and the language, so a stored PDF is
+    valid for as long as its key is. The key doubles as the HTTP ETag.
+    """
+
+    def __init__(self, storage=None, location=None):
+        self.storage = storage or default_storage
+        self.location = location or getattr(settings, 'RECEIPT_CACHE_LOCATION', 'receipts')
+
+    @staticmethod
+    def make_key(kind, obj, payment, language):
+        """
+        Build the cache key for a receipt.
+
+        Args:
+            kind: 'order' or 'booking'
+            obj: The Order or Booking object
+            payment: The Payment object, or None
+            language: The language code the receipt is rendered in
+
+        Returns:
+            str: A hex digest identifying this version of the receipt
+        """
+        parts = [kind, str(obj.pk), language or ''] + ReceiptGenerator.receipt_inputs(kind, obj, payment)
+        return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+    def _directory(self, kind, obj_id):
+        return f'{self.location}/{kind}/{obj_id}'
+
+    def _path(self, kind, obj_id, key):
+        return f'{self._directory(kind, obj_id)}/{key}.pdf'
+
+    def get(self, kind, obj_id, key):
+        """Return an open file for a stored receipt, or None if it is not cached"""
+        path = self._path(kind, obj_id, key)
+        if self.storage.exists(path):
+            return self.storage.open(path, 'rb')
+        return None
+
+    def put(self, kind, obj_id, key, buffer):
+        """Store a rendered receipt and evict older versions of the same receipt"""
+        path = self._path(kind, obj_id, key)
+        if not self.storage.exists(path):
+            self.storage.save(path, ContentFile(buffer.getvalue()))
+        self.evict(kind, obj_id, keep=key)
+
+    def evict(self, kind, obj_id, keep=None):
+        """Delete stored versions of a receipt, except the one keyed ``keep``"""
+        directory = self._directory(kind, obj_id)
+        try:
+            _, files = self.storage.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in files:
+            if name != f'{keep}.pdf':
+                self.storage.delete(f'{directory}/{name}')
+
+    def get_or_render(self, kind, obj, payment, language, render):
+        """
+        Return an open file for the receipt, rendering and storing it on a miss.
+        Falls back to the rendered buffer if the stored file is evicted before it is opened.
+
+        Args:
+            render: Callable returning a BytesIO with the PDF data
+        """
+        key = self.make_key(kind, obj, payment, language)
+        cached = self.get(kind, obj.pk, key)
+        if cached is not None:
+            return cached
+        buffer = render()
+        self.put(kind, obj.pk, key, buffer)
+        stored = self.get(kind, obj.pk, key)
+        if stored is None:
+            # Evicted by a concurrent render of a newer version; serve this render directly
+            buffer.seek(0)
+            return buffer
+        return stored
@@ -1,5 +1,6 @@
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
@@ -9,65 +10,208 @@ import os
 from decimal import Decimal
 from datetime import datetime
 
+
+class _LogoImage(Image):
+    """Image flowable that draws an already decoded logo instead of reading a file."""
+
+    def __init__(self, reader, width, height):
+        self._img = reader
+        super().__init__(BytesIO(), width=width, height=height)
+
+
+class ReceiptTemplate:
+    """
+    Precompiled receipt layout shared by every receipt rendered in a process.
+
+    Building the sample stylesheet, the table styles and decoding the logo is
+    more expensive than laying out a receipt, so it is done once per worker
+    (see ``get_receipt_template``) instead of on every call.
+    """
+
+    def __init__(self, logo_path=None):
+        self.styles = getSampleStyleSheet()
+        self.title_style = self.styles['Heading1']
+        self.terms_style = ParagraphStyle(
+            'Terms',
+            parent=self.styles['Normal'],
+            fontSize=8,
+            textColor=colors.grey
+        )
+
+        # Two-column key/value table used for order and booking details
+        self.info_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (0, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('BACKGROUND', (1, 0), (1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+
+        # Line items followed by subtotal, tax, discount and grand total rows
+        self.items_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, -4), (-1, -1), 'Helvetica-Bold'),
+        ])
+
+        self.payment_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
+            ('SPAN', (0, 0), (1, 0)),
+            ('ALIGN', (0, 0), (1, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (1, 0), 12),
+            ('BACKGROUND', (0, 1), (0, -1), colors.lightgrey),
+            ('TEXTCOLOR', (0, 1), (0, -1), colors.black),
+            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 1), (0, -1), 10),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 12),
+            ('BACKGROUND', (1, 1), (1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+
+        # Decode the company logo once, if available
+        logo_path = logo_path or os.path.join(settings.STATIC_ROOT, 'images/logo.png')
+        self.logo = None
+        if os.path.exists(logo_path):
+            self.logo = ImageReader(logo_path)
+            self.logo.getRGBData()
+
+    def logo_flowable(self):
+        if self.logo is None:
+            return None
+        return _LogoImage(self.logo, width=2*inch, height=1*inch)
+
+    def terms_paragraph(self):
+        return Paragraph(
+            "Terms and Conditions: This is a computer-generated receipt and does not require a signature. " +
+            "For any queries regarding this receipt, please contact our customer support.",
+            self.terms_style
+        )
+
+
+_receipt_template = None
+
+def get_receipt_template():
+    """Return this process's ReceiptTemplate, building it on first use"""
+    global _receipt_template
+    if _receipt_template is None:
+        _receipt_template = ReceiptTemplate()
+    return _receipt_template
+
+
 class ReceiptGenerator:
     """
     Utility class for generating PDF receipts for orders and bookings.
     """
-    
+
     @staticmethod
-    def generate_order_receipt(order, payment):
+    def receipt_inputs(kind, obj, payment):
+        """
+        Return every value a receipt is rendered from, so caches can tell when it changes.
+        Must list whatever generate_order_receipt / generate_booking_receipt read.
+
+        Args:
+            kind: 'order' or 'booking'
+            obj: The Order or Booking object
+            payment: The Payment object, or None
+
+        Returns:
+            list: The values, as strings
+        """
+        user = obj.user
+        values = [
+            obj.id, obj.created_at.isoformat(), obj.status,
+            user.first_name, user.last_name, user.email, user.phone_number, user.membership_status,
+        ]
+        if kind == 'order':
+            values.append(obj.total_price)
+            for item in obj.orderitem_set.all():
+                values.extend([item.product.name, item.quantity, item.price])
+        else:
+            values.extend([obj.price, obj.service_type.name, obj.scheduled_time.isoformat()])
+        if payment is not None:
+            values.extend([
+                payment.payment_method, payment.transaction_id,
+                payment.created_at.isoformat(), payment.status,
+            ])
+        return [str(value) for value in values]
+
+    @staticmethod
+    def _header(template, title, info_rows):
+        elements = []
+
+        # Add company logo if available
+        logo = template.logo_flowable()
+        if logo is not None:
+            elements.append(logo)
+
+        # Add title
+        elements.append(Paragraph(title, template.title_style))
+        elements.append(Spacer(1, 0.25*inch))
+
+        # Add order/booking information
+        info_table = Table(info_rows, colWidths=[2*inch, 4*inch])
+        info_table.setStyle(template.info_table_style)
+        elements.append(info_table)
+        elements.append(Spacer(1, 0.25*inch))
+        return elements
+
+    @staticmethod
+    def _footer(template, payment):
+        # Add payment information
+        payment_info = [
+            ["Payment Information", ""],
+            ["Payment Method:", payment.get_payment_method_display()],
+            ["Transaction ID:", payment.transaction_id],
+            ["Payment Date:", payment.created_at.strftime("%Y-%m-%d %H:%M")],
+            ["Payment Status:", payment.get_status_display()]
+        ]
+
+        payment_table = Table(payment_info, colWidths=[2*inch, 4*inch])
+        payment_table.setStyle(template.payment_table_style)
+
+        # Add terms and conditions
+        return [payment_table, Spacer(1, 0.25*inch), template.terms_paragraph()]
+
+    @staticmethod
+    def generate_order_receipt(order, payment, template=None):
         """
         Generate a PDF receipt for an order.
-        
+
         Args:
             order: The Order object
             payment: The Payment object
-            
+            template: The ReceiptTemplate to use (defaults to the per-process template)
+
         Returns:
             BytesIO: A buffer containing the PDF data
         """
+        template = template or get_receipt_template()
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        elements = []
-        
-        # Add company logo if available
-        logo_path = os.path.join(settings.STATIC_ROOT, 'images/logo.png')
-        if os.path.exists(logo_path):
-            logo = Image(logo_path, width=2*inch, height=1*inch)
-            elements.append(logo)
-        
-        # Add title
-        title_style = styles['Heading1']
-        title = Paragraph("Order Receipt", title_style)
-        elements.append(title)
-        elements.append(Spacer(1, 0.25*inch))
-        
-        # Add order information
-        order_info = [
+
+        elements = ReceiptGenerator._header(template, "Order Receipt", [
             ["Order Number:", f"#{order.id}"],
             ["Date:", order.created_at.strftime("%Y-%m-%d %H:%M")],
             ["Customer:", f"{order.user.first_name} {order.user.last_name}"],
             ["Email:", order.user.email],
             ["Phone:", order.user.phone_number],
             ["Status:", order.get_status_display()]
-        ]
-        
-        order_table = Table(order_info, colWidths=[2*inch, 4*inch])
-        order_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (0, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(order_table)
-        elements.append(Spacer(1, 0.25*inch))
-        
+        ])
+
         # Add order items
         items_data = [["Product", "Quantity", "Price", "Total"]]
         for item in order.orderitem_set.all():
@@ -77,238 +221,100 @@ class ReceiptGenerator:
                 f"₹{item.price:.2f}",
                 f"₹{(item.price * item.quantity):.2f}"
             ])
-        
+
         # Add totals
         items_data.append(["Subtotal", "", "", f"₹{order.total_price:.2f}"])
-        
+
         # Calculate GST (18% on 90% of amount as per Indian regulations)
         taxable_amount = order.total_price * Decimal('0.9')
         gst = taxable_amount * Decimal('0.18')
-        
+
         items_data.append(["GST (18%)", "", "", f"₹{gst:.2f}"])
-        
+
         # Apply membership discount if applicable
         discount = Decimal('0')
         if order.user.membership_status == 'P':
             discount = order.total_price * Decimal('0.1')  # 10% discount for premium members
             items_data.append(["Membership Discount (10%)", "", "", f"-₹{discount:.2f}"])
-        
+
         # Calculate grand total
         grand_total = order.total_price + gst - discount
         items_data.append(["Grand Total", "", "", f"₹{grand_total:.2f}"])
-        
+
         items_table = Table(items_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
-        items_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, -4), (-1, -1), 'Helvetica-Bold'),
-        ]))
-        
+        items_table.setStyle(template.items_table_style)
+
         elements.append(items_table)
         elements.append(Spacer(1, 0.25*inch))
-        
-        # Add payment information
-        payment_info = [
-            ["Payment Information", ""],
-            ["Payment Method:", payment.get_payment_method_display()],
-            ["Transaction ID:", payment.transaction_id],
-            ["Payment Date:", payment.created_at.strftime("%Y-%m-%d %H:%M")],
-            ["Payment Status:", payment.get_status_display()]
-        ]
-        
-        payment_table = Table(payment_info, colWidths=[2*inch, 4*inch])
-        payment_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
-            ('SPAN', (0, 0), (1, 0)),
-            ('ALIGN', (0, 0), (1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (1, 0), 12),
-            ('BACKGROUND', (0, 1), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 1), (0, -1), colors.black),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 1), (0, -1), 10),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 12),
-            ('BACKGROUND', (1, 1), (1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(payment_table)
-        elements.append(Spacer(1, 0.25*inch))
-        
-        # Add terms and conditions
-        terms_style = ParagraphStyle(
-            'Terms',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.grey
-        )
-        terms = Paragraph(
-            "Terms and Conditions: This is a computer-generated receipt and does not require a signature. " +
-            "For any queries regarding this receipt, please contact our customer support.",
-            terms_style
-        )
-        elements.append(terms)
-        
+        elements.extend(ReceiptGenerator._footer(template, payment))
+
         # Build the PDF
         doc.build(elements)
         buffer.seek(0)
         return buffer
-    
+
     @staticmethod
-    def generate_booking_receipt(booking, payment):
+    def generate_booking_receipt(booking, payment, template=None):
         """
         Generate a PDF receipt for a booking.
-        
+
         Args:
             booking: The Booking object
             payment: The Payment object
-            
+            template: The ReceiptTemplate to use (defaults to the per-process template)
+
         Returns:
             BytesIO: A buffer containing the PDF data
         """
+        template = template or get_receipt_template()
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        elements = []
-        
-        # Add company logo if available
-        logo_path = os.path.join(settings.STATIC_ROOT, 'images/logo.png')
-        if os.path.exists(logo_path):
-            logo = Image(logo_path, width=2*inch, height=1*inch)
-            elements.append(logo)
-        
-        # Add title
-        title_style = styles['Heading1']
-        title = Paragraph("Booking Receipt", title_style)
-        elements.append(title)
-        elements.append(Spacer(1, 0.25*inch))
-        
-        # Add booking information
-        booking_info = [
+
+        elements = ReceiptGenerator._header(template, "Booking Receipt", [
             ["Booking Number:", f"#{booking.id}"],
             ["Date:", booking.created_at.strftime("%Y-%m-%d %H:%M")],
             ["Customer:", f"{booking.user.first_name} {booking.user.last_name}"],
             ["Email:", booking.user.email],
             ["Phone:", booking.user.phone_number],
             ["Status:", booking.get_status_display()]
-        ]
-        
-        booking_table = Table(booking_info, colWidths=[2*inch, 4*inch])
-        booking_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (0, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(booking_table)
-        elements.append(Spacer(1, 0.25*inch))
-        
+        ])
+
         # Add service details
         service_data = [["Service", "Date", "Time", "Price"]]
         service_data.append([
-            booking.service.name,
-            booking.service_date.strftime("%Y-%m-%d"),
-            booking.service_time.strftime("%H:%M"),
-            f"₹{booking.service.price:.2f}"
+            booking.service_type.name,
+            booking.scheduled_time.strftime("%Y-%m-%d"),
+            booking.scheduled_time.strftime("%H:%M"),
+            f"₹{booking.price:.2f}"
         ])
-        
+
         # Add totals
-        service_data.append(["Subtotal", "", "", f"₹{booking.total_price:.2f}"])
-        
+        service_data.append(["Subtotal", "", "", f"₹{booking.price:.2f}"])
+
         # Calculate GST (18% on 90% of amount as per Indian regulations)
-        taxable_amount = booking.total_price * Decimal('0.9')
+        taxable_amount = booking.price * Decimal('0.9')
         gst = taxable_amount * Decimal('0.18')
-        
+
         service_data.append(["GST (18%)", "", "", f"₹{gst:.2f}"])
-        
+
         # Apply membership discount if applicable
         discount = Decimal('0')
         if booking.user.membership_status == 'P':
-            discount = booking.total_price * Decimal('0.1')  # 10% discount for premium members
+            discount = booking.price * Decimal('0.1')  # 10% discount for premium members
             service_data.append(["Membership Discount (10%)", "", "", f"-₹{discount:.2f}"])
-        
+
         # Calculate grand total
-        grand_total = booking.total_price + gst - discount
+        grand_total = booking.price + gst - discount
         service_data.append(["Grand Total", "", "", f"₹{grand_total:.2f}"])
-        
+
         service_table = Table(service_data, colWidths=[3*inch, 1.5*inch, 1*inch, 1.5*inch])
-        service_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, -4), (-1, -1), 'Helvetica-Bold'),
-        ]))
-        
+        service_table.setStyle(template.items_table_style)
+
         elements.append(service_table)
         elements.append(Spacer(1, 0.25*inch))
-        
-        # Add payment information
-        payment_info = [
-            ["Payment Information", ""],
-            ["Payment Method:", payment.get_payment_method_display()],
-            ["Transaction ID:", payment.transaction_id],
-            ["Payment Date:", payment.created_at.strftime("%Y-%m-%d %H:%M")],
-            ["Payment Status:", payment.get_status_display()]
-        ]
-        
-        payment_table = Table(payment_info, colWidths=[2*inch, 4*inch])
-        payment_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
-            ('SPAN', (0, 0), (1, 0)),
-            ('ALIGN', (0, 0), (1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (1, 0), 12),
-            ('BACKGROUND', (0, 1), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 1), (0, -1), colors.black),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 1), (0, -1), 10),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 12),
-            ('BACKGROUND', (1, 1), (1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(payment_table)
-        elements.append(Spacer(1, 0.25*inch))
-        
-        # Add terms and conditions
-        terms_style = ParagraphStyle(
-            'Terms',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.grey
-        )
-        terms = Paragraph(
-            "Terms and Conditions: This is a computer-generated receipt and does not require a signature. " +
-            "For any queries regarding this receipt, please contact our customer support.",
-            terms_style
-        )
-        elements.append(terms)
-        
+        elements.extend(ReceiptGenerator._footer(template, payment))
+
         # Build the PDF
         doc.build(elements)
         buffer.seek(0)
-        return buffer
\ No newline at end of file
+        return buffer
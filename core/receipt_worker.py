@@ -0,0 +1,25 @@
+"""
+Entry points of bulk receipt worker processes.
+
+Spawned workers import this module before Django is set up, so it must not
+import models at module level; the jobs' model instances are unpickled only
+after init_worker has run.
+"""
+
+
+def init_worker():
+    # Spawned workers start with an empty app registry
+    import django
+    django.setup()
+
+
+def render_receipt(job):
+    """Render one receipt in a worker process. Jobs carry fully prefetched objects, so no queries run here."""
+    from .receipt_generator import ReceiptGenerator
+
+    kind, obj, payment = job
+    if kind == 'order':
+        buffer = ReceiptGenerator.generate_order_receipt(obj, payment)
+    else:
+        buffer = ReceiptGenerator.generate_booking_receipt(obj, payment)
+    return f'{kind}_receipt_{obj.id}.pdf', buffer.getvalue()
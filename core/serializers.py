@@ -1,6 +1,13 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth.models import User
-from .models import User, ServiceProvider, ServiceType, Product, Booking, Order, OrderItem, LoyaltyProgram, Payment, Membership, UserMembership, Review, Notification, Shop, ReturnRequest, Coupon, CouponUsage, AuditLog
+from django.utils.translation import gettext_lazy as _
+from .authentication import set_user_claims
+from .token_revocation import is_revoked, revoke
+from .models import User, ServiceProvider, ServiceType, Product, Booking, Order, OrderItem, LoyaltyProgram, Payment, Membership, UserMembership, Review, Notification, NotificationBroadcast, Shop, ReturnRequest, Coupon, CouponUsage, AuditLog
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,6 +15,43 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'phone_number', 'address', 'membership_status', 'date_joined')
         extra_kwargs = {'password': {'write_only': True}}
 
+class UserClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues token pairs carrying the user's claim fields (see core.authentication)"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        set_user_claims(token, user)
+        return token
+
+class UserClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refreshes the claims from the current user row along with the access token.
+    Rotated refresh tokens are revoked when BLACKLIST_AFTER_ROTATION is set.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_revoked(refresh):
+            raise InvalidToken(_('Token has been revoked'))
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        # The access token copies its claims from the refresh token
+        set_user_claims(refresh, user)
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                revoke(refresh, user.pk)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
+
 class LoyaltyProgramSerializer(serializers.ModelSerializer):
     class Meta:
         model = LoyaltyProgram
@@ -88,6 +132,18 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = '__all__'
 
+class NotificationBroadcastSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationBroadcast
+        fields = '__all__'
+        read_only_fields = ('created_by', 'last_user_id', 'created_count', 'created_at', 'completed_at')
+
+    def validate_membership_statuses(self, value):
+        valid = {code for code, _ in User.MEMBERSHIP_CHOICES}
+        if not isinstance(value, list) or not set(value) <= valid:
+            raise serializers.ValidationError(f'Must be a list of membership statuses: {", ".join(sorted(valid))}.')
+        return value
+
 class ShopSerializer(serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
     
@@ -0,0 +1,225 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from .analytics_cache import AnalyticsCache
+from .authentication import VERSIONED_FIELDS
+from .analytics_rollups import SPECS_BY_SOURCE, SPECS_BY_PARENT, apply_change, apply_parent_change
+from .active_users import record_activity
+from .models import Order, Booking, OrderItem, Payment, Product, ServiceProvider, User, Notification
+from .notification_counters import adjust
+from .realtime import publish_to_user
+from .serializers import NotificationSerializer
+from .user_cache import UserSnapshotCache
+
+
+def _affects(fields, update_fields):
+    # Saves limited to unrelated fields (e.g. last_login) cannot move a row between buckets
+    if update_fields is None:
+        return True
+    return any(field in update_fields or field.removesuffix('_id') in update_fields for field in fields)
+
+
+def _tracked_fields(sender, update_fields):
+    """Return the fields of ``sender`` that affected rollups depend on, as (own specs, parent specs, fields)"""
+    specs = [spec for spec in SPECS_BY_SOURCE.get(sender, ()) if _affects(spec.fields, update_fields)]
+    child_specs = [
+        spec for spec in SPECS_BY_PARENT.get(sender, ())
+        if _affects(spec.parent_fields().values(), update_fields)
+    ]
+    fields = set()
+    for spec in specs:
+        fields.update(spec.fields)
+    for spec in child_specs:
+        fields.update(spec.parent_fields().values())
+    return specs, child_specs, fields
+
+
+def _capture_rollup_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Remember the stored values of a row before it is updated"""
+    instance._rollup_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    _specs, _child_specs, fields = _tracked_fields(sender, update_fields)
+    if fields:
+        # One read covers every rollup that depends on this row
+        instance._rollup_previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _update_rollups(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    specs, child_specs, _fields = _tracked_fields(sender, update_fields)
+    previous = None if created else getattr(instance, '_rollup_previous', None)
+    days = []
+    for spec in specs:
+        old_values = {field: previous[field] for field in spec.fields} if previous else None
+        days.extend(apply_change(spec, old_values, spec.instance_values(instance)))
+    if previous:
+        for spec in child_specs:
+            days.extend(apply_parent_change(spec, instance.pk, previous))
+    _invalidate_days(days)
+    instance._rollup_previous = None
+
+
+def _remove_from_rollups(sender, instance, **kwargs):
+    days = []
+    for spec in SPECS_BY_SOURCE[sender]:
+        days.extend(apply_change(spec, spec.instance_values(instance), None))
+    _invalidate_days(days)
+
+
+def _detach_order_payments(sender, instance, **kwargs):
+    """
+    Move a deleted order's payments to their order-less buckets.
+    The delete nulls Payment.order with a plain UPDATE, which sends no signals.
+    """
+    days = []
+    for spec in SPECS_BY_SOURCE[Payment]:
+        if 'order_id' not in spec.fields:
+            continue
+        for values in Payment.objects.filter(order_id=instance.pk).values(*spec.fields):
+            days.extend(apply_change(spec, values, {**values, 'order_id': None}))
+    _invalidate_days(days)
+
+
+def _invalidate_days(days):
+    # Deferred until commit so a concurrent recompute cannot cache the old data under the new generation
+    if days:
+        transaction.on_commit(lambda: AnalyticsCache().invalidate_days(days))
+
+
+# Undated data read by analytics sections: model -> (cache scope, fields that matter or None for all)
+ANALYTICS_SCOPES = {
+    Product: ('products', None),
+    OrderItem: ('products', None),
+    ServiceProvider: ('services', None),
+    User: ('users', ('membership_status',)),
+}
+
+
+def _invalidate_scope(sender, instance, update_fields=None, raw=False, **kwargs):
+    scope, fields = ANALYTICS_SCOPES[sender]
+    if raw or (fields and update_fields is not None and not set(fields) & set(update_fields)):
+        return
+    transaction.on_commit(lambda: AnalyticsCache().invalidate_scope(scope))
+
+
+def _record_activity(sender, instance, created=False, raw=False, **kwargs):
+    """Add the user of a new order or booking to the day's active-user sketch"""
+    if raw or not created or instance.user_id is None:
+        return
+    user_id, created_at = instance.user_id, instance.created_at
+    transaction.on_commit(lambda: record_activity(user_id, created_at))
+
+
+def _capture_notification_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Remember who a notification counted as unread for before it is updated"""
+    instance._unread_previous = None
+    if raw or instance._state.adding or instance.pk is None or not _affects(('user_id', 'status'), update_fields):
+        return
+    instance._unread_previous = sender.objects.filter(pk=instance.pk).values_list('user_id', 'status').first()
+
+
+def _count_notification(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        if instance.status == Notification.UNREAD:
+            adjust(instance.user_id, 1)
+        publish_to_user(instance.user_id, 'notification', NotificationSerializer(instance).data, event_id=instance.pk)
+        return
+    previous = getattr(instance, '_unread_previous', None)
+    instance._unread_previous = None
+    if previous is None or previous == (instance.user_id, instance.status):
+        return
+    user_id, status = previous
+    if status == Notification.UNREAD:
+        adjust(user_id, -1)
+    if instance.status == Notification.UNREAD:
+        adjust(instance.user_id, 1)
+
+
+def _uncount_notification(sender, instance, **kwargs):
+    if instance.status == Notification.UNREAD:
+        adjust(instance.user_id, -1)
+
+
+def _version_user_claims(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Bump claims_version when a field embedded in access tokens changes.
+
+    The version is taken from the stored row, so saving an instance loaded
+    before another bump cannot bring an older version back.
+    """
+    instance._claims_bumped = False
+    if raw or instance._state.adding or instance.pk is None or not _affects(VERSIONED_FIELDS, update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('claims_version', *VERSIONED_FIELDS).first()
+    if previous is None:
+        return
+    version, *values = previous
+    instance._claims_bumped = values != [getattr(instance, field) for field in VERSIONED_FIELDS]
+    instance.claims_version = version + 1 if instance._claims_bumped else version
+
+
+def _save_claims_version(sender, instance, raw=False, update_fields=None, **kwargs):
+    # update_fields saves leave claims_version out unless it is listed
+    bumped = getattr(instance, '_claims_bumped', False)
+    instance._claims_bumped = False
+    if not raw and bumped and update_fields is not None and 'claims_version' not in update_fields:
+        sender.objects.filter(pk=instance.pk).update(claims_version=instance.claims_version)
+
+
+def _invalidate_user_snapshot(sender, instance, raw=False, **kwargs):
+    # After commit, so a request reading the old row cannot cache it under the new version
+    if not raw:
+        transaction.on_commit(lambda: UserSnapshotCache().invalidate(instance.pk))
+
+
+def _capture_booking_status(sender, instance, **kwargs):
+    # Taken from the snapshot _capture_rollup_state read just before (it is connected first).
+    # The booking rollups depend on status, so the snapshot has it whenever the save can change it
+    previous = getattr(instance, '_rollup_previous', None)
+    instance._status_previous = previous.get('status') if previous else None
+
+
+def _publish_booking_status(sender, instance, created=False, raw=False, **kwargs):
+    """Push booking status changes to the booking's user"""
+    previous = getattr(instance, '_status_previous', None)
+    instance._status_previous = None
+    if raw or created or previous is None or previous == instance.status or instance.user_id is None:
+        return
+    publish_to_user(instance.user_id, 'booking', {
+        'id': instance.pk,
+        'status': instance.status,
+        'previous_status': previous,
+        'scheduled_time': instance.scheduled_time,
+    })
+
+
+for model in set(SPECS_BY_SOURCE) | set(SPECS_BY_PARENT):
+    name = model.__name__
+    pre_save.connect(_capture_rollup_state, sender=model, dispatch_uid=f'rollup_pre_save_{name}')
+    post_save.connect(_update_rollups, sender=model, dispatch_uid=f'rollup_post_save_{name}')
+for model in SPECS_BY_SOURCE:
+    post_delete.connect(_remove_from_rollups, sender=model, dispatch_uid=f'rollup_post_delete_{model.__name__}')
+pre_delete.connect(_detach_order_payments, sender=Order, dispatch_uid='rollup_pre_delete_Order')
+
+for model in ANALYTICS_SCOPES:
+    name = model.__name__
+    post_save.connect(_invalidate_scope, sender=model, dispatch_uid=f'analytics_scope_post_save_{name}')
+    post_delete.connect(_invalidate_scope, sender=model, dispatch_uid=f'analytics_scope_post_delete_{name}')
+
+for model in (Order, Booking):
+    post_save.connect(_record_activity, sender=model, dispatch_uid=f'active_users_post_save_{model.__name__}')
+
+pre_save.connect(_capture_notification_state, sender=Notification, dispatch_uid='unread_pre_save_Notification')
+post_save.connect(_count_notification, sender=Notification, dispatch_uid='unread_post_save_Notification')
+post_delete.connect(_uncount_notification, sender=Notification, dispatch_uid='unread_post_delete_Notification')
+
+pre_save.connect(_capture_booking_status, sender=Booking, dispatch_uid='realtime_pre_save_Booking')
+post_save.connect(_publish_booking_status, sender=Booking, dispatch_uid='realtime_post_save_Booking')
+
+pre_save.connect(_version_user_claims, sender=User, dispatch_uid='user_claims_pre_save_User')
+post_save.connect(_save_claims_version, sender=User, dispatch_uid='user_claims_post_save_User')
+post_save.connect(_invalidate_user_snapshot, sender=User, dispatch_uid='user_snapshot_post_save_User')
+post_delete.connect(_invalidate_user_snapshot, sender=User, dispatch_uid='user_snapshot_post_delete_User')
@@ -0,0 +1,209 @@
+import heapq
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+from .models import Order, Booking, Payment, ReturnRequest
+
+
+class StatementGenerator:
+    """
+    Utility class for generating multi-page PDF account statements.
+
+    A statement lists every order, booking, payment and refund for a user in
+    date order. Rows are streamed from the database in chunks and drawn one
+    page at a time, so only a single page of rows is held in memory regardless
+    of how long the statement is. ReportLab itself keeps each finished page's
+    content stream (roughly 15 KB) until the document is saved.
+    """
+
+    CHUNK_SIZE = 2000
+    ROW_HEIGHT = 18
+    MARGIN = 0.75 * inch
+    COLUMNS = ["Date", "Type", "Reference", "Description", "Status", "Amount"]
+    COL_WIDTHS = [1.0*inch, 0.8*inch, 1.3*inch, 2.1*inch, 0.9*inch, 0.9*inch]
+    DESCRIPTION_LENGTH = 30
+
+    TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('ALIGN', (-1, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ])
+
+    @classmethod
+    def iter_rows(cls, user, start, end, chunk_size=CHUNK_SIZE):
+        """
+        Yield (date, type, reference, description, status, amount) rows in date order.
+
+        Each source is read with ``values_list().iterator()`` and the four
+        sorted streams are merged lazily.
+        """
+        order_status = dict(Order.STATUS_CHOICES)
+        booking_status = dict(Booking.STATUS_CHOICES)
+        payment_status = dict(Payment.PAYMENT_STATUS)
+        payment_methods = dict(Payment.PAYMENT_METHODS)
+        return_status = dict(ReturnRequest.STATUS_CHOICES)
+        return_reasons = dict(ReturnRequest.REASON_CHOICES)
+
+        def orders():
+            rows = Order.objects.filter(
+                user=user, created_at__gte=start, created_at__lte=end
+            ).order_by('created_at', 'id').values_list('created_at', 'id', 'status', 'total_price')
+            for created_at, pk, status, total in rows.iterator(chunk_size=chunk_size):
+                yield created_at, 'Order', f'#{pk}', '', order_status.get(status, status), total
+
+        def bookings():
+            rows = Booking.objects.filter(
+                user=user, created_at__gte=start, created_at__lte=end
+            ).order_by('created_at', 'id').values_list('created_at', 'id', 'service_type__name', 'status', 'price')
+            for created_at, pk, service, status, price in rows.iterator(chunk_size=chunk_size):
+                yield created_at, 'Booking', f'#{pk}', service, booking_status.get(status, status), price
+
+        def payments():
+            rows = Payment.objects.filter(
+                user=user, created_at__gte=start, created_at__lte=end
+            ).order_by('created_at', 'id').values_list('created_at', 'transaction_id', 'payment_method', 'status', 'amount')
+            for created_at, transaction_id, method, status, amount in rows.iterator(chunk_size=chunk_size):
+                yield created_at, 'Payment', transaction_id, payment_methods.get(method, method), payment_status.get(status, status), amount
+
+        def refunds():
+            rows = ReturnRequest.objects.filter(
+                user=user, created_at__gte=start, created_at__lte=end, refund_amount__isnull=False
+            ).order_by('created_at', 'id').values_list('created_at', 'order_id', 'reason', 'status', 'refund_amount')
+            for created_at, order_id, reason, status, amount in rows.iterator(chunk_size=chunk_size):
+                yield created_at, 'Refund', f'Order #{order_id}', return_reasons.get(reason, reason), return_status.get(status, status), amount
+
+        return heapq.merge(orders(), bookings(), payments(), refunds(), key=lambda row: row[0])
+
+    @classmethod
+    def _format_row(cls, row):
+        date, kind, reference, description, status, amount = row
+        return [
+            date.strftime("%Y-%m-%d"),
+            kind,
+            str(reference)[:20],
+            (description or '')[:cls.DESCRIPTION_LENGTH],
+            status,
+            f"₹{amount:.2f}"
+        ]
+
+    @classmethod
+    def generate(cls, user, start, end, fileobj, chunk_size=CHUNK_SIZE):
+        """
+        Write a statement PDF for ``user`` covering ``start`` to ``end`` into ``fileobj``.
+
+        Args:
+            user: The User the statement is for
+            start: Start of the period (aware datetime)
+            end: End of the period (aware datetime)
+            fileobj: A writable binary file object
+
+        Returns:
+            int: The number of rows in the statement
+        """
+        width, height = letter
+        pdf = canvas.Canvas(fileobj, pagesize=letter, pageCompression=1)
+        pdf.setTitle("Account Statement")
+
+        customer = f"{user.first_name} {user.last_name}".strip() or user.username
+        period = f"{start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}"
+        page_number = 0
+        totals = {'Order': 0, 'Booking': 0, 'Payment': 0, 'Refund': 0}
+        row_count = 0
+
+        def start_page():
+            nonlocal page_number
+            page_number += 1
+            top = height - cls.MARGIN
+            if page_number == 1:
+                pdf.setFont('Helvetica-Bold', 16)
+                pdf.drawString(cls.MARGIN, top - 16, "Account Statement")
+                pdf.setFont('Helvetica', 10)
+                pdf.drawString(cls.MARGIN, top - 34, f"Customer: {customer}")
+                pdf.drawString(cls.MARGIN, top - 48, f"Email: {user.email}")
+                pdf.drawString(cls.MARGIN, top - 62, f"Period: {period}")
+                top -= 80
+            else:
+                pdf.setFont('Helvetica', 9)
+                pdf.drawString(cls.MARGIN, top - 9, f"Account Statement - {customer} - {period}")
+                top -= 20
+            pdf.setFont('Helvetica', 8)
+            pdf.drawRightString(width - cls.MARGIN, cls.MARGIN / 2, f"Page {page_number}")
+            return top
+
+        table_width = sum(cls.COL_WIDTHS)
+        column_x = [cls.MARGIN]
+        for col_width in cls.COL_WIDTHS:
+            column_x.append(column_x[-1] + col_width)
+        padding = 4
+        baseline = (cls.ROW_HEIGHT - 8) / 2 + 1
+
+        def draw_table(rows, top):
+            # Drawn with one grid and one text object per column rather than a
+            # platypus Table, which would emit a separate text object per cell
+            bottom = top - cls.ROW_HEIGHT * (len(rows) + 1)
+            pdf.setFillColor(colors.grey)
+            pdf.rect(cls.MARGIN, top - cls.ROW_HEIGHT, table_width, cls.ROW_HEIGHT, stroke=0, fill=1)
+            pdf.setStrokeColor(colors.black)
+            pdf.setLineWidth(0.5)
+            pdf.grid(column_x, [top - cls.ROW_HEIGHT * i for i in range(len(rows) + 2)])
+
+            pdf.setFillColor(colors.whitesmoke)
+            pdf.setFont('Helvetica-Bold', 8)
+            for x, heading in zip(column_x, cls.COLUMNS[:-1]):
+                pdf.drawString(x + padding, top - cls.ROW_HEIGHT + baseline, heading)
+            pdf.drawRightString(column_x[-1] - padding, top - cls.ROW_HEIGHT + baseline, cls.COLUMNS[-1])
+
+            pdf.setFillColor(colors.black)
+            first_baseline = top - 2 * cls.ROW_HEIGHT + baseline
+            for column, x in enumerate(column_x[:-2]):
+                text = pdf.beginText(x + padding, first_baseline)
+                text.setFont('Helvetica', 8, leading=cls.ROW_HEIGHT)
+                for row in rows:
+                    text.textLine(row[column])
+                pdf.drawText(text)
+
+            # Amounts are right-aligned, so each one is placed individually
+            pdf.setFont('Helvetica', 8)
+            for index, row in enumerate(rows):
+                pdf.drawRightString(column_x[-1] - padding, first_baseline - index * cls.ROW_HEIGHT, row[-1])
+            return bottom
+
+        top = start_page()
+        rows_per_page = int((top - cls.MARGIN) // cls.ROW_HEIGHT) - 1
+        page_rows = []
+        for row in cls.iter_rows(user, start, end, chunk_size=chunk_size):
+            totals[row[1]] += row[5]
+            row_count += 1
+            page_rows.append(cls._format_row(row))
+            if len(page_rows) >= rows_per_page:
+                draw_table(page_rows, top)
+                page_rows = []
+                pdf.showPage()
+                top = start_page()
+                rows_per_page = int((top - cls.MARGIN) // cls.ROW_HEIGHT) - 1
+
+        if page_rows:
+            top = draw_table(page_rows, top)
+
+        # Summary block, moved to a fresh page if it does not fit
+        summary = [["Summary", ""]] + [
+            [f"Total {kind.lower()}s", f"₹{total:.2f}"] for kind, total in totals.items()
+        ]
+        summary_height = cls.ROW_HEIGHT * len(summary) + 0.25 * inch
+        if top - summary_height < cls.MARGIN:
+            pdf.showPage()
+            top = start_page()
+        summary_table = Table(summary, colWidths=[2*inch, 1.5*inch], rowHeights=cls.ROW_HEIGHT)
+        summary_table.setStyle(cls.TABLE_STYLE)
+        summary_table.wrapOn(pdf, width, height)
+        summary_table.drawOn(pdf, cls.MARGIN, top - summary_height)
+
+        pdf.showPage()
+        pdf.save()
+        return row_count
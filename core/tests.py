@@ -1,3 +1,308 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+import threading
+from itertools import islice
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from . import analytics_planner, analytics_rollups, views_stream
+from .coupon_generator import CouponCodeGenerator
+from .login_throttle import CacheBackend
+from .models import (
+    User, Coupon, ProductCategory, Product, Order, OrderItem, Payment, Shop, Booking, ServiceType, ServiceProvider,
+    DailySalesRollup, DailyPaymentRollup, DailyProductRollup, DailyProviderRollup
+)
+from .receipt_cache import ReceiptCache
+from .time_series import gap_filled
 
-# Create your tests here.
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class AnalyticsQueryBudgetTests(TestCase):
+    """The planned dashboard runs a fixed number of queries, whatever the data"""
+
+    # Sales 4, bookings 3, users 4 (two active-user sketch reads), products 4, services 3, returns 2
+    ALL_METRICS_QUERIES = 20
+
+    def setUp(self):
+        cache.clear()
+        staff = User.objects.create_user(username='staff', email='staff@example.com', password='x', is_staff=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(staff)}')
+        # Warm the authentication caches so only the dashboard's own queries are counted
+        self.client.get('/api/analytics/', {'metrics': 'products'})
+
+    def test_all_metrics_query_count(self):
+        with self.assertNumQueries(self.ALL_METRICS_QUERIES):
+            response = self.client.get('/api/analytics/', {'metrics': 'all'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Analytics-Cache'], 'miss')
+
+
+@override_settings(ALLOWED_HOSTS=['*'], TIME_ZONE='UTC')
+class AnalyticsTimezoneTests(TestCase):
+    """Series follow the requested tz; totals and breakdowns come from rollups bucketed in the server timezone"""
+
+    def setUp(self):
+        cache.clear()
+        staff = User.objects.create_user(username='staff', email='staff@example.com', password='x', is_staff=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(staff)}')
+        # 2024-03-02 01:00 UTC is still 2024-03-01 in New York
+        order = Order.objects.create(user=staff, total_price=20)
+        Order.objects.filter(pk=order.pk).update(created_at=datetime(2024, 3, 2, 1, tzinfo=dt_timezone.utc))
+        for spec in analytics_rollups.SPECS_BY_SOURCE[Order]:
+            analytics_rollups.rebuild(spec)
+
+    def sales(self, day, **params):
+        response = self.client.get('/api/analytics/', {
+            'metrics': 'sales', 'period': 'daily', 'start_date': day, 'end_date': day, **params
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.data['sales']
+
+    def test_default_timezone_series_match_totals(self):
+        sales = self.sales('2024-03-02')
+        self.assertEqual(sales['order_count'], 1)
+        self.assertEqual(sales['sales_over_time'], [{'period': '2024-03-02', 'count': 1, 'total': 20.0}])
+
+    def test_other_timezone_buckets_only_the_series(self):
+        sales = self.sales('2024-03-01', tz='America/New_York')
+        self.assertEqual(sales['sales_over_time'], [{'period': '2024-03-01', 'count': 1, 'total': 20.0}])
+        # The order is on 2024-03-02 in server days, outside the totals' range
+        self.assertEqual(sales['order_count'], 0)
+
+
+class GapFilledTests(TestCase):
+    """Runs the generate_series query on PostgreSQL and the Python gap filling elsewhere"""
+
+    def test_periods_without_rows_are_zero(self):
+        user = User.objects.create_user(username='buyer', email='buyer@example.com', password='x')
+        for created_at in (datetime(2024, 3, 2, 10, tzinfo=dt_timezone.utc), datetime(2024, 3, 2, 11, tzinfo=dt_timezone.utc)):
+            order = Order.objects.create(user=user, total_price=10)
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+
+        series = gap_filled(Order.objects.all(), 'created_at', 'day', date(2024, 3, 1), date(2024, 3, 3),
+                            {'count': Count('pk')}, dt_timezone.utc)
+
+        self.assertEqual(series, [
+            (date(2024, 3, 1), {'count': 0}),
+            (date(2024, 3, 2), {'count': 2}),
+            (date(2024, 3, 3), {'count': 0}),
+        ])
+
+
+class ConcurrentSectionsTests(TransactionTestCase):
+    """run_sections on worker threads, each with its own connection"""
+
+    def setUp(self):
+        User.objects.create_user(username='member', email='member@example.com', password='x')
+
+    def run_recording_closes(self, sections):
+        """Run sections concurrently; returns (results or the exception raised, threads that closed connections)"""
+        closing_threads = []
+        close_all = connections.close_all
+
+        def recording_close_all():
+            closing_threads.append(threading.get_ident())
+            close_all()
+
+        # The test database is in-memory SQLite, which other threads can open through its shared cache
+        # (and whose connections ignore close(), so the calls are recorded instead)
+        with mock.patch.object(analytics_planner, '_can_run_concurrently', return_value=True), \
+                mock.patch.object(analytics_planner.connections, 'close_all', recording_close_all):
+            try:
+                results = analytics_planner.run_sections(sections, workers=len(sections))
+            except Exception as e:
+                results = e
+        return results, closing_threads
+
+    def test_sections_run_on_workers_and_close_their_connections(self):
+        section_threads = []
+
+        def section():
+            section_threads.append(threading.get_ident())
+            return User.objects.count()
+
+        results, closing_threads = self.run_recording_closes({'a': section, 'b': section, 'c': section})
+
+        self.assertEqual(results, {'a': 1, 'b': 1, 'c': 1})
+        self.assertNotIn(threading.get_ident(), section_threads)
+        self.assertEqual(sorted(closing_threads), sorted(section_threads))
+
+    def test_failing_section_closes_its_connection(self):
+        def failing():
+            User.objects.count()
+            raise ValueError('section failed')
+
+        results, closing_threads = self.run_recording_closes({'ok': User.objects.count, 'failing': failing})
+
+        self.assertIsInstance(results, ValueError)
+        self.assertEqual(len(closing_threads), 2)
+
+
+class LoginThrottleCacheBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = CacheBackend(cache)
+
+    def test_key_evicted_between_add_and_incr_counts_the_attempt(self):
+        def evicted(key, delta=1, version=None):
+            cache.delete(key)
+            raise ValueError(f"Key '{key}' not found")
+
+        with mock.patch.object(cache, 'incr', side_effect=evicted):
+            self.assertEqual(self.backend.take('ip:1', 1, 1 / 60), 0)
+        # The re-added key holds that attempt, so the next one in the window is throttled
+        self.assertGreater(self.backend.take('ip:1', 1, 1 / 60), 0)
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class NotificationStreamAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.access_token = str(AccessToken.for_user(self.user))
+
+    def authenticate(self, params=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        return views_stream._authenticate(RequestFactory().get('/api/notifications/stream/', params or {}, **headers))
+
+    def stream_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        response = client.post('/api/notifications/stream-token/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['stream_token']
+
+    def test_stream_token_in_the_url(self):
+        self.assertEqual(self.authenticate({'stream_token': self.stream_token()}).pk, self.user.pk)
+
+    def test_access_token_only_in_the_header(self):
+        self.assertEqual(self.authenticate(token=self.access_token).pk, self.user.pk)
+        self.assertIsNone(self.authenticate({'access_token': self.access_token}))
+        self.assertIsNone(self.authenticate({'stream_token': self.access_token}))
+
+    def test_stream_token_is_not_an_access_token(self):
+        stream_token = self.stream_token()
+        self.assertIsNone(self.authenticate(token=stream_token))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {stream_token}')
+        self.assertEqual(client.get('/api/notifications/unread-count/').status_code, 401)
+
+
+class CouponCodeGeneratorTests(TestCase):
+    def setUp(self):
+        self.template = Coupon.objects.create(
+            code='TEMPLATE', description='Summer', discount_type='P', discount_value=10,
+            valid_from=timezone.now(), valid_until=timezone.now() + timedelta(days=30), max_uses=100
+        )
+        self.category = ProductCategory.objects.create(name='Books', description='Books')
+        self.template.applies_to_categories.add(self.category)
+
+    def test_taken_codes_are_replaced(self):
+        generator = CouponCodeGenerator(prefix='S', length=4, key=b'k' * 16)
+        taken = list(islice(generator.iter_codes(), 2))
+        for code in taken:
+            Coupon.objects.create(code=code, description='Other', discount_type='F', discount_value=1,
+                                  valid_from=timezone.now(), valid_until=timezone.now())
+
+        self.assertEqual(generator.generate(self.template, 5, batch_size=3), 5)
+        generated = Coupon.objects.filter(description='Summer').exclude(pk=self.template.pk)
+        self.assertEqual(generated.count(), 5)
+        self.assertFalse(generated.filter(code__in=taken).exists())
+        self.assertEqual(self.category.applicable_coupons.count(), 6)
+
+
+class ReceiptCacheKeyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='x')
+        category = ProductCategory.objects.create(name='Books', description='Books')
+        product = Product.objects.create(name='Novel', description='A novel', price=10, stock_quantity=5,
+                                         category=category, sku='NOVEL-1', gallery_images=['novel.jpg'], weight=1)
+        self.order = Order.objects.create(user=self.user, total_price=20)
+        self.item = OrderItem.objects.create(order=self.order, product=product, quantity=2, price=10)
+        self.payment = Payment.objects.create(user=self.user, order=self.order, amount=20,
+                                              payment_method='UPI', transaction_id='txn-1')
+
+    def key(self):
+        order = Order.objects.select_related('user').get(pk=self.order.pk)
+        return ReceiptCache.make_key('order', order, Payment.objects.get(pk=self.payment.pk), 'en')
+
+    def test_key_changes_with_rendered_fields_outside_the_order(self):
+        keys = {self.key()}
+        for change in (
+            lambda: User.objects.filter(pk=self.user.pk).update(phone_number='+911234567890'),
+            lambda: User.objects.filter(pk=self.user.pk).update(membership_status='P'),
+            lambda: OrderItem.objects.filter(pk=self.item.pk).update(quantity=3),
+            lambda: Payment.objects.filter(pk=self.payment.pk).update(transaction_id='txn-2'),
+        ):
+            change()
+            keys.add(self.key())
+        self.assertEqual(len(keys), 5)
+
+
+class RollupParentDeleteTests(TestCase):
+    """Deleting a row that rollups point at removes its children's contributions without failing"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.category = ProductCategory.objects.create(name='Books', description='Books')
+
+    def assertRollupsConsistent(self, *rollups):
+        connection.check_constraints()
+        for rollup in rollups:
+            self.assertFalse(rollup.objects.filter(count__lt=0).exists())
+
+    def test_delete_shop_with_orders(self):
+        shop = Shop.objects.create(name='Corner', description='d', address='a', contact_info='c', owner=self.user)
+        Order.objects.create(user=self.user, shop=shop, total_price=20)
+        self.assertEqual(DailySalesRollup.objects.filter(shop=shop).count(), 1)
+
+        shop.delete()
+
+        self.assertRollupsConsistent(DailySalesRollup)
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_delete_order_moves_payments_out_of_order_buckets(self):
+        order = Order.objects.create(user=self.user, total_price=20)
+        payment = Payment.objects.create(user=self.user, order=order, amount=20, payment_method='UPI', transaction_id='txn-1')
+
+        order.delete()
+        payment.refresh_from_db()
+        payment.status = 'S'
+        payment.save()
+
+        self.assertRollupsConsistent(DailyPaymentRollup)
+        self.assertEqual(list(DailyPaymentRollup.objects.values_list('is_order', 'status', 'count')), [(False, 'S', 1)])
+
+    def test_delete_product_with_order_items(self):
+        product = Product.objects.create(name='Novel', description='A novel', price=10, stock_quantity=5,
+                                         category=self.category, sku='NOVEL-1', gallery_images=['novel.jpg'], weight=1)
+        order = Order.objects.create(user=self.user, total_price=20)
+        OrderItem.objects.create(order=order, product=product, quantity=2, price=10)
+        self.assertEqual(DailyProductRollup.objects.filter(product=product).count(), 1)
+
+        product.delete()
+
+        self.assertRollupsConsistent(DailyProductRollup)
+        self.assertFalse(DailyProductRollup.objects.exists())
+
+    def test_delete_service_provider_with_bookings(self):
+        service_type = ServiceType.objects.create(name='Cleaning', description='d', base_price=10, unit_price=5)
+        provider = ServiceProvider.objects.create(name='Sparkle', contact_info='c', service_type=service_type, location='L')
+        # Booking.save() prices and validates the slot; the rollups only need the row
+        Booking.objects.bulk_create([Booking(
+            user=self.user, service_provider=provider, service_type=service_type, scheduled_time=timezone.now(),
+            duration=timedelta(hours=1), price=10, preferred_alternate_times=[]
+        )])
+        for spec in analytics_rollups.SPECS_BY_SOURCE[Booking]:
+            analytics_rollups.rebuild(spec)
+        self.assertEqual(DailyProviderRollup.objects.filter(service_provider=provider).count(), 1)
+
+        provider.delete()
+
+        self.assertRollupsConsistent(DailyProviderRollup)
+        self.assertFalse(DailyProviderRollup.objects.exists())
@@ -0,0 +1,155 @@
+"""
+Gap-filled, timezone-aware time series for AnalyticsView.
+
+A series has one entry per day, week (starting Monday), month or year between
+two dates, including periods with no rows, which are reported as zero. On
+PostgreSQL the buckets are generated with ``generate_series`` and joined to
+the aggregate in a single query; other backends run the same aggregate and
+fill the gaps in Python.
+
+Buckets follow the requested timezone. Rollup tables are bucketed by day in
+the default timezone, so they are used when the requested timezone is the
+default one; any other timezone aggregates the source table directly.
+
+Only the series follow the requested timezone. The section totals and
+breakdowns in AnalyticsView are always read from the rollups over the range's
+days in the default timezone, so with another timezone the series can hold
+rows near the ends of the range that the totals leave out, and the other way
+round.
+"""
+from datetime import datetime, timedelta
+from django.db import connections
+from django.db.models import DateTimeField, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from .analytics_rollups import ROLLUP_SPECS, day_range
+
+PERIOD_KINDS = {'daily': 'day', 'weekly': 'week', 'monthly': 'month', 'yearly': 'year'}
+INTERVALS = {'day': '1 day', 'week': '1 week', 'month': '1 month', 'year': '1 year'}
+SPECS_BY_ROLLUP = {spec.rollup: spec for spec in ROLLUP_SPECS}
+
+
+def truncate(day, kind):
+    """Return the first day of the period containing ``day``"""
+    if kind == 'week':
+        return day - timedelta(days=day.weekday())
+    if kind == 'month':
+        return day.replace(day=1)
+    if kind == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def bucket_starts(kind, first_day, last_day):
+    """Yield the first day of every period from the one containing ``first_day`` to ``last_day``"""
+    start = truncate(first_day, kind)
+    while start <= last_day:
+        yield start
+        if kind == 'week':
+            start += timedelta(days=7)
+        elif kind == 'month':
+            start = (start + timedelta(days=32)).replace(day=1)
+        elif kind == 'year':
+            start = start.replace(year=start.year + 1)
+        else:
+            start += timedelta(days=1)
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def gap_filled(queryset, field, kind, first_day, last_day, measures, tzinfo=None):
+    """
+    Aggregate ``queryset`` into periods of ``field`` with no gaps.
+
+    Args:
+        queryset: Rows already filtered to the range
+        field: The date or datetime field to bucket by
+        kind: 'day', 'week', 'month' or 'year'
+        first_day: First local day of the range
+        last_day: Last local day of the range
+        measures: Name -> aggregate expression
+        tzinfo: Timezone that datetime buckets are computed in
+
+    Returns:
+        list: (period start date, {measure: value}) pairs in period order
+    """
+    is_datetime = isinstance(queryset.model._meta.get_field(field), DateTimeField)
+    period = Trunc(field, kind, tzinfo=tzinfo if is_datetime else None)
+    aggregated = queryset.annotate(period=period).values('period').annotate(**measures).order_by()
+    names = list(measures)
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        # Truncated datetimes are local timestamps without a time zone, truncated dates are dates
+        cast = 'timestamp' if is_datetime else 'date'
+        sql, params = aggregated.query.sql_with_params()
+        columns = ', '.join(f'COALESCE(a.{connection.ops.quote_name(name)}, 0)' for name in names)
+        query = (
+            f'SELECT s.period::date, {columns} '
+            f'FROM generate_series(%s::{cast}, %s::{cast}, %s::interval) AS s(period) '
+            f'LEFT JOIN ({sql}) AS a ON a.period = s.period::{cast} '
+            f'ORDER BY s.period'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(query, (truncate(first_day, kind), last_day, INTERVALS[kind]) + tuple(params))
+            return [(row[0], dict(zip(names, row[1:]))) for row in cursor.fetchall()]
+
+    found = {_as_date(entry['period']): entry for entry in aggregated}
+    series = []
+    for start in bucket_starts(kind, first_day, last_day):
+        entry = found.get(start, {})
+        series.append((start, {name: entry.get(name) or 0 for name in names}))
+    return series
+
+
+class TimeSeries:
+    """The period, range and timezone shared by every series of an analytics request"""
+
+    def __init__(self, period, start_date, end_date, tz=None):
+        """
+        Args:
+            period: 'daily', 'weekly', 'monthly' or 'yearly' (anything else is monthly)
+            start_date: First local day of the range
+            end_date: Last local day of the range
+            tz: Timezone for the buckets (defaults to the current timezone)
+        """
+        self.kind = PERIOD_KINDS.get(period, 'month')
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tz = tz or timezone.get_current_timezone()
+
+    def uses_rollups(self):
+        return str(self.tz) == timezone.get_default_timezone_name()
+
+    def for_rollup(self, rollup):
+        """
+        Return the gap-filled series for a rollup's count and total.
+
+        Returns:
+            list: Dicts with 'period' (YYYY-MM-DD), 'count' and, for rollups with a total, 'total'
+        """
+        spec = SPECS_BY_ROLLUP[rollup]
+        if self.uses_rollups():
+            queryset = day_range(rollup.objects.all(), self.start_date, self.end_date)
+            measures = {name: Sum(name) for name in ('count', 'total') if name in spec.measures}
+            field = 'day'
+        else:
+            queryset = spec.source.objects.filter(**{
+                f'{spec.date_field}__gte': timezone.make_aware(datetime.combine(self.start_date, datetime.min.time()), self.tz),
+                f'{spec.date_field}__lte': timezone.make_aware(datetime.combine(self.end_date, datetime.max.time()), self.tz),
+            })
+            if spec.condition_filter is not None:
+                queryset = queryset.filter(spec.condition_filter)
+            measures = {name: spec.measures[name][1] for name in ('count', 'total') if name in spec.measures}
+            field = spec.date_field
+
+        series = gap_filled(queryset, field, self.kind, self.start_date, self.end_date, measures, self.tz)
+        return [
+            dict(
+                period=start.strftime('%Y-%m-%d'),
+                **{name: float(value) if name == 'total' else value for name, value in values.items()}
+            )
+            for start, values in series
+        ]
@@ -0,0 +1,135 @@
+"""
+Revocation of JWTs.
+
+simplejwt's blacklist app would add a query to every authenticated request.
+Instead, revoked token ids (jti) are stored in the RevokedToken table and
+mirrored in each process's memory by Bloom filters, one per hour of token
+expiry. A token is looked up in the filter for the hour it expires in: a
+miss, the answer for nearly every token, proves it was not revoked without
+touching the database, and only a hit is confirmed with an exact lookup,
+since a filter reports about TOKEN_REVOCATION_ERROR_RATE false positives.
+
+Once an hour has passed, every token expiring in it fails validation
+anyway, so its whole filter is dropped; memory stays bounded by the
+revocations made within the longest token lifetime (the refresh token's).
+
+Revocations made in a process reach its filters when the transaction
+commits. Processes pick up each other's by reading the rows revoked since
+their last sync, at most TOKEN_REVOCATION_SYNC_SECONDS apart, so a token
+revoked elsewhere may still be accepted for that long.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from .bloom import BloomFilter
+from .models import RevokedToken
+
+SLOT_SECONDS = 3600
+# Rows are read again from this long before the last sync, so ones that committed late are not missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _slot(expires_at):
+    return int(expires_at // SLOT_SECONDS)
+
+
+class RevocationFilter:
+    """This process's Bloom filters of revoked token ids, keyed by hour of expiry"""
+
+    def __init__(self):
+        self._filters = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at = None
+        self._since = None
+
+    def add(self, jti, expires_at):
+        """Add a revoked token id; ``expires_at`` is the token's exp timestamp"""
+        slot = _slot(expires_at)
+        with self._lock:
+            if slot < _slot(time.time()):
+                return
+            bloom = self._filters.get(slot)
+            if bloom is None:
+                bloom = self._filters[slot] = BloomFilter(
+                    getattr(settings, 'TOKEN_REVOCATION_FILTER_CAPACITY', BloomFilter.DEFAULT_CAPACITY),
+                    getattr(settings, 'TOKEN_REVOCATION_ERROR_RATE', BloomFilter.DEFAULT_ERROR_RATE),
+                )
+            bloom.add(jti)
+
+    def might_contain(self, jti, expires_at):
+        """Return False if the token is certainly not revoked"""
+        self.sync()
+        bloom = self._filters.get(_slot(expires_at))
+        return bloom is not None and jti in bloom
+
+    def sync(self, force=False):
+        """Read the revocations made since the last sync, if it was long enough ago"""
+        interval = getattr(settings, 'TOKEN_REVOCATION_SYNC_SECONDS', 5)
+        if not force and self._synced_at is not None and time.monotonic() - self._synced_at < interval:
+            return
+        # One thread syncs while the others keep using the filters as they are
+        if not self._sync_lock.acquire(blocking=force or self._synced_at is None):
+            return
+        try:
+            started = timezone.now()
+            rows = RevokedToken.objects.filter(expires_at__gt=started)
+            if self._since is not None:
+                rows = rows.filter(revoked_at__gte=self._since - SYNC_OVERLAP)
+            for jti, expires_at in rows.values_list('jti', 'expires_at').iterator():
+                self.add(jti, expires_at.timestamp())
+            self._expire()
+            self._since = started
+            self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def _expire(self):
+        current = _slot(time.time())
+        with self._lock:
+            for slot in [slot for slot in self._filters if slot < current]:
+                del self._filters[slot]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'filters': len(self._filters),
+                'added': sum(len(bloom) for bloom in self._filters.values()),
+                'bytes': sum(len(bloom.bits) for bloom in self._filters.values()),
+            }
+
+
+revocations = RevocationFilter()
+
+
+def revoke(token, user_id=None):
+    """
+    Revoke a validated token until it expires.
+
+    Args:
+        token: A simplejwt Token (access or refresh)
+        user_id: Owner of the token, kept for the admin
+    """
+    jti, expires_at = token[api_settings.JTI_CLAIM], token['exp']
+    RevokedToken.objects.bulk_create([RevokedToken(
+        jti=jti, user_id=user_id, expires_at=datetime.fromtimestamp(expires_at, tz=dt_timezone.utc),
+    )], ignore_conflicts=True)
+    transaction.on_commit(lambda: revocations.add(jti, expires_at))
+
+
+def is_revoked(token):
+    """Return whether a validated token has been revoked; queries the database only on a filter hit"""
+    jti = token.get(api_settings.JTI_CLAIM)
+    if jti is None or not revocations.might_contain(jti, token['exp']):
+        return False
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def purge():
+    """Delete the revocations of tokens that have expired; returns how many"""
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
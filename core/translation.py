@@ -1,5 +1,5 @@
 from modeltranslation.translator import register, TranslationOptions
-from .models import User, ServiceProvider, ServiceType, Product, ProductCategory
+from .models import User, ServiceProvider, ServiceType, Product, ProductCategory, EmailCampaign
 
 @register(User)
 class UserTranslationOptions(TranslationOptions):
@@ -19,4 +19,8 @@ class ProductTranslationOptions(TranslationOptions):
 
 @register(ProductCategory)
 class ProductCategoryTranslationOptions(TranslationOptions):
-    fields = ('name', 'description')
\ No newline at end of file
+    fields = ('name', 'description')
+
+@register(EmailCampaign)
+class EmailCampaignTranslationOptions(TranslationOptions):
+    fields = ('subject', 'body')
@@ -6,6 +6,10 @@ from . import views_shop
 from . import views_return
 from . import views_analytics
 from . import views_coupon
+from . import views_receipt
+from . import views_statement
+from . import views_export
+from . import views_stream
 
 router = DefaultRouter()
 router.register('users', views.UserViewSet)
@@ -25,6 +29,8 @@ router.register('coupons', views_coupon.CouponViewSet)
 router.register('coupon-usages', views_coupon.CouponUsageViewSet, basename='coupon-usage')
 
 urlpatterns = [
+    # Before the router, whose notification detail route would otherwise match it
+    path('notifications/stream/', views_stream.notification_stream, name='notification-stream'),
     path('', include(router.urls)),
     path('register/', views.CreateUserView.as_view(), name='register'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
@@ -36,6 +42,12 @@ urlpatterns = [
     path('password-reset/', auth_views.PasswordResetRequestView.as_view(), name='password-reset'),
     path('password-reset-confirm/', auth_views.PasswordResetConfirmView.as_view(), name='password-reset-confirm'),
     path('change-language/', auth_views.ChangeLanguageView.as_view(), name='change-language'),
+    path('login-throttle/', auth_views.LoginThrottleStatsView.as_view(), name='login-throttle'),
+    # Receipt URL
+    path('receipts/', views_receipt.GenerateReceiptView.as_view(), name='receipt'),
+    path('receipts/bulk/', views_receipt.BulkReceiptView.as_view(), name='receipt-bulk'),
+    path('statements/', views_statement.StatementView.as_view(), name='statement'),
     # Analytics URL
     path('analytics/', views_analytics.AnalyticsView.as_view(), name='analytics'),
+    path('analytics/export/', views_export.AnalyticsExportView.as_view(), name='analytics-export'),
 ]
\ No newline at end of file
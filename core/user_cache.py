@@ -0,0 +1,92 @@
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+
+
+class UserSnapshotCache:
+    """
+    Cache of user rows for request authentication.
+
+    A snapshot holds every column of the user except the password hash, which
+    is left deferred and loaded only if something reads it. Snapshots are
+    keyed by user id and the user's version stamp; saving or deleting a user
+    bumps the stamp (see core.signals), which retires the old snapshot
+    without having to delete it. A missing stamp is started at a fresh value,
+    so a snapshot can never outlive an evicted stamp.
+
+    The user's claims_version, which JWT authentication compares with the one
+    in the token on every request, is cached on its own next to the snapshot.
+
+    Rows changed with QuerySet.update() bypass the signals and are seen once
+    USER_SNAPSHOT_CACHE_TIMEOUT passes, or earlier if ``invalidate`` is called.
+    With a per-process cache backend a save only retires the snapshots of the
+    process that made it; configure a shared backend for more.
+    """
+
+    PREFIX = 'user-snapshot'
+    EXCLUDED_FIELDS = ('password',)
+
+    def __init__(self, cache=None, timeout=None):
+        self.cache = cache or caches[getattr(settings, 'USER_SNAPSHOT_CACHE_ALIAS', 'default')]
+        self.timeout = timeout or getattr(settings, 'USER_SNAPSHOT_CACHE_TIMEOUT', 60)
+        self.model = get_user_model()
+        self.fields = [f.attname for f in self.model._meta.concrete_fields if f.name not in self.EXCLUDED_FIELDS]
+
+    def _version_key(self, user_id):
+        return f'{self.PREFIX}:version:{user_id}'
+
+    def _version(self, user_id):
+        key = self._version_key(user_id)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, time.time_ns(), None)
+            version = self.cache.get(key)
+        return version
+
+    def make_key(self, user_id):
+        """Return the key of the user's current snapshot"""
+        return f'{self.PREFIX}:{user_id}:{self._version(user_id)}'
+
+    def _load(self, user_id):
+        values = self.model.objects.filter(pk=user_id).values_list(*self.fields).first()
+        return dict(zip(self.fields, values)) if values is not None else None
+
+    def get(self, user_id):
+        """
+        Return the user with ``user_id``, from the cache when possible.
+
+        Returns:
+            User: An instance built from the snapshot, or None if there is no such user
+        """
+        if not getattr(settings, 'USER_SNAPSHOT_CACHE_ENABLED', True):
+            return self.model.objects.filter(pk=user_id).first()
+
+        key = self.make_key(user_id)
+        snapshot = self.cache.get(key)
+        if snapshot is None:
+            snapshot = self._load(user_id)
+            if snapshot is None:
+                return None
+            self.cache.set(key, snapshot, self.timeout)
+        return self.model.from_db(router.db_for_read(self.model), list(snapshot), list(snapshot.values()))
+
+    def claims_version(self, user_id):
+        """Return the user's current claims_version, or None if there is no such user"""
+        key = f'{self.PREFIX}:claims:{user_id}'
+        version = self.cache.get(key)
+        if version is None:
+            version = self.model.objects.filter(pk=user_id).values_list('claims_version', flat=True).first()
+            if version is not None:
+                self.cache.set(key, version, self.timeout)
+        return version
+
+    def invalidate(self, user_id):
+        """Retire the user's snapshot and cached claims_version"""
+        self.cache.delete(f'{self.PREFIX}:claims:{user_id}')
+        key = self._version_key(user_id)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, time.time_ns(), None)
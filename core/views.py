@@ -1,16 +1,21 @@
 from rest_framework import viewsets, permissions, status
 from .security import get_permission_classes
+from .login_throttle import LoginRateThrottle
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.views import APIView
-from .models import User, ServiceProvider, ServiceType, Product, Booking, Order, LoyaltyProgram, Membership, UserMembership, Review, Notification
-from .serializers import UserSerializer, AuthTokenSerializer, ServiceProviderSerializer, ServiceTypeSerializer, ProductSerializer, BookingSerializer, OrderSerializer, LoyaltyProgramSerializer, MembershipSerializer, UserMembershipSerializer, ReviewSerializer, NotificationSerializer
+from .models import User, ServiceProvider, ServiceType, Product, Booking, Order, LoyaltyProgram, Membership, UserMembership, Review, Notification, NotificationBroadcast
+from .serializers import UserSerializer, AuthTokenSerializer, ServiceProviderSerializer, ServiceTypeSerializer, ProductSerializer, BookingSerializer, OrderSerializer, LoyaltyProgramSerializer, MembershipSerializer, UserMembershipSerializer, ReviewSerializer, NotificationSerializer, NotificationBroadcastSerializer
 from datetime import datetime
 import razorpay
 from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, action
+from .notification_fanout import fan_out
+from .authentication import StreamToken
+from . import notification_counters
 from .models import Payment, Booking, Order
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -33,6 +38,7 @@ class CreateUserView(APIView):
 
 class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
+    throttle_classes = [LoginRateThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data,
@@ -233,6 +239,7 @@ class OrderViewSet(viewsets.ModelViewSet):
 
 class LoyaltyProgramViewSet(viewsets.ModelViewSet):
     queryset = LoyaltyProgram.objects.all()
+    cursor_ordering = ('-points', '-id')
     serializer_class = LoyaltyProgramSerializer
     permission_classes = get_permission_classes()
 
@@ -256,6 +263,70 @@ class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = get_permission_classes()
 
+    def get_queryset(self):
+        # Regular users only see their own notifications, newest first (the user, created_at index)
+        if not self.request.user.is_authenticated:
+            return Notification.objects.none()
+        notifications = Notification.objects.order_by('-created_at', '-id')
+        if not self.request.user.is_staff:
+            notifications = notifications.filter(user=self.request.user)
+        return notifications
+
+    @action(detail=False, methods=['post'])
+    def broadcast(self, request):
+        """
+        Send a notification to every active user, or to the users in some membership tiers.
+        Only staff users can broadcast. Re-posting a broadcast_id resumes or returns
+        that broadcast instead of sending it again.
+        """
+        if not request.user.is_staff:
+            return Response({'detail': 'Only staff users can broadcast notifications.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        broadcast = NotificationBroadcast.objects.filter(broadcast_id=request.data.get('broadcast_id')).first()
+        created = broadcast is None
+        if created:
+            serializer = NotificationBroadcastSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            try:
+                with transaction.atomic():
+                    broadcast = serializer.save(created_by=request.user)
+            except IntegrityError:
+                # A concurrent request created it after the lookup above
+                broadcast = NotificationBroadcast.objects.get(broadcast_id=serializer.validated_data['broadcast_id'])
+                created = False
+
+        if broadcast.completed_at is None:
+            fan_out(broadcast)
+        return Response(NotificationBroadcastSerializer(broadcast).data,
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='unread-count', permission_classes=[permissions.IsAuthenticated])
+    def unread_count(self, request):
+        """Return the current user's number of unread notifications, for badges"""
+        return Response({'unread': notification_counters.unread_count(request.user)})
+
+    @action(detail=False, methods=['post'], url_path='stream-token', permission_classes=[permissions.IsAuthenticated])
+    def stream_token(self, request):
+        """Issue a short-lived token for opening the notification stream, for clients that cannot set headers"""
+        token = StreamToken.for_user(request.user)
+        return Response({'stream_token': str(token), 'expires_in': int(StreamToken.lifetime.total_seconds())})
+
+    @action(detail=False, methods=['post'], url_path='mark-read', permission_classes=[permissions.IsAuthenticated])
+    def mark_read(self, request):
+        """Mark some of the current user's notifications as read"""
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            return Response({'detail': 'ids must be a list of notification ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        marked = notification_counters.mark_read(request.user, ids)
+        return Response({'marked': marked, 'unread': notification_counters.unread_count(request.user)})
+
+    @action(detail=False, methods=['post'], url_path='mark-all-read', permission_classes=[permissions.IsAuthenticated])
+    def mark_all_read(self, request):
+        """Mark all of the current user's notifications as read"""
+        marked = notification_counters.mark_read(request.user)
+        return Response({'marked': marked, 'unread': notification_counters.unread_count(request.user)})
+
     def post(self, request):
         from decimal import Decimal
         amount = request.data.get('amount')
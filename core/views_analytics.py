@@ -1,11 +1,21 @@
 from rest_framework import views, permissions, status
 from .security import get_permission_classes
 from rest_framework.response import Response
-from django.db.models import Count, Sum, Avg, F, ExpressionWrapper, fields
-from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
+from django.db.models import Count, Sum, F, Q
 from django.utils import timezone
 from datetime import timedelta
-from .models import Order, Booking, User, Product, ServiceProvider, Payment, ReturnRequest
+import zoneinfo
+from .models import (
+    Order, Booking, User, Product, ServiceProvider, ReturnRequest,
+    DailySalesRollup, DailyBookingRollup, DailyPaymentRollup, DailyReturnRollup, DailyUserRollup,
+    DailyProductRollup, DailyProviderRollup
+)
+from .analytics_rollups import day_range
+from .analytics_planner import ScalarPlan, run_sections
+from .analytics_cache import AnalyticsCache
+from .time_series import TimeSeries
+from .active_users import count_active_users
+from . import cohorts
 
 class AnalyticsView(views.APIView):
     """
@@ -23,10 +33,18 @@ class AnalyticsView(views.APIView):
         - start_date: The start date for the analytics (YYYY-MM-DD)
         - end_date: The end date for the analytics (YYYY-MM-DD)
         - metrics: Comma-separated list of metrics to include (sales, bookings, users, etc.)
+          'retention' reads the full order and booking history and is only included when requested
+        - tz: Time zone for the time-series buckets, e.g. Asia/Kolkata (defaults to the server's)
         """
         period = request.query_params.get('period', 'monthly')
         metrics = request.query_params.get('metrics', 'all')
         
+        try:
+            tz = zoneinfo.ZoneInfo(request.query_params['tz']) if request.query_params.get('tz') else timezone.get_current_timezone()
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            return Response({"error": "Unknown time zone."}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
         # Parse date range
         try:
             start_date = request.query_params.get('start_date')
@@ -46,120 +64,97 @@ class AnalyticsView(views.APIView):
                             status=status.HTTP_400_BAD_REQUEST)
         
         # Convert dates to datetime with time component
-        start_datetime = timezone.datetime.combine(start_date, timezone.datetime.min.time())
-        end_datetime = timezone.datetime.combine(end_date, timezone.datetime.max.time())
-        
-        # Determine the truncation function based on the period
-        if period == 'daily':
-            trunc_func = TruncDay
-        elif period == 'weekly':
-            trunc_func = TruncWeek
-        elif period == 'yearly':
-            trunc_func = lambda field: timezone.datetime(field.year, 1, 1)
-        else:  # Default to monthly
-            trunc_func = TruncMonth
-        
-        # Initialize response data
-        response_data = {}
+        start_datetime = timezone.make_aware(timezone.datetime.combine(start_date, timezone.datetime.min.time()), tz)
+        end_datetime = timezone.make_aware(timezone.datetime.combine(end_date, timezone.datetime.max.time()), tz)
+        
+        # Gap-filled time series bucketed by the period in the requested time zone
+        series = TimeSeries(period, start_date, end_date, tz)
         
         # Include all metrics by default, or parse the requested metrics
         requested_metrics = metrics.split(',') if metrics != 'all' else [
             'sales', 'bookings', 'users', 'products', 'services', 'returns'
         ]
         
-        # Sales metrics
-        if 'sales' in requested_metrics:
-            sales_data = self._get_sales_metrics(start_datetime, end_datetime, trunc_func)
-            response_data['sales'] = sales_data
-        
-        # Booking metrics
-        if 'bookings' in requested_metrics:
-            booking_data = self._get_booking_metrics(start_datetime, end_datetime, trunc_func)
-            response_data['bookings'] = booking_data
-        
-        # User metrics
-        if 'users' in requested_metrics:
-            user_data = self._get_user_metrics(start_datetime, end_datetime, trunc_func)
-            response_data['users'] = user_data
-        
-        # Product metrics
-        if 'products' in requested_metrics:
-            product_data = self._get_product_metrics(start_datetime, end_datetime)
-            response_data['products'] = product_data
-        
-        # Service provider metrics
-        if 'services' in requested_metrics:
-            service_data = self._get_service_metrics(start_datetime, end_datetime)
-            response_data['services'] = service_data
-        
-        # Return request metrics
-        if 'returns' in requested_metrics:
-            return_data = self._get_return_metrics(start_datetime, end_datetime, trunc_func)
-            response_data['returns'] = return_data
-        
-        return Response(response_data)
-    
-    def _get_sales_metrics(self, start_date, end_date, trunc_func):
-        """
-        Get sales metrics for the specified period.
-        """
-        # Get orders created in the period
-        orders = Order.objects.filter(
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
+        sections = {
+            'sales': lambda: self._get_sales_metrics(start_datetime, end_datetime, series),
+            'bookings': lambda: self._get_booking_metrics(start_datetime, end_datetime, series),
+            'users': lambda: self._get_user_metrics(start_datetime, end_datetime, series),
+            'products': lambda: self._get_product_metrics(start_datetime, end_datetime),
+            'services': lambda: self._get_service_metrics(start_datetime, end_datetime),
+            'returns': lambda: self._get_return_metrics(start_datetime, end_datetime, series),
+            'retention': lambda: self._get_retention_metrics(start_date, end_date, period),
+        }
         
-        # Total sales amount
-        total_sales = orders.aggregate(total=Sum('total_price'))['total'] or 0
+        selected = {name: section for name, section in sections.items() if name in requested_metrics}
         
-        # Sales by status
-        sales_by_status = orders.values('status').annotate(
-            count=Count('id'),
-            total=Sum('total_price')
+        # Served from the analytics cache; on a miss the sections are independent,
+        # so they are run concurrently
+        response_data, cache_state = AnalyticsCache().get_or_compute(
+            list(selected), period, start_date, end_date, lambda: run_sections(selected), tz=str(tz)
         )
         
-        # Sales over time
-        sales_over_time = orders.annotate(
-            period=trunc_func('created_at')
-        ).values('period').annotate(
-            count=Count('id'),
-            total=Sum('total_price')
-        ).order_by('period')
-        
-        # Format the sales over time data
-        formatted_sales_over_time = [
-            {
-                'period': entry['period'].strftime('%Y-%m-%d'),
-                'count': entry['count'],
-                'total': float(entry['total'])
-            }
-            for entry in sales_over_time
-        ]
+        response = Response(response_data)
+        response['X-Analytics-Cache'] = cache_state
+        return response
+    
+    def _get_sales_metrics(self, start_date, end_date, series):
+        """
+        Get sales metrics for the specified period.
+        Reads the daily order and payment rollups instead of scanning orders.
+        """
+        # Get order rollups for the days in the period
+        orders = day_range(DailySalesRollup.objects.all(), start_date, end_date)
+        
+        # Total sales amount, order count and sales by status in one query
+        totals = ScalarPlan(orders).add(
+            'total_sales', Sum('total')
+        ).add(
+            'order_count', Sum('count')
+        ).add_breakdown(
+            'sales_by_status', 'status', Order.STATUS_CHOICES,
+            count=(Sum, 'count'), total=(Sum, 'total')
+        ).run()
+        total_sales = totals['total_sales'] or 0
+        order_count = totals['order_count'] or 0
+        
+        # Sales by shop
+        sales_by_shop = orders.values('shop_id', 'shop__name').annotate(
+            count=Sum('count'),
+            total=Sum('total')
+        ).order_by('-total')
+        
+        # Sales over time, with empty periods included
+        formatted_sales_over_time = series.for_rollup(DailySalesRollup)
         
         # Get payment data
-        payments = Payment.objects.filter(
-            created_at__gte=start_date,
-            created_at__lte=end_date,
-            order__isnull=False
-        )
+        payments = day_range(DailyPaymentRollup.objects.filter(is_order=True), start_date, end_date)
         
         # Payments by method
         payments_by_method = payments.values('payment_method').annotate(
-            count=Count('id'),
-            total=Sum('amount')
-        )
+            count=Sum('count'),
+            total=Sum('total')
+        ).order_by('payment_method')
         
         return {
             'total_sales': float(total_sales),
-            'order_count': orders.count(),
-            'average_order_value': float(total_sales / orders.count()) if orders.count() > 0 else 0,
+            'order_count': order_count,
+            'average_order_value': float(total_sales / order_count) if order_count > 0 else 0,
             'sales_by_status': [
                 {
                     'status': status['status'],
                     'count': status['count'],
                     'total': float(status['total'])
                 }
-                for status in sales_by_status
+                for status in totals['sales_by_status']
+            ],
+            'sales_by_shop': [
+                {
+                    'shop_id': shop['shop_id'],
+                    'shop': shop['shop__name'],
+                    'count': shop['count'],
+                    'total': float(shop['total'])
+                }
+                for shop in sales_by_shop
             ],
             'sales_over_time': formatted_sales_over_time,
             'payments_by_method': [
@@ -172,66 +167,52 @@ class AnalyticsView(views.APIView):
             ]
         }
     
-    def _get_booking_metrics(self, start_date, end_date, trunc_func):
+    def _get_booking_metrics(self, start_date, end_date, series):
         """
         Get booking metrics for the specified period.
+        Reads the daily booking rollup instead of scanning bookings.
         """
-        # Get bookings created in the period
-        bookings = Booking.objects.filter(
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        
-        # Total bookings amount
-        total_bookings_amount = bookings.aggregate(total=Sum('price'))['total'] or 0
-        
-        # Bookings by status
-        bookings_by_status = bookings.values('status').annotate(
-            count=Count('id'),
-            total=Sum('price')
-        )
-        
-        # Bookings over time
-        bookings_over_time = bookings.annotate(
-            period=trunc_func('created_at')
-        ).values('period').annotate(
-            count=Count('id'),
-            total=Sum('price')
-        ).order_by('period')
-        
-        # Format the bookings over time data
-        formatted_bookings_over_time = [
-            {
-                'period': entry['period'].strftime('%Y-%m-%d'),
-                'count': entry['count'],
-                'total': float(entry['total'])
-            }
-            for entry in bookings_over_time
-        ]
+        # Get booking rollups for the days in the period
+        bookings = day_range(DailyBookingRollup.objects.all(), start_date, end_date)
+        
+        # Totals, recurring vs. one-time bookings and bookings by status in one query
+        totals = ScalarPlan(bookings).add(
+            'total_amount', Sum('total')
+        ).add(
+            'booking_count', Sum('count')
+        ).add(
+            'recurring', Sum('count', filter=Q(is_recurring=True))
+        ).add(
+            'one_time', Sum('count', filter=Q(is_recurring=False))
+        ).add_breakdown(
+            'bookings_by_status', 'status', Booking.STATUS_CHOICES,
+            count=(Sum, 'count'), total=(Sum, 'total')
+        ).run()
+        total_bookings_amount = totals['total_amount'] or 0
+        booking_count = totals['booking_count'] or 0
+        
+        # Bookings over time, with empty periods included
+        formatted_bookings_over_time = series.for_rollup(DailyBookingRollup)
         
         # Bookings by service type
         bookings_by_service = bookings.values(
             'service_type__name'
         ).annotate(
-            count=Count('id'),
-            total=Sum('price')
-        )
-        
-        # Recurring vs. one-time bookings
-        recurring_bookings = bookings.filter(recurrence_rule__ne='N').count()
-        one_time_bookings = bookings.filter(recurrence_rule='N').count()
+            count=Sum('count'),
+            total=Sum('total')
+        ).order_by('service_type__name')
         
         return {
             'total_bookings_amount': float(total_bookings_amount),
-            'booking_count': bookings.count(),
-            'average_booking_value': float(total_bookings_amount / bookings.count()) if bookings.count() > 0 else 0,
+            'booking_count': booking_count,
+            'average_booking_value': float(total_bookings_amount / booking_count) if booking_count > 0 else 0,
             'bookings_by_status': [
                 {
                     'status': status['status'],
                     'count': status['count'],
                     'total': float(status['total'])
                 }
-                for status in bookings_by_status
+                for status in totals['bookings_by_status']
             ],
             'bookings_over_time': formatted_bookings_over_time,
             'bookings_by_service': [
@@ -243,63 +224,44 @@ class AnalyticsView(views.APIView):
                 for service in bookings_by_service
             ],
             'recurring_vs_one_time': {
-                'recurring': recurring_bookings,
-                'one_time': one_time_bookings
+                'recurring': totals['recurring'] or 0,
+                'one_time': totals['one_time'] or 0
             }
         }
     
-    def _get_user_metrics(self, start_date, end_date, trunc_func):
+    def _get_user_metrics(self, start_date, end_date, series):
         """
         Get user metrics for the specified period.
         """
-        # Get users created in the period
-        users = User.objects.filter(
-            date_joined__gte=start_date,
-            date_joined__lte=end_date
-        )
-        
-        # Total users
-        total_users = User.objects.count()
-        
-        # New users over time
-        users_over_time = users.annotate(
-            period=trunc_func('date_joined')
-        ).values('period').annotate(
-            count=Count('id')
-        ).order_by('period')
-        
-        # Format the users over time data
-        formatted_users_over_time = [
-            {
-                'period': entry['period'].strftime('%Y-%m-%d'),
-                'count': entry['count']
-            }
-            for entry in users_over_time
-        ]
-        
-        # Users by membership status
-        users_by_membership = User.objects.values('membership_status').annotate(
-            count=Count('id')
-        )
-        
-        # Active users (made a booking or order in the last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        active_users_count = User.objects.filter(
-            models.Q(booking__created_at__gte=thirty_days_ago) | 
-            models.Q(order__created_at__gte=thirty_days_ago)
-        ).distinct().count()
+        # New users over time, from the sign-up rollup, with empty periods included
+        formatted_users_over_time = series.for_rollup(DailyUserRollup)
+        
+        # Total users and users by membership status in one query
+        totals = ScalarPlan(User.objects.all()).add(
+            'total_users', Count('id')
+        ).add_breakdown(
+            'users_by_membership', 'membership_status', User.MEMBERSHIP_CHOICES,
+            count=(Count, 'id')
+        ).run()
+        
+        # Active users (made a booking or order), estimated from daily sketches
+        today = timezone.localdate()
+        active_users_count, error_bound = count_active_users(today - timedelta(days=30), today)
+        active_in_period, _ = count_active_users(start_date.date(), end_date.date())
         
         return {
-            'total_users': total_users,
-            'new_users': users.count(),
+            'total_users': totals['total_users'],
+            'new_users': sum(entry['count'] for entry in formatted_users_over_time),
             'active_users': active_users_count,
+            'active_users_in_period': active_in_period,
+            'active_users_error': round(error_bound, 4),
             'users_over_time': formatted_users_over_time,
             'users_by_membership': [
                 {
                     'membership_status': membership['membership_status'],
                     'count': membership['count']
                 }
-                for membership in users_by_membership
+                for membership in totals['users_by_membership']
             ]
         }
     
@@ -307,19 +269,17 @@ class AnalyticsView(views.APIView):
         """
         Get product metrics for the specified period.
         """
-        # Get order items for orders in the period
-        order_items = OrderItem.objects.filter(
-            order__created_at__gte=start_date,
-            order__created_at__lte=end_date
-        )
-        
-        # Top selling products
-        top_products = order_items.values(
+        # Daily product leaderboard rows for the period
+        product_sales = day_range(DailyProductRollup.objects.all(), start_date, end_date).values(
             'product__id', 'product__name'
         ).annotate(
-            quantity=Sum('quantity'),
-            revenue=Sum(F('price') * F('quantity'))
-        ).order_by('-quantity')[:10]
+            quantity_sold=Sum('units'),
+            revenue=Sum('revenue')
+        )
+        
+        # Top selling products, by units and by revenue
+        top_products = product_sales.order_by('-quantity_sold', 'product__id')[:10]
+        top_revenue_products = product_sales.order_by('-revenue', 'product__id')[:10]
         
         # Products with low stock
         low_stock_products = Product.objects.filter(
@@ -338,11 +298,20 @@ class AnalyticsView(views.APIView):
                 {
                     'id': product['product__id'],
                     'name': product['product__name'],
-                    'quantity_sold': product['quantity'],
+                    'quantity_sold': product['quantity_sold'],
                     'revenue': float(product['revenue'])
                 }
                 for product in top_products
             ],
+            'top_revenue_products': [
+                {
+                    'id': product['product__id'],
+                    'name': product['product__name'],
+                    'quantity_sold': product['quantity_sold'],
+                    'revenue': float(product['revenue'])
+                }
+                for product in top_revenue_products
+            ],
             'low_stock_products': [
                 {
                     'id': product['id'],
@@ -365,19 +334,13 @@ class AnalyticsView(views.APIView):
         """
         Get service provider metrics for the specified period.
         """
-        # Get bookings for the period
-        bookings = Booking.objects.filter(
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        
-        # Top service providers by bookings
-        top_providers = bookings.values(
+        # Top service providers by bookings, from the daily provider leaderboard
+        top_providers = day_range(DailyProviderRollup.objects.all(), start_date, end_date).values(
             'service_provider__id', 'service_provider__name'
         ).annotate(
-            booking_count=Count('id'),
-            revenue=Sum('price')
-        ).order_by('-booking_count')[:10]
+            booking_count=Sum('count'),
+            revenue=Sum('total')
+        ).order_by('-booking_count', 'service_provider__id')[:10]
         
         # Service providers by rating
         providers_by_rating = ServiceProvider.objects.values(
@@ -419,53 +382,33 @@ class AnalyticsView(views.APIView):
             ]
         }
     
-    def _get_return_metrics(self, start_date, end_date, trunc_func):
+    def _get_return_metrics(self, start_date, end_date, series):
         """
         Get return request metrics for the specified period.
+        Reads the daily return rollup instead of scanning return requests.
         """
-        # Get return requests created in the period
-        returns = ReturnRequest.objects.filter(
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        )
-        
-        # Total refund amount
-        total_refund = returns.filter(status__in=['A', 'C']).aggregate(
-            total=Sum('refund_amount')
-        )['total'] or 0
-        
-        # Returns by status
-        returns_by_status = returns.values('status').annotate(
-            count=Count('id'),
-            total=Sum('refund_amount', default=0)
-        )
-        
-        # Returns over time
-        returns_over_time = returns.annotate(
-            period=trunc_func('created_at')
-        ).values('period').annotate(
-            count=Count('id'),
-            total=Sum('refund_amount', default=0)
-        ).order_by('period')
-        
-        # Format the returns over time data
-        formatted_returns_over_time = [
-            {
-                'period': entry['period'].strftime('%Y-%m-%d'),
-                'count': entry['count'],
-                'total': float(entry['total'] or 0)
-            }
-            for entry in returns_over_time
-        ]
-        
-        # Returns by reason
-        returns_by_reason = returns.values('reason').annotate(
-            count=Count('id'),
-            total=Sum('refund_amount', default=0)
-        )
+        # Get return rollups for the days in the period
+        returns = day_range(DailyReturnRollup.objects.all(), start_date, end_date)
+        
+        # Total returns, refund amount and returns by status and reason in one query
+        totals = ScalarPlan(returns).add(
+            'return_count', Sum('count')
+        ).add(
+            'refund', Sum('total', filter=Q(status__in=['A', 'C']))
+        ).add_breakdown(
+            'returns_by_status', 'status', ReturnRequest.STATUS_CHOICES,
+            count=(Sum, 'count'), total=(Sum, 'total')
+        ).add_breakdown(
+            'returns_by_reason', 'reason', ReturnRequest.REASON_CHOICES,
+            count=(Sum, 'count'), total=(Sum, 'total')
+        ).run()
+        total_refund = totals['refund'] or 0
+        
+        # Returns over time, with empty periods included
+        formatted_returns_over_time = series.for_rollup(DailyReturnRollup)
         
         return {
-            'total_returns': returns.count(),
+            'total_returns': totals['return_count'] or 0,
             'total_refund_amount': float(total_refund),
             'returns_by_status': [
                 {
@@ -473,7 +416,7 @@ class AnalyticsView(views.APIView):
                     'count': status['count'],
                     'total': float(status['total'] or 0)
                 }
-                for status in returns_by_status
+                for status in totals['returns_by_status']
             ],
             'returns_over_time': formatted_returns_over_time,
             'returns_by_reason': [
@@ -482,6 +425,31 @@ class AnalyticsView(views.APIView):
                     'count': reason['count'],
                     'total': float(reason['total'] or 0)
                 }
-                for reason in returns_by_reason
+                for reason in totals['returns_by_reason']
+            ]
+        }
+    
+    def _get_retention_metrics(self, start_date, end_date, period):
+        """
+        Get cohort retention for users whose first order or booking falls in the period.
+        Daily and weekly periods use weekly cohorts; monthly and yearly use monthly cohorts.
+        """
+        granularity = cohorts.WEEKLY if period in ('daily', 'weekly') else cohorts.MONTHLY
+        result = cohorts.get_retention(granularity, start_date, end_date)
+        
+        return {
+            'granularity': granularity,
+            'repeat_purchase_rate': round(result['repeat_rate'], 4),
+            'cohorts': [
+                {
+                    'cohort': cohort.strftime('%Y-%m-%d'),
+                    'size': int(size),
+                    # Periods that have not happened yet are left out
+                    'retention': [round(float(rate), 4) for rate in rates if rate == rate],
+                    'repeat_purchase_rate': round(float(repeat), 4) if size else 0
+                }
+                for cohort, size, rates, repeat in zip(
+                    result['cohorts'], result['sizes'], result['retention'], result['repeat_rates']
+                )
             ]
-        }
\ No newline at end of file
+        }
@@ -1,10 +1,12 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.conf import settings
 from django_filters import rest_framework as filters
 from .models import Coupon, CouponUsage
 from .serializers import CouponSerializer, CouponUsageSerializer
 from .security import get_permission_classes
+from .coupon_generator import CouponCodeGenerator
 
 class CouponFilter(filters.FilterSet):
     is_active = filters.BooleanFilter(field_name='is_active')
@@ -92,6 +94,42 @@ class CouponViewSet(viewsets.ModelViewSet):
         )
         
         return Response(CouponUsageSerializer(usage).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'], url_path='generate-codes')
+    def generate_codes(self, request, pk=None):
+        """
+        Generate single-use coupons that copy this coupon's terms and applicability.
+        Only staff users can generate coupons.
+        """
+        if not request.user.is_staff:
+            return Response({'detail': 'Only staff users can generate coupons.'},
+                            status=status.HTTP_403_FORBIDDEN)
+        
+        template = self.get_object()
+        try:
+            count = int(request.data.get('count', 0))
+            length = int(request.data.get('length', CouponCodeGenerator.DEFAULT_LENGTH))
+        except (TypeError, ValueError):
+            return Response({'detail': 'count and length must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        prefix = request.data.get('prefix', '')
+        
+        if count < 1:
+            return Response({'detail': 'count must be at least 1.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_count = getattr(settings, 'COUPON_GENERATE_MAX_COUNT', 5000)
+        if count > max_count:
+            return Response({'detail': f'count cannot exceed {max_count}.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            generator = CouponCodeGenerator(prefix=prefix, length=length)
+            created = generator.generate(template, count)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'template': template.id,
+            'prefix': generator.prefix,
+            'created': created
+        }, status=status.HTTP_201_CREATED)
 
 class CouponUsageViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CouponUsageSerializer
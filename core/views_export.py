@@ -0,0 +1,69 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from .security import get_permission_classes
+from .analytics_export import AnalyticsExporter
+
+class AnalyticsExportView(APIView):
+    """
+    API view for exporting the raw rows behind the analytics dashboard.
+    Only accessible to staff users when security is enabled.
+    """
+    permission_classes = get_permission_classes(staff_only=True)
+
+    def get(self, request):
+        """
+        Stream a dataset as CSV or newline-delimited JSON.
+
+        Query parameters:
+        - dataset: orders, bookings, payments or returns
+        - export_format: csv (default) or ndjson
+        - start_date: The start of the period (YYYY-MM-DD, defaults to 30 days ago)
+        - end_date: The end of the period (YYYY-MM-DD, defaults to today)
+        """
+        if not request.user.is_staff:
+            return Response({'detail': 'Only staff can export analytics data.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        dataset = request.query_params.get('dataset')
+        if dataset not in AnalyticsExporter.DATASETS:
+            return Response({'error': f"dataset must be one of: {', '.join(AnalyticsExporter.DATASETS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Not named 'format', which DRF reserves for content negotiation
+        output_format = request.query_params.get('export_format', 'csv')
+        if output_format not in AnalyticsExporter.FORMATS:
+            return Response({'error': f"export_format must be one of: {', '.join(AnalyticsExporter.FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start_date = request.query_params.get('start_date')
+            if start_date:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            else:
+                start_date = (timezone.now() - timedelta(days=30)).date()
+
+            end_date = request.query_params.get('end_date')
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+            else:
+                end_date = timezone.now().date()
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        exporter = AnalyticsExporter(
+            dataset,
+            timezone.make_aware(datetime.combine(start_date, time.min)),
+            timezone.make_aware(datetime.combine(end_date, time.max))
+        )
+        response = StreamingHttpResponse(
+            exporter.stream(output_format),
+            content_type=AnalyticsExporter.FORMATS[output_format]
+        )
+        filename = f'{dataset}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{output_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
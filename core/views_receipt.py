@@ -2,80 +2,181 @@ from rest_framework import permissions, status
 from .security import get_permission_classes
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.http import HttpResponse
-from .models import Order, Booking, Payment
+from django.db.models import Prefetch
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils import translation
+from django.utils.cache import patch_cache_control
+from .models import Order, OrderItem, Booking, Payment
 from .receipt_generator import ReceiptGenerator
-import io
+from .receipt_cache import ReceiptCache
+from .receipt_batch import BulkReceiptRenderer, get_shared_pool
+from datetime import datetime
+import tempfile
 
 class GenerateReceiptView(APIView):
     permission_classes = get_permission_classes()
-    
+
+    def get(self, request):
+        """Download a PDF receipt, honouring If-None-Match"""
+        return self._receipt_response(request, request.query_params)
+
     def post(self, request):
         """Generate a PDF receipt for an order or booking"""
-        order_id = request.data.get('order_id')
-        booking_id = request.data.get('booking_id')
-        
+        return self._receipt_response(request, request.data)
+
+    def _receipt_response(self, request, params):
+        order_id = params.get('order_id')
+        booking_id = params.get('booking_id')
+
         if not order_id and not booking_id:
             return Response({
                 'detail': 'Either order_id or booking_id must be provided.'
             }, status=status.HTTP_400_BAD_REQUEST)
-        
+
         # Initialize receipt generator
         receipt_generator = ReceiptGenerator()
-        
+
         # Generate receipt based on type
         if order_id:
             try:
-                order = Order.objects.get(id=order_id)
-                
+                order = Order.objects.select_related('user').prefetch_related(
+                    Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product'))
+                ).get(id=order_id)
+
                 # Check if user is authorized to access this order
                 if order.user != request.user and not request.user.is_staff:
                     return Response({
                         'detail': 'You do not have permission to access this order.'
                     }, status=status.HTTP_403_FORBIDDEN)
-                
+
                 # Get the payment for this order
                 payment = Payment.objects.filter(order_id=order_id).first()
-                
-                # Generate the receipt
-                buffer = io.BytesIO()
-                receipt_generator.generate_order_receipt(order, payment, buffer)
-                buffer.seek(0)
-                
-                # Return the PDF as a response
-                response = HttpResponse(buffer, content_type='application/pdf')
-                response['Content-Disposition'] = f'attachment; filename="order_receipt_{order_id}.pdf"'
-                return response
-                
+                if payment is None:
+                    return Response({
+                        'detail': 'This order has not been paid yet, so it has no receipt.'
+                    }, status=status.HTTP_409_CONFLICT)
+
+                return self._cached_pdf(
+                    request, 'order', order, payment,
+                    lambda: receipt_generator.generate_order_receipt(order, payment),
+                    f'order_receipt_{order_id}.pdf'
+                )
+
             except Order.DoesNotExist:
                 return Response({
                     'detail': 'Order not found.'
                 }, status=status.HTTP_404_NOT_FOUND)
-        
+
         elif booking_id:
             try:
-                booking = Booking.objects.get(id=booking_id)
-                
+                booking = Booking.objects.select_related('user', 'service_type').get(id=booking_id)
+
                 # Check if user is authorized to access this booking
                 if booking.user != request.user and not request.user.is_staff:
                     return Response({
                         'detail': 'You do not have permission to access this booking.'
                     }, status=status.HTTP_403_FORBIDDEN)
-                
+
                 # Get the payment for this booking
                 payment = Payment.objects.filter(booking_id=booking_id).first()
-                
-                # Generate the receipt
-                buffer = io.BytesIO()
-                receipt_generator.generate_booking_receipt(booking, payment, buffer)
-                buffer.seek(0)
-                
-                # Return the PDF as a response
-                response = HttpResponse(buffer, content_type='application/pdf')
-                response['Content-Disposition'] = f'attachment; filename="booking_receipt_{booking_id}.pdf"'
-                return response
-                
+                if payment is None:
+                    return Response({
+                        'detail': 'This booking has not been paid yet, so it has no receipt.'
+                    }, status=status.HTTP_409_CONFLICT)
+
+                return self._cached_pdf(
+                    request, 'booking', booking, payment,
+                    lambda: receipt_generator.generate_booking_receipt(booking, payment),
+                    f'booking_receipt_{booking_id}.pdf'
+                )
+
             except Booking.DoesNotExist:
                 return Response({
                     'detail': 'Booking not found.'
-                }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+                }, status=status.HTTP_404_NOT_FOUND)
+
+    def _cached_pdf(self, request, kind, obj, payment, render, filename):
+        """
+        Serve a receipt from the receipt cache, rendering it only on a miss.
+        The cache key is used as a strong ETag so repeat downloads can be answered with 304.
+        """
+        cache = ReceiptCache()
+        language = translation.get_language()
+        key = cache.make_key(kind, obj, payment, language)
+        etag = f'"{key}"'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            pdf = cache.get_or_render(kind, obj, payment, language, render)
+            response = FileResponse(pdf, as_attachment=True, filename=filename, content_type='application/pdf')
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class BulkReceiptView(APIView):
+    """
+    Render many receipts at once into a ZIP archive.
+    Only accessible to staff users when security is enabled.
+    """
+    permission_classes = get_permission_classes(staff_only=True)
+
+    def post(self, request):
+        """
+        Request body:
+        - kind: 'order', 'booking' or 'all' (default)
+        - ids: List of order/booking ids
+        - start_date / end_date: Creation date range (YYYY-MM-DD)
+        """
+        if not request.user.is_staff:
+            return Response({'detail': 'Only staff users can export receipts.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        kind = request.data.get('kind', 'all')
+        ids = request.data.get('ids')
+        start_date = request.data.get('start_date')
+        end_date = request.data.get('end_date')
+
+        if kind not in ('order', 'booking', 'all'):
+            return Response({'detail': "kind must be 'order', 'booking' or 'all'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not ids and not start_date and not end_date:
+            return Response({'detail': 'Either ids or a date range must be provided.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if ids:
+            try:
+                if not isinstance(ids, list):
+                    raise TypeError
+                ids = [int(pk) for pk in ids]
+            except (TypeError, ValueError):
+                return Response({'detail': 'ids must be a list of integers.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if start_date:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        kinds = BulkReceiptRenderer.KINDS if kind == 'all' else [kind]
+        # Rendered in the process-wide pool, so concurrent exports share RECEIPT_BULK_WORKERS processes
+        renderer = BulkReceiptRenderer(executor=get_shared_pool())
+
+        # The archive is spooled to disk so memory does not grow with the number of receipts
+        archive = tempfile.TemporaryFile()
+        stats = renderer.write_zip(
+            renderer.iter_jobs(kinds, ids=ids, start_date=start_date, end_date=end_date),
+            archive
+        )
+        archive.seek(0)
+
+        response = FileResponse(archive, as_attachment=True, filename='receipts.zip', content_type='application/zip')
+        response['X-Receipt-Count'] = stats['count']
+        response['X-Receipts-Per-Second'] = f"{stats['receipts_per_second']:.2f}"
+        response['X-Receipts-Per-Second-Per-Core'] = f"{stats['receipts_per_second_per_core']:.2f}"
+        return response
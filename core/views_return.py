@@ -108,8 +108,9 @@ class ReturnRequestViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_403_FORBIDDEN)
         
         pending_requests = ReturnRequest.objects.filter(status='P')
-        serializer = self.get_serializer(pending_requests, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(pending_requests)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def my_returns(self, request):
@@ -117,8 +118,9 @@ class ReturnRequestViewSet(viewsets.ModelViewSet):
         Get all return requests for the current user.
         """
         user_returns = ReturnRequest.objects.filter(user=request.user)
-        serializer = self.get_serializer(user_returns, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(user_returns)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def refund_status(self, request, pk=None):
@@ -0,0 +1,66 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from django.http import FileResponse
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from .models import User
+from .security import get_permission_classes
+from .statement_generator import StatementGenerator
+import tempfile
+
+class StatementView(APIView):
+    """
+    API view for downloading a user's account statement as a PDF.
+    Users can download their own statement; staff can download any user's.
+    """
+    permission_classes = get_permission_classes()
+
+    def get(self, request):
+        """
+        Query parameters:
+        - user_id: The user the statement is for (defaults to the current user)
+        - start_date: The start of the period (YYYY-MM-DD, defaults to 90 days ago)
+        - end_date: The end of the period (YYYY-MM-DD, defaults to today)
+        """
+        user_id = request.query_params.get('user_id')
+        if user_id and str(user_id) != str(request.user.pk):
+            if not request.user.is_staff:
+                return Response({'detail': "You do not have permission to access this user's statement."},
+                                status=status.HTTP_403_FORBIDDEN)
+            try:
+                user = User.objects.get(pk=user_id)
+            except (User.DoesNotExist, ValueError):
+                return Response({'detail': 'User not found.'}, status=status.HTTP_404_NOT_FOUND)
+        elif request.user.is_authenticated:
+            user = request.user
+        else:
+            return Response({'detail': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            start_date = request.query_params.get('start_date')
+            if start_date:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            else:
+                start_date = (timezone.now() - timedelta(days=90)).date()
+
+            end_date = request.query_params.get('end_date')
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+            else:
+                end_date = timezone.now().date()
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        start = timezone.make_aware(datetime.combine(start_date, time.min))
+        end = timezone.make_aware(datetime.combine(end_date, time.max))
+
+        # Spooled to a temporary file and streamed back instead of being built as a bytes response
+        statement = tempfile.TemporaryFile()
+        StatementGenerator.generate(user, start, end, statement)
+        statement.seek(0)
+
+        filename = f'statement_{user.pk}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.pdf'
+        return FileResponse(statement, as_attachment=True, filename=filename, content_type='application/pdf')
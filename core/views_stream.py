@@ -0,0 +1,218 @@
+import asyncio
+import io
+import json
+from asgiref.sync import sync_to_async
+from corsheaders.middleware import CorsMiddleware
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .authentication import CachedJWTAuthentication, StreamToken
+from .models import Notification
+from .realtime import broker, get_backend
+from .serializers import NotificationSerializer
+from .token_revocation import is_revoked
+from . import notification_counters
+
+
+def _format_event(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _validated_stream_token(raw_token):
+    token = StreamToken(raw_token)
+    if is_revoked(token):
+        raise InvalidToken('Token has been revoked')
+    return token
+
+
+def _authenticate(request):
+    """
+    Return the active user for the request's access token, from the Authorization header,
+    or for its stream token, from the stream_token parameter. Access tokens are not
+    accepted in the URL, where they would end up in server and proxy logs.
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    try:
+        if raw_token is not None:
+            validated_token = authentication.get_validated_token(raw_token)
+        elif request.GET.get('stream_token'):
+            validated_token = _validated_stream_token(request.GET['stream_token'])
+        else:
+            return None
+        user = authentication.get_user(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+
+def _last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _catch_up(user, last_event_id):
+    """Return the initial events for a connection: missed notifications and the unread count"""
+    events = []
+    if last_event_id is not None:
+        missed = Notification.objects.filter(user=user, id__gt=last_event_id).order_by('id')[:100]
+        events.extend(
+            _format_event('notification', NotificationSerializer(notification).data, notification.id)
+            for notification in missed
+        )
+    events.append(_format_event('unread', {'unread': notification_counters.unread_count(user)}))
+    return events
+
+
+def _accepts(membership_status):
+    def accept(event):
+        statuses = event.get('membership_statuses')
+        return not statuses or membership_status in statuses
+    return accept
+
+
+async def _stream(user, last_event_id, catch_up=_catch_up):
+    heartbeat = getattr(settings, 'REALTIME_HEARTBEAT_SECONDS', 15)
+    # Subscribing before catching up means nothing published in between is lost;
+    # clients may see a notification twice and should ignore ids they already have.
+    # Both happen inside the generator so a stream that never starts holds no subscription.
+    subscription = broker.subscribe(user.pk, filter=_accepts(user.membership_status))
+    try:
+        yield f'retry: {getattr(settings, "REALTIME_RETRY_MILLISECONDS", 3000)}\n\n'
+        for event in await sync_to_async(catch_up)(user, last_event_id):
+            yield event
+        while True:
+            try:
+                event = await subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing the idle connection
+                yield ': keepalive\n\n'
+                continue
+            if event is None:
+                break
+            yield _format_event(event['type'], event['data'], event.get('id'))
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _unauthorized():
+    return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+
+def _stream_response(content):
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Disables response buffering in nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def notification_stream(request):
+    """
+    Server-sent events for the current user: 'notification' for new notifications,
+    'booking' for booking status changes and 'unread' for the unread count on connect.
+    Reconnecting clients send Last-Event-ID and receive the notifications they missed.
+
+    Under ASGI, service_app.asgi serves this path with StreamApplication instead, which
+    does not hold a thread per connection; this view serves it under WSGI.
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return _unauthorized()
+    get_backend()
+    return _stream_response(_stream(user, _last_event_id(request)))
+
+
+def _closing_connections(function):
+    # Outside Django's request cycle nothing else closes the thread's stale connections
+    def wrapper(*args):
+        try:
+            return function(*args)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+class StreamApplication:
+    """
+    ASGI application that serves GET requests for the notification stream directly
+    and passes every other request to Django.
+
+    Django's ASGI handler runs each request in its own thread-sensitive context, so
+    a streaming response keeps a thread for as long as the client stays connected.
+    Here the only blocking work (authentication and catch-up) runs on the shared sync
+    thread before streaming starts, and an idle connection costs a task and a queue.
+    CORS headers are added with the same rules as CorsMiddleware.
+    """
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+        self._path = None
+        self._cors = CorsMiddleware(lambda request: None)
+
+    def path(self):
+        if self._path is None:
+            self._path = reverse('notification-stream')
+        return self._path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'GET' or scope['path'] != self.path():
+            return await self.django_application(scope, receive, send)
+
+        # A GET has no body to read; the request only provides headers and parameters
+        request = ASGIRequest(scope, io.BytesIO())
+        user = await sync_to_async(_closing_connections(_authenticate))(request)
+        if user is None:
+            return await self._send_response(request, _unauthorized(), send)
+        get_backend()
+
+        stream = _stream(user, _last_event_id(request), catch_up=_closing_connections(_catch_up))
+        await self._send_start(request, _stream_response(()), send)
+        pump = asyncio.ensure_future(self._pump(stream, send))
+        disconnect = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            await asyncio.wait({pump, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (pump, disconnect):
+                task.cancel()
+            await asyncio.gather(pump, disconnect, return_exceptions=True)
+            await stream.aclose()
+
+    @staticmethod
+    async def _pump(stream, send):
+        async for chunk in stream:
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def _headers(self, request, response):
+        self._cors.add_response_headers(request, response)
+        return [(name.encode('latin-1'), value.encode('latin-1')) for name, value in response.items()]
+
+    async def _send_start(self, request, response, send):
+        await send({'type': 'http.response.start', 'status': response.status_code,
+                    'headers': self._headers(request, response)})
+
+    async def _send_response(self, request, response, send):
+        await self._send_start(request, response, send)
+        await send({'type': 'http.response.body', 'body': response.content})
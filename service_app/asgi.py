@@ -2,6 +2,8 @@
 ASGI config for service_app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The notification stream is served by core.views_stream.StreamApplication,
+which passes every other request to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +15,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "service_app.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.views_stream import StreamApplication  # noqa: E402  (needs the app registry)
+
+application = StreamApplication(django_application)
@@ -163,11 +163,79 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MAX_UPLOAD_SIZE = 5242880  # 5MB
 ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/gif']
 
+# Largest batch a single generate-codes request creates while the client waits;
+# larger batches go through the generate_coupons management command
+COUPON_GENERATE_MAX_COUNT = 5000
+
+# Rendered receipt PDFs are cached in media storage under this directory
+RECEIPT_CACHE_LOCATION = 'receipts'
+
+# Worker processes shared by all bulk receipt requests in a web process (render_receipts uses every core)
+RECEIPT_BULK_WORKERS = 2
+
+# Maximum number of analytics sections computed concurrently, each on its own DB connection
+ANALYTICS_SECTION_WORKERS = 4
+
+# AnalyticsView response cache: responses for ranges ending today are re-keyed every
+# ANALYTICS_CACHE_BUCKET_SECONDS; closed ranges live until invalidated or ANALYTICS_CACHE_TIMEOUT
+ANALYTICS_CACHE_BUCKET_SECONDS = 300
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 * 24
+ANALYTICS_CACHE_LOCK_TIMEOUT = 30
+
+# Width of the user id ranges a notification broadcast is inserted in, one statement per range
+NOTIFICATION_FANOUT_CHUNK_SIZE = 20000
+
+# Notifications are stored in monthly partitions on PostgreSQL. purge_notifications removes months
+# older than the retention period and creates partitions this many months ahead
+NOTIFICATION_RETENTION_DAYS = 180
+NOTIFICATION_PARTITION_MONTHS_AHEAD = 2
+# Rows deleted per statement when purging without partitions
+NOTIFICATION_PURGE_BATCH_SIZE = 10000
+
+# Users authenticated by JWT are read from cached snapshots (core.user_cache). Saves retire
+# snapshots at once; QuerySet.update() and saves in other processes with the per-process
+# default cache are seen after the timeout
+USER_SNAPSHOT_CACHE_ENABLED = True
+USER_SNAPSHOT_CACHE_ALIAS = 'default'
+USER_SNAPSHOT_CACHE_TIMEOUT = 60
+
+# Real-time notification stream (served by the ASGI application). LocalBackend only reaches
+# connections in the same process; use core.realtime.PostgresBackend with several workers
+REALTIME_BACKEND = os.environ.get('REALTIME_BACKEND', 'core.realtime.LocalBackend')
+REALTIME_HEARTBEAT_SECONDS = 15
+REALTIME_MAX_QUEUED_EVENTS = 100
+# Lifetime of the tokens from /api/notifications/stream-token/, checked only when a stream connects
+REALTIME_STREAM_TOKEN_LIFETIME = timedelta(seconds=60)
+
+# Login throttling (see core.login_throttle); CacheBackend shares the buckets between processes
+LOGIN_THROTTLE_ENABLED = True
+LOGIN_THROTTLE_BACKEND = os.environ.get('LOGIN_THROTTLE_BACKEND', 'core.login_throttle.LocalBackend')
+LOGIN_THROTTLE_CACHE_ALIAS = 'default'
+# Bucket capacity and refills per minute, per client IP and per account
+LOGIN_THROTTLE_RATES = {'ip': (60, 30), 'account': (10, 5)}
+# Reverse proxies in front of the app that append to X-Forwarded-For. At 0 the client IP is
+# REMOTE_ADDR and X-Forwarded-For is ignored, since clients can set it to anything
+LOGIN_THROTTLE_NUM_PROXIES = int(os.environ.get('LOGIN_THROTTLE_NUM_PROXIES', 0))
+
 # Email Configuration (SendGrid)
-EMAIL_BACKEND = 'sendgrid_backend.SendgridBackend'
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'sendgrid_backend.SendgridBackend')
 SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@yourapp.com')
 
+# Email outbox: requests queue emails and `manage.py send_outbox_emails` delivers them.
+# Set EMAIL_OUTBOX_BACKEND to core.email_outbox.DjangoMailBackend to deliver through
+# EMAIL_BACKEND instead (e.g. the console or file-based backend in development)
+EMAIL_OUTBOX_BACKEND = os.environ.get('EMAIL_OUTBOX_BACKEND', 'core.email_outbox.SendGridBackend')
+EMAIL_OUTBOX_BATCH_SIZE = 100
+# Failed sends are retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubling up to
+# EMAIL_OUTBOX_MAX_RETRY_DELAY, and dead-lettered after EMAIL_OUTBOX_MAX_ATTEMPTS attempts
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 60 * 60 * 6
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+
+# Recipients per API call when sending campaigns (SendGrid allows at most 1000)
+EMAIL_CAMPAIGN_BATCH_SIZE = 1000
+
 # Debug Flags
 DEBUG_API_ACCESS = os.environ.get('DEBUG_API_ACCESS', 'False').lower() == 'false'
 # Security toggle for testing - set to True to disable all security
@@ -176,7 +244,7 @@ DEBUG_SECURITY = True  # Security disabled by default
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny' if DEBUG_SECURITY else
@@ -192,9 +260,14 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-    ]
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Largest page clients may ask for with ?page_size=
+PAGINATION_MAX_PAGE_SIZE = 200
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -205,9 +278,18 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',)
+    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # Embed membership_status, language_preference and is_staff as claims (see core.authentication)
+    'TOKEN_OBTAIN_SERIALIZER': 'core.serializers.UserClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'core.serializers.UserClaimsTokenRefreshSerializer',
 }
 
+# Token revocation (see core.token_revocation): seconds between reads of other processes'
+# revocations, and the size of each hourly filter
+TOKEN_REVOCATION_SYNC_SECONDS = 5
+TOKEN_REVOCATION_FILTER_CAPACITY = 100000
+TOKEN_REVOCATION_ERROR_RATE = 0.001
+
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET')
 